@@ -0,0 +1,207 @@
+# API 호출 마감 시간 / 오류 분류 / 재시도 / 헤지 요청
+# - Deadline: 호출 하나에 쓸 수 있는 전체 시간. 재시도와 대기를 모두 이 안에서 한다.
+# - ApiError 하위 클래스로 실패 종류를 나눈다. retryable 은 다시 보내도 되는 실패,
+#   ambiguous 는 요청이 거래소에 닿았는지 알 수 없는 실패(응답 시간 초과, 연결 끊김, 5xx).
+# - 재시도 간격은 full jitter 지수 백오프 (여러 세션이 한꺼번에 다시 보내지 않도록)
+# - 주문은 user_order_id 로 같은 주문임을 묶고, 결과가 애매하면 다시 보내기 전에 접수 여부부터 확인한다.
+# - 조회는 응답이 늦으면 같은 요청을 한 번 더 보내 먼저 온 응답을 쓴다 (헤지).
+
+import json
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import requests
+
+READ_DEADLINE = 5.0    # 초. 조회 한 건 (재시도 포함)
+ORDER_DEADLINE = 8.0   # 초. 주문/취소 한 건 (접수 확인과 재전송 포함)
+
+
+class Deadline:
+    def __init__(self, seconds, clock=time.monotonic):
+        self.clock = clock
+        self.expires = clock() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires - self.clock())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout(self, cap):
+        # 이번 시도에 쓸 타임아웃 (남은 시간과 cap 중 작은 값). 시간이 없으면 DeadlineExceeded
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded('마감 시간 초과')
+        return min(cap, remaining)
+
+
+class ApiError(Exception):
+    retryable = False
+    ambiguous = False
+
+    def __init__(self, message, endpoint=None, code=None):
+        super().__init__(message)
+        self.endpoint = endpoint
+        self.code = code
+
+
+class ApiUnavailable(ApiError):
+    # 연결 자체를 못 했다 (요청이 나가지 않음)
+    retryable = True
+
+
+class ApiTimeout(ApiError):
+    # 보낸 뒤 응답을 못 받았다
+    retryable = True
+    ambiguous = True
+
+
+class ApiConnectionError(ApiError):
+    # 연결이 중간에 끊겼다
+    retryable = True
+    ambiguous = True
+
+
+class ApiRateLimited(ApiError):
+    retryable = True
+
+
+class ApiServerError(ApiError):
+    # 5xx 또는 해석할 수 없는 응답
+    retryable = True
+    ambiguous = True
+
+
+class ApiRejected(ApiError):
+    # 거래소가 요청을 거절했다 (잔고 부족, 잘못된 파라미터 등). 그대로 다시 보내도 같은 결과
+    pass
+
+
+class DeadlineExceeded(ApiError):
+    ambiguous = True
+
+
+def as_api_error(endpoint, exc):
+    # requests 예외 -> ApiError
+    if isinstance(exc, ApiError):
+        return exc
+    if isinstance(exc, requests.ConnectTimeout):
+        return ApiUnavailable(f'연결 시간 초과: {exc}', endpoint)
+    if isinstance(exc, requests.Timeout):
+        return ApiTimeout(f'응답 시간 초과: {exc}', endpoint)
+    if isinstance(exc, requests.ConnectionError):
+        return ApiConnectionError(f'연결 오류: {exc}', endpoint)
+    return ApiError(f'요청 오류: {exc}', endpoint)
+
+
+def parse_response(endpoint, status, content):
+    # 성공 응답의 JSON 을 돌려주고, 아니면 종류에 맞는 ApiError 를 올린다
+    if status == 429:
+        raise ApiRateLimited('요청 한도 초과', endpoint, 'http_429')
+    if status >= 500:
+        raise ApiServerError(f'서버 오류 (HTTP {status})', endpoint, f'http_{status}')
+    try:
+        data = json.loads(content.decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise ApiServerError(f'잘못된 응답 (HTTP {status})', endpoint, 'invalid_json') from None
+    if data.get('result') != 'success':
+        code = data.get('error_code', 'unknown')
+        raise ApiRejected(f"API 요청 오류: 코드 {code}, 메시지: {data.get('error_msg', '')}", endpoint, code)
+    return data
+
+
+RetryPolicy = namedtuple('RetryPolicy', ['attempts', 'base_delay', 'max_delay'])
+READ_RETRY = RetryPolicy(3, 0.1, 1.0)
+ORDER_RETRY = RetryPolicy(3, 0.2, 1.0)
+
+
+def backoff(policy, attempt):
+    # full jitter: 0 ~ min(max_delay, base_delay * 2^attempt) 사이에서 무작위
+    return random.uniform(0, min(policy.max_delay, policy.base_delay * 2 ** attempt))
+
+
+def _wait_backoff(policy, attempt, deadline):
+    # 다음 시도 전에 쉰다. 쉬고 나면 마감이라 다시 보낼 수 없으면 False
+    delay = backoff(policy, attempt)
+    if delay >= deadline.remaining():
+        return False
+    time.sleep(delay)
+    return True
+
+
+def call_with_retry(call, deadline, policy=READ_RETRY, on_retry=None):
+    # call() 을 다시 보내도 되는 실패에 한해 마감 시간 안에서 재시도한다 (조회, 취소처럼 결과가 같은 요청용)
+    for attempt in range(policy.attempts):
+        try:
+            return call()
+        except ApiError as e:
+            if not e.retryable or attempt + 1 >= policy.attempts or not _wait_backoff(policy, attempt, deadline):
+                raise
+            if on_retry is not None:
+                on_retry(e)
+
+
+def _lookup(lookup):
+    # 확인 조회 자체가 실패하면 모르는 것으로 본다 (다시 보내도 거래소가 중복 user_order_id 를 거절한다)
+    try:
+        return lookup()
+    except ApiError:
+        return None
+
+
+def submit_idempotent(send, lookup, deadline, policy=ORDER_RETRY, on_retry=None):
+    # send(): 같은 user_order_id 로 주문을 보낸다 (매번 새 nonce)
+    # lookup(): 그 user_order_id 의 주문이 이미 접수됐으면 주문 정보(dict), 아니면 None
+    # 결과가 애매했던 뒤에는 다시 보내기 전에 lookup 으로 접수 여부부터 확인한다.
+    uncertain = None  # 접수 여부를 모르는 마지막 실패
+    for attempt in range(policy.attempts):
+        try:
+            return send()
+        except ApiRejected:
+            # 앞선 요청이 접수돼서 중복 user_order_id 로 거절됐을 수 있다
+            found = _lookup(lookup) if uncertain is not None else None
+            if found is not None:
+                return found
+            raise
+        except ApiError as e:
+            last = e
+            if e.ambiguous:
+                uncertain = e
+            if not e.retryable or attempt + 1 >= policy.attempts or not _wait_backoff(policy, attempt, deadline):
+                break
+            if uncertain is not None:
+                found = _lookup(lookup)
+                if found is not None:
+                    return found
+            if on_retry is not None:
+                on_retry(e)
+    if uncertain is not None:
+        found = _lookup(lookup)
+        if found is not None:
+            return found
+    raise last
+
+
+def wait_hedged(start, deadline, hedge_after=None, on_hedge=None):
+    # start(primary) -> Future. hedge_after 초 안에 끝나지 않으면 같은 요청을 한 번 더 보내고 먼저 성공한 결과를 쓴다.
+    # 둘 다 실패하면 마지막 실패를 올린다. 다시 보내도 결과가 같은 조회에만 쓴다.
+    pending = {start(True)}
+    hedged = hedge_after is None
+    error = None
+    while pending:
+        timeout = deadline.remaining() if hedged else min(hedge_after, deadline.remaining())
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+        if not done and not hedged and not deadline.expired():
+            hedged = True
+            pending.add(start(False))
+            if on_hedge is not None:
+                on_hedge()
+        elif not done:
+            raise DeadlineExceeded('마감 시간 초과')
+    raise error
@@ -1,65 +1,131 @@
-import streamlit as st
-import uuid  # 파일 상단에 이 줄을 추가해주세요
+import time
 
+import streamlit as st
 
 # Streamlit UI 설정
 st.set_page_config(layout="wide")
+SCRIPT_START = time.perf_counter()  # 첫 화면까지 걸린 시간 측정용
+st.session_state.run_memo = {}  # 이번 실행 동안의 계좌 조회 결과 (read_private)
 
-from datetime import datetime, timedelta
-
-import requests
-import pandas as pd
-import json
-import uuid
-import base64
+# pandas 는 표를 만들 때만 불러오고, git 은 첫 스냅샷 커밋 때 불러온다 (시작 시간 단축)
+import atexit
+import functools
 import hashlib
-import hmac
-import httplib2
-import time
-import math
 import json
+import math
 import os
-from datetime import datetime
-from git import Repo
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+import requests
+
+from api_retry import (ORDER_DEADLINE, ORDER_RETRY, READ_DEADLINE, READ_RETRY, ApiError, ApiRejected, Deadline,
+                       DeadlineExceeded, as_api_error, call_with_retry, parse_response, submit_idempotent,
+                       wait_hedged)
+from book_log import MAX_SPEED, BookLog, BookRecorder, ReplayEngine
+from coinone_api import API_URL, READ_TIMEOUT, CoinoneClient
+from execution import STRATEGIES, SlicedExecution
+from fast_order import FastOrderPath, format_price
+from fill_tracker import FillTracker
+from market_data import CoinoneWebSocketFeed, MarketDataService, ReplayFeed, RestPollingFeed, stream_url
+from markets import DEFAULT_MARKET, Market, MarketRegistry, fetch_tickers, parse_market, price_tick
+from metrics import ApiMetrics, PayloadLogger, start_metrics_server
+from order_batch import DISTRIBUTIONS, build_ladder, run_concurrently
+from order_journal import GitSnapshotter, OrderJournal, migrate_json_log
+from order_store import OrderStore
+from order_table import PAGE_SIZE, SORTS, OrderTable, page_count, page_of
+from paper_exchange import PaperClient, PaperExchange
+from pnl import PnlLedger
+from price_history import PriceHistory, downsample_ohlc
+from request_scheduler import PRIORITY_ORDER, PRIORITY_READ, RequestScheduler
+from shared_cache import TTLCache
+from triggers import KINDS, TriggerEngine, direction_for
 
 # Git 저장소 설정
 REPO_PATH = '.'  # 현재 디렉토리를 저장소로 사용
-LOG_FILE = 'order_logs.json'
-
-def init_git_repo():
-    if not os.path.exists(os.path.join(REPO_PATH, '.git')):
-        repo = Repo.init(REPO_PATH)
-        # 초기 커밋 생성
-        open(os.path.join(REPO_PATH, LOG_FILE), 'a').close()  # 빈 로그 파일 생성
-        repo.index.add([LOG_FILE])
-        repo.index.commit("Initial commit with empty log file")
-    else:
-        repo = Repo(REPO_PATH)
-    return repo
-
-repo = init_git_repo()
+LEGACY_LOG_FILE = 'order_logs.json'  # 예전 JSON 배열 형식 로그
+LOG_FILE = 'order_logs.jsonl'  # 추가 전용 주문 저널
+
+# 주문 저널과 Git 스냅샷 작업자 (프로세스 전체 공유)
+@st.cache_resource
+def get_order_journal():
+    journal = OrderJournal(os.path.join(REPO_PATH, LOG_FILE))
+    migrate_json_log(os.path.join(REPO_PATH, LEGACY_LOG_FILE), journal)
+    snapshotter = GitSnapshotter(REPO_PATH, LOG_FILE)
+    journal.add_listener(snapshotter.notify)
+    return journal
 
 def load_order_log():
-    try:
-        with open(os.path.join(REPO_PATH, LOG_FILE), 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
+    return get_order_journal().read_all()
+
+# 주문 내역 색인 저장소 (저널에서 새로 추가된 부분만 적재)
+HISTORY_DB_FILE = 'order_history.db'
+HISTORY_PAGE_SIZE = 20
+
+@st.cache_resource
+def get_order_store():
+    return OrderStore(os.path.join(REPO_PATH, HISTORY_DB_FILE))
+
+def sync_order_store():
+    store = get_order_store()
+    store.sync(get_order_journal())
+    return store
 
 def save_order_log(log_data):
-    logs = load_order_log()
-    logs.append(log_data)
-    logs = logs[-100:]  # 최근 100개의 로그만 유지
-    
-    with open(os.path.join(REPO_PATH, LOG_FILE), 'w') as f:
-        json.dump(logs, f, indent=2)
-    
-    repo.index.add([LOG_FILE])
-    repo.index.commit(f"Update log: {datetime.now().isoformat()}")
+    # fsync 된 한 줄 추가만 수행하고, Git 커밋은 백그라운드에서 모아서 처리
+    get_order_journal().append(log_data)
 
 # 사용자 정보 (토큰 및 키) - secrets.toml에서 가져오기
 ACCESS_TOKEN = st.secrets.get("access_key", "")
 SECRET_KEY = bytes(st.secrets.get("private_key", ""), 'utf-8')
+ACCOUNT_ID = hashlib.sha256(ACCESS_TOKEN.encode('utf-8')).hexdigest()[:12]  # 캐시 키용 계정 구분자
+
+# API 지표 (프로세스 전체 공유). secrets 의 metrics_port 를 지정하면 /metrics 로 내보낸다.
+@st.cache_resource
+def get_api_metrics():
+    metrics = ApiMetrics()
+    port = int(st.secrets.get("metrics_port", 0))
+    if port:
+        start_metrics_server(metrics, port)
+    return metrics
+
+# 모의 거래 모드: secrets 의 paper_trading = true 이면 주문/취소/미체결/잔고 요청을 프로세스 안의 체결 엔진이 처리한다.
+# 시작 잔고는 paper_balances (예: {KRW = 10000000, USDT = 0}), 수수료율은 paper_fee_rate. 호가는 실시간/녹화 호가를 쓴다.
+PAPER_TRADING = bool(st.secrets.get("paper_trading", False))
+
+@st.cache_resource
+def get_paper_exchange():
+    return PaperExchange(dict(st.secrets.get("paper_balances", {"KRW": 10_000_000})),
+                         fee_rate=float(st.secrets.get("paper_fee_rate", 0)))
+
+# 프로세스 전체에서 공유하는 API 클라이언트 (keep-alive 커넥션 풀)
+# 요청/응답 본문 로그는 secrets 의 verbose_log_rate (0~1) 비율만큼만 남긴다 (기본: 끔)
+@st.cache_resource
+def get_client():
+    client = CoinoneClient(ACCESS_TOKEN, SECRET_KEY, base_url=st.secrets.get("api_url", API_URL),
+                           metrics=get_api_metrics(),
+                           payload_logger=PayloadLogger(float(st.secrets.get("verbose_log_rate", 0))))
+    if PAPER_TRADING:
+        # 공개 요청(호가, 시세, 캔들)은 그대로 실제 API 로 보낸다
+        return PaperClient(get_paper_exchange(), client, metrics=get_api_metrics())
+    return client
+
+# 관심 마켓 목록 (프로세스 전체 공유). secrets 의 markets 로 초기값 지정 (예: markets = ["USDT", "BTC"])
+@st.cache_resource
+def get_market_registry():
+    markets = [parse_market(m) for m in st.secrets.get("markets", [])] or [DEFAULT_MARKET]
+    return MarketRegistry(markets)
+
+# 현재 세션에서 선택한 마켓
+def current_market():
+    market = st.session_state.get('market')
+    if market not in get_market_registry().watched():
+        market = st.session_state.market = get_market_registry().watched()[0]
+    return market
 
 # # 로컬 환경에서 secrets.toml 파일 로드 (이 부분은 Streamlit Cloud에서는 실행되지 않음)
 # if not os.getenv('STREAMLIT_SERVER_URL'):  # Streamlit Cloud에서 실행 중이 아닐 때
@@ -71,74 +137,85 @@ SECRET_KEY = bytes(st.secrets.get("private_key", ""), 'utf-8')
 #     except ImportError:
 #         st.warning("dotenv 모듈을 찾을 수 없습니다. 로컬 환경에서 실행 중이라면 'pip install python-dotenv'를 실행하세요.")
 
-def fetch_order_detail(order_id):
+def query_order_detail(order_id, market=DEFAULT_MARKET):
+    # 화면 출력 없는 주문 상세 조회 (백그라운드 스레드에서도 사용). 실패 시 None
     action = "/v2.1/order/detail"
     payload = {
         "access_token": ACCESS_TOKEN,
         "nonce": str(uuid.uuid4()),
         "order_id": order_id,
-        "quote_currency": "KRW",
-        "target_currency": "USDT"
+        "quote_currency": market.quote,
+        "target_currency": market.target
     }
 
-    result = get_response(action, payload)
+    try:
+        return get_response(action, payload).get('order')
+    except ApiError:
+        return None
 
-    if result and result.get('result') == 'success':
-        return result.get('order')
-    else:
+def fetch_order_detail(order_id, market=None):
+    order = query_order_detail(order_id, market or current_market())
+    if order is None:
         st.error("주문 조회 오류 발생")
-        return None
+    return order
 
-    
-def get_encoded_payload(payload):
-    payload['nonce'] = str(uuid.uuid4())  # nonce 추가
-    dumped_json = json.dumps(payload)
-    encoded_json = base64.b64encode(dumped_json.encode('utf-8'))  # UTF-8 인코딩 추가
-    return encoded_json.decode('utf-8')  # 결과를 문자열로 디코딩
-
-def get_signature(encoded_payload):
-    signature = hmac.new(SECRET_KEY, encoded_payload.encode('utf-8'), hashlib.sha512)  # encoded_payload 인코딩
-    return signature.hexdigest()
-
-def get_response(action, payload):
-    url = f'https://api.coinone.co.kr{action}'
-    encoded_payload = get_encoded_payload(payload)
-    headers = {
-        'Content-type': 'application/json',
-        'X-COINONE-PAYLOAD': encoded_payload,
-        'X-COINONE-SIGNATURE': get_signature(encoded_payload),
-    }
 
-    http = httplib2.Http()
-    response, content = http.request(url, 'POST', body=encoded_payload, headers=headers)
+# 요청 스케줄러 (프로세스 전체 공유). 주문/취소가 조회보다 항상 먼저 나간다.
+ORDER_ACTIONS = {"/v2.1/order", "/v2.1/order/cancel"}
 
-    print(f"HTTP Status Code: {response.status}")
-    try:
-        json_content = json.loads(content.decode('utf-8'))
+@st.cache_resource
+def get_scheduler():
+    return RequestScheduler()
+
+# 조회 응답이 이 시간(ms) 안에 오지 않으면 같은 조회를 한 번 더 보낸다 (헤지). 0 이면 끔
+HEDGE_AFTER = float(st.secrets.get("hedge_reads_after_ms", 0)) / 1000 or None
+
+def get_response(action, payload, send=None, deadline=None):
+    # 성공 응답(JSON)을 돌려주고, 실패는 종류별 ApiError 로 올린다 (api_retry 참고)
+    # send: send(timeout) 으로 이미 인코딩/서명한 요청을 보내는 함수 (원클릭 주문 경로). 없으면 payload 를 인코딩해서 보낸다.
+    # deadline: 대기/재시도를 포함한 전체 마감 시간. 주문/취소는 여기서 다시 보내지 않는다 (submit_order, submit_cancel 에서).
+    client = get_client()
+    metrics = get_api_metrics()
+    if send is None:
+        # 재시도/헤지 요청마다 nonce 를 새로 붙이도록 payload 를 복사해서 인코딩한다
+        send = lambda timeout: client.post_private(action, dict(payload), timeout)
+
+    def attempt():
+        # 큐에서 기다리다 마감이 지난 요청은 보내지 않는다
+        try:
+            status, content = send(deadline.timeout(READ_TIMEOUT))
+        except requests.RequestException as e:
+            raise as_api_error(action, e) from e
+        try:
+            json_content = parse_response(action, status, content)
+        except ApiError as e:
+            if e.code is not None and not e.code.startswith('http_'):
+                metrics.record_error(action, e.code)
+            raise
         if 'balances' in json_content:
-            filtered_balances = [balance for balance in json_content['balances'] if balance['currency'] in ['KRW', 'USDT']]
+            currencies = get_market_registry().currencies()
+            filtered_balances = [balance for balance in json_content['balances'] if balance['currency'].upper() in currencies]
             json_content['balances'] = filtered_balances
-        
-        print(f"Filtered Response Content: {json.dumps(json_content, indent=2)}")
         return json_content
-    except json.JSONDecodeError:
-        print(f"Response Content (raw): {content.decode('utf-8')}")
-        return None
 
-    try:
-        json_content = json.loads(content.decode('utf-8'))
-        if response.status == 200 and json_content.get('result') == 'success':
-            return json_content
-        else:
-            error_code = json_content.get('error_code', 'Unknown error code')
-            error_msg = json_content.get('error_msg', 'Unknown error message')
-            st.error(f"API 요청 오류: 코드 {error_code}, 메시지: {error_msg}")
-            return None
-    except json.JSONDecodeError as e:
-        st.error(f"JSONDecodeError: {e}")
-        st.error(f"Response content: {content.decode('utf-8')}")
-        return None
-    
+    if action in ORDER_ACTIONS:
+        deadline = deadline or Deadline(ORDER_DEADLINE)
+        try:
+            # 앞선 대기 요청이 없고 토큰이 남아 있으면 스레드 전환 없이 바로 보낸다
+            return get_scheduler().run_inline("order", attempt, priority=PRIORITY_ORDER, timeout=deadline.remaining())
+        except FutureTimeoutError:
+            raise DeadlineExceeded('요청 대기 중 마감 시간 초과', action) from None
+
+    deadline = deadline or Deadline(READ_DEADLINE)
+    # 같은 내용의 조회가 이미 진행 중이면 그 결과를 함께 받는다 (헤지 요청은 따로 보낸다)
+    key = (action, json.dumps({k: v for k, v in payload.items() if k != 'nonce'}, sort_keys=True))
+
+    def start(primary):
+        return get_scheduler().submit("read", attempt, priority=PRIORITY_READ, coalesce_key=key if primary else None)
+
+    return call_with_retry(lambda: wait_hedged(start, deadline, HEDGE_AFTER, on_hedge=lambda: metrics.record_hedge(action)),
+                           deadline, READ_RETRY, on_retry=lambda e: metrics.record_retry(action))
+
 
 def save_log(log_data):
     try:
@@ -161,62 +238,185 @@ def save_log(log_data):
 
         
 
-# 호가 조회 함수
-def fetch_order_book():
-    url = "https://api.coinone.co.kr/public/v2/orderbook/KRW/USDT?size=5"
-    headers = {"accept": "application/json"}
-    response = requests.get(url, headers=headers)
-
-    if response.status_code == 200:
-        data = response.json()
-        if data.get('result') == 'success':
-            bids = data.get('bids', [])
-            asks = data.get('asks', [])
-            bids_df = pd.DataFrame(bids)
-            asks_df = pd.DataFrame(asks)
-
-            bids_df['price'] = pd.to_numeric(bids_df['price'])
-            bids_df['qty'] = pd.to_numeric(bids_df['qty'])
-            asks_df['price'] = pd.to_numeric(asks_df['price'])
-            asks_df['qty'] = pd.to_numeric(asks_df['qty'])
-
-            asks_df = asks_df.iloc[::-1]  # 매도 호가 역순 정렬
-            return bids_df.head(5), asks_df.head(5)  # 상위 5개만 표시
-        else:
-            st.error(f"API returned an error: {data.get('error_code', 'Unknown error')}")
+# 공개 API 응답 공유 캐시 (모든 세션이 같은 스냅샷을 읽는다)
+PUBLIC_CACHE_TTL = 0.5  # 초
+
+@st.cache_resource
+def get_public_cache():
+    return TTLCache(ttl=PUBLIC_CACHE_TTL, maxsize=256)
+
+def fetch_public(path, params=None, ttl=None):
+    key = (path, tuple(sorted((params or {}).items())))
+    return get_public_cache().get_or_load(key, lambda: get_client().get_public(path, params=params).json(), ttl=ttl)
+
+# 체결/캔들 이력 수집기 (마켓별로 하나씩 프로세스 전체 공유). 로컬에 쌓아 두고 재시작하면 이어서 받는다.
+# secrets: history_dir (기본 price_history), history_intervals (기본 ["1m", "1h", "1d"])
+@st.cache_resource
+def get_price_history(market=DEFAULT_MARKET):
+    client = get_client()
+    return PriceHistory(lambda path, params=None: client.get_public(path, params=params).json(),
+                        st.secrets.get("history_dir", "price_history"), market,
+                        intervals=tuple(st.secrets.get("history_intervals", ["1m", "1h", "1d"]))).start()
+
+# 호가 스트리밍 서비스 (마켓별로 하나씩 프로세스 전체 공유, 백그라운드에서 호가창 유지)
+# secrets: orderbook_replay (녹화 파일 .obl / .jsonl 을 실시간 대신 재생), orderbook_replay_speed (기본 1),
+#          orderbook_record_dir (지정하면 받은 호가를 <마켓>.obl 로 녹화), ws_url (기본: api_url 에 맞는 주소)
+@st.cache_resource
+def get_market_data(market=DEFAULT_MARKET):
+    rest_feed = RestPollingFeed(get_client(), market.quote, market.target, cache=get_public_cache())
+    replay_path = st.secrets.get("orderbook_replay", "")
+    recorder = None
+    if replay_path.endswith('.obl'):
+        feed = ReplayEngine(BookLog(replay_path), speed=st.secrets.get("orderbook_replay_speed", 1))
+    elif replay_path:
+        feed = ReplayFeed(replay_path, speed=1)
     else:
-        st.error(f"Failed to fetch data from API. Status code: {response.status_code}")
-    return None, None
+        try:
+            # 웹소켓 주소는 ws_url 이 없으면 api_url 에서 정한다 (모의 서버도 같은 호스트로)
+            url = st.secrets.get("ws_url") or stream_url(st.secrets.get("api_url", API_URL))
+            feed = CoinoneWebSocketFeed(market.quote, market.target, rest_feed=rest_feed, url=url)
+        except ImportError:
+            feed = rest_feed
+        record_dir = st.secrets.get("orderbook_record_dir", "")
+        if record_dir:
+            os.makedirs(record_dir, exist_ok=True)
+            recorder = BookRecorder(os.path.join(record_dir, f'{market.quote}_{market.target}.obl'))
+    service = MarketDataService(feed, recorder=recorder)
+    # 호가가 바뀔 때마다 이번에 넘어선 조건부 주문만 꺼내서 보낸다
+    triggers = get_trigger_engine()
+    service.add_listener(lambda s: triggers.on_book(market, *s.best_bid_ask()))
+    pnl = get_pnl_ledger()
+    service.add_listener(lambda s: pnl.mark(market, *s.best_bid_ask()))  # 평가 손익 기준 가격
+    service.start()
+    if PAPER_TRADING:
+        get_paper_exchange().attach_book(market, service)  # 모의 주문은 이 호가를 상대로 체결된다
+    return service
+
+# 호가 조회 함수 (메모리의 호가창에서 읽기 - 네트워크 호출 없음)
+def fetch_order_book(market=None):
+    market = market or current_market()
+    market_data = get_market_data(market)
+    # 첫 호가를 기다리지 않는다 (도착하면 finish_first_paint 에서 다시 그린다)
+    # 호가창이 바뀔 때만 배열 스냅샷을 다시 만들고, 모든 세션이 같은 결과를 공유한다
+    book = get_public_cache().get_or_load(("orderbook_snapshot", market, 5, market_data.updates),
+                                          lambda: market_data.snapshot(5))
+    if not book and market_data.last_error:
+        st.error(f"호가 정보를 아직 받지 못했습니다. {market_data.last_error}")
+    return book
+
+# 관심 마켓 시세 일괄 조회 (호가 통화별 전체 시세 한 번으로 모든 관심 마켓을 채운다)
+def fetch_watchlist():
+    import pandas as pd
+
+    markets = get_market_registry().watched()
+    try:
+        tickers = fetch_tickers(fetch_public, markets)
+    except Exception as e:
+        st.error(f"시세 조회 오류 발생: {e}")
+        return None
+    rows = []
+    for market in markets:
+        ticker = tickers.get(market)
+        if ticker is None:
+            continue
+        best_bid = (ticker.get('best_bids') or [{}])[0].get('price')
+        best_ask = (ticker.get('best_asks') or [{}])[0].get('price')
+        rows.append({
+            '마켓': str(market),
+            '현재가': float(ticker.get('last') or 0),
+            '매수 호가': float(best_bid or 0),
+            '매도 호가': float(best_ask or 0),
+            '거래량': float(ticker.get('target_volume') or 0),
+        })
+    return pd.DataFrame(rows)
+
+# 계좌 상태(잔고, 미체결 주문) 캐시 (프로세스 전체 공유, 계정/마켓별)
+# 우리 주문/취소와 체결 알림이 오면 바로 무효화하고, 그 밖의 변화(다른 기기에서의 거래 등)는
+# 긴 TTL 이 지나면 다시 조회해서 반영한다. 한 번의 실행 안에서 같은 조회는 run_memo 로 한 번만 한다.
+PRIVATE_CACHE_TTL = 30.0  # 초
+
+@st.cache_resource
+def get_private_cache():
+    return TTLCache(ttl=PRIVATE_CACHE_TTL, maxsize=64)
+
+def balances_key():
+    return ('balances', ACCOUNT_ID)
+
+def orders_key(market):
+    return ('orders', ACCOUNT_ID, market)
+
+def read_private(key, loader):
+    memo = st.session_state.setdefault('run_memo', {})
+    if key not in memo:
+        memo[key] = get_private_cache().get_or_load(key, loader)
+    return memo[key]
+
+def invalidate_private(market=None):
+    # 잔고와 (market 이 있으면) 그 마켓의 미체결 주문을 다시 조회하게 한다. 체결 추적 스레드에서도 호출된다.
+    keys = [balances_key()] + ([orders_key(market)] if market is not None else [])
+    cache = get_private_cache()
+    for key in keys:
+        cache.invalidate(key)
+    if get_script_run_ctx(suppress_warning=True) is not None:
+        memo = st.session_state.get('run_memo', {})
+        for key in keys:
+            memo.pop(key, None)
+
+class PrivateReadError(Exception):
+    pass
 
 # 전체 잔고 조회 함수
-def fetch_balances():
+def query_balances():
+    # 화면 출력 없는 잔고 조회. 실패 시 PrivateReadError (캐시에 남기지 않는다)
     action = '/v2.1/account/balance/all'
     payload = {'access_token': ACCESS_TOKEN}
-    result = get_response(action, payload)
+    try:
+        result = get_response(action, payload)
+    except ApiError as e:
+        raise PrivateReadError(f"잔고 조회 오류 발생: {e}") from e
 
     if result:
         balances = result.get('balances', [])
+        currencies = {c.lower() for c in get_market_registry().currencies()}
         filtered_balances = {}
         for balance in balances:
             currency = balance.get('currency', '').lower()
-            if currency in ['krw', 'usdt']:
+            if currency in currencies:
                 filtered_balances[currency] = {
                     'available': float(balance.get('available', '0')),
                     'limit': float(balance.get('limit', '0')),
                     'total': float(balance.get('available', '0')) + float(balance.get('limit', '0'))
                 }
         return filtered_balances
-    else:
-        st.error("잔고 조회 오류 발생")
+    raise PrivateReadError("잔고 조회 오류 발생")
+
+def fetch_balances(fresh=False):
+    if fresh:
+        invalidate_private()
+    try:
+        return read_private(balances_key(), query_balances)
+    except PrivateReadError as e:
+        st.error(str(e))
         return {}
 
+# 마켓별 주문 전송 경로 (본문 앞부분 / 서명 상태 / 검증 기준을 미리 준비, 프로세스 전체 공유)
+@st.cache_resource
+def get_order_path(market):
+    return FastOrderPath(get_client(), ACCESS_TOKEN, market)
+
 # 매수/매도 주문 함수
-def place_order(order_type, side, price, quantity):
+def submit_order(order_type, side, price, quantity, market=DEFAULT_MARKET, user_order_id=None):
+    # 검증, 전송, 로그 저장만 수행하고 화면 출력은 호출한 쪽에서 한다 (일괄 주문 스레드에서도 사용)
+    # user_order_id: 재전송해도 같은 주문으로 묶이는 클라이언트 주문 ID (없으면 새로 만든다)
     action = "/v2.1/order"
     order_uuid = str(uuid.uuid4())
+    user_order_id = user_order_id or order_uuid.replace('-', '')
     log_data = {
         "timestamp": datetime.now().isoformat(),
         "uuid": order_uuid,
+        "user_order_id": user_order_id,
+        "quote_currency": market.quote,
+        "target_currency": market.target,
         "order_type": order_type,
         "side": side,
         "price": price,
@@ -225,203 +425,624 @@ def place_order(order_type, side, price, quantity):
     }
 
     try:
-        payload = {
-            "access_token": ACCESS_TOKEN,
-            "nonce": order_uuid,
-            "side": side,
-            "quote_currency": "KRW",
-            "target_currency": "USDT",
-            "type": order_type,
-            "price": f"{float(price):.2f}",
-            "qty": f"{float(quantity):.4f}",
-            "post_only": False  # 이 줄을 추가합니다
-        }
-
-        # 최소 주문 기준 설정
-        MIN_ORDER_AMOUNT_KRW = 1000
-        MIN_ORDER_QTY_USDT = 0.001
-
-        price_value = float(price)
-        quantity_value = float(quantity)
-
-        if price_value <= 0 or quantity_value <= 0:
-            raise ValueError("가격 및 수량은 0보다 커야 합니다.")
-        
-        if price_value * quantity_value < MIN_ORDER_AMOUNT_KRW:
-            raise ValueError(f"주문 금액이 최소 금액 {MIN_ORDER_AMOUNT_KRW} KRW보다 작습니다.")
-
-        if quantity_value < MIN_ORDER_QTY_USDT:
-            raise ValueError(f"주문 수량이 최소 수량 {MIN_ORDER_QTY_USDT} USDT보다 작습니다.")
-
-        result = get_response(action, payload)
-
-        if result and result.get('result') == 'success':
-            order_id = result.get('order_id')
-            st.success(f"{side} 주문이 성공적으로 접수되었습니다. 주문 ID: {order_id}")
-            log_data["status"] = "success"
-            log_data["order_id"] = order_id
-            log_data["response"] = result
-            
-            # 여기서 로그를 저장하고 Git에 커밋
-            save_order_log(log_data)
-            
-            if 'order_tracking' not in st.session_state:
-                st.session_state.order_tracking = {}
-            st.session_state.order_tracking[order_uuid] = {
-                'order_id': order_id,
-                'status': 'pending',
-                'side': side,
-                'type': order_type,
-                'price': price,
-                'quantity': quantity
-            }
-            
-            st.session_state.orders = fetch_active_orders()
-            
-            st.rerun()
-        else:
-            st.error("주문 오류 발생")
-            log_data["status"] = "api_error"
-            log_data["error_message"] = "API 응답 실패"
-            # 에러 로그도 저장하고 Git에 커밋
-            save_order_log(log_data)
-
+        # 검증 기준과 본문 앞부분/서명 상태는 마켓별로 미리 준비돼 있어서 가격/수량/nonce 만 채워 서명한다
+        order_path = get_order_path(market)
+        extra = f'"user_order_id": "{user_order_id}", '
+        deadline = Deadline(ORDER_DEADLINE)
+
+        def send():
+            # 재전송할 때도 user_order_id 는 그대로, nonce 만 새로
+            encoded_payload, signature = order_path.prepare(side, price, quantity, str(uuid.uuid4()), order_type, extra)
+            return get_response(action, None, deadline=deadline,
+                                send=lambda timeout: order_path.send(encoded_payload, signature, timeout))
+
+        result = submit_idempotent(send, lambda: find_submitted_order(user_order_id, market), deadline,
+                                   on_retry=lambda e: get_api_metrics().record_retry(action))
+        invalidate_private(market)
+        log_data["status"] = "success"
+        log_data["order_id"] = result.get('order_id')
+        log_data["response"] = result
+
+    except ApiError as e:
+        # ambiguous: 응답을 못 받았고 접수 여부도 확인하지 못했다
+        log_data["status"] = "unknown" if e.ambiguous else "api_error"
+        log_data["error_message"] = str(e)
+        if e.ambiguous:
+            invalidate_private(market)
     except ValueError as e:
-        st.error(f"입력 오류: {e}")
         log_data["status"] = "input_error"
         log_data["error_message"] = str(e)
-        # 에러 로그도 저장하고 Git에 커밋
-        save_order_log(log_data)
     except Exception as e:
-        st.error(f"주문 처리 중 오류 발생: {e}")
         log_data["status"] = "processing_error"
         log_data["error_message"] = str(e)
-        # 에러 로그도 저장하고 Git에 커밋
-        save_order_log(log_data)
 
-    return log_data["status"] == "success"
+    # 성공/실패 모두 로그 저장 (저널에 추가, Git 커밋은 백그라운드)
+    save_order_log(log_data)
+    return log_data
+
+def find_submitted_order(user_order_id, market):
+    # 응답을 못 받은 주문이 실제로 접수됐는지 확인한다. 미체결 목록에 없으면 (바로 체결됐을 수 있으니)
+    # user_order_id 로 상세 조회한다. 접수된 적 없으면 None
+    deadline = Deadline(READ_DEADLINE)
+    result = get_response("/v2.1/order/active_orders", {
+        "access_token": ACCESS_TOKEN,
+        "quote_currency": market.quote,
+        "target_currency": market.target
+    }, deadline=deadline)
+    for order in result.get('active_orders', []):
+        if order.get('user_order_id') == user_order_id:
+            return {'result': 'success', 'order_id': order.get('order_id'), 'reconciled': True}
+    try:
+        result = get_response("/v2.1/order/detail", {
+            "access_token": ACCESS_TOKEN,
+            "user_order_id": user_order_id,
+            "quote_currency": market.quote,
+            "target_currency": market.target
+        }, deadline=deadline)
+    except ApiRejected:
+        return None
+    return {'result': 'success', 'order_id': result['order'].get('order_id'), 'reconciled': True}
+
+# 조건부 주문 (손절 / 익절 / OCO) 감시 엔진 (프로세스 전체 공유). 걸어 둔 조건은 TRIGGER_FILE 에 남아 재시작해도 유지된다.
+TRIGGER_FILE = 'triggers.jsonl'
+
+@st.cache_resource
+def get_trigger_engine():
+    return TriggerEngine(os.path.join(REPO_PATH, TRIGGER_FILE), fire_trigger,
+                         executor=ThreadPoolExecutor(max_workers=4, thread_name_prefix="trigger"))
+
+def fire_trigger(trigger):
+    # 발동한 조건의 지정가 주문을 원클릭 주문 경로로 보낸다 (user_order_id 는 조건 ID 라 두 번 접수되지 않는다)
+    market = Market(trigger.quote, trigger.target)
+    qty_decimals = get_order_path(market).limits.qty_decimals
+    log_data = submit_order("LIMIT", trigger.side, trigger.price, f"{trigger.qty:.{qty_decimals}f}", market,
+                            user_order_id=trigger.trigger_id)
+    if log_data["status"] == "success":
+        get_fill_tracker().track(log_data["uuid"], log_data.get("order_id"), {
+            'side': trigger.side, 'type': f"{trigger.kind.upper()}_LIMIT", 'price': trigger.price,
+            'quantity': trigger.qty, 'market': market})
+    return {'status': log_data["status"], 'order_id': log_data.get("order_id"),
+            'error_message': log_data.get("error_message")}
+
+def arm_stop_order(side, stop_price, price, quantity, market=None):
+    # 스탑 지정가: 기준 가격(매도는 최우선 매수호가, 매수는 최우선 매도호가)이 감시 가격에 닿으면 지정가 주문
+    market = market or current_market()
+    try:
+        stop_price, price, quantity = float(str(stop_price).replace(',', '')), float(price), float(quantity)
+        if stop_price <= 0:
+            raise ValueError("감시 가격은 0보다 커야 합니다.")
+        get_order_path(market).validate(price, quantity)
+    except (TypeError, ValueError) as e:
+        st.error(f"입력 오류: {e}")
+        return None
+    best_bid, best_ask = get_market_data(market).best_bid_ask()
+    try:
+        direction = direction_for('stop', side, best_bid if side == 'SELL' else best_ask, stop_price)
+    except ValueError as e:
+        st.error(str(e))
+        return None
+    trigger = get_trigger_engine().arm(market, 'stop', side, stop_price, price, quantity, direction=direction)
+    st.success(f"스탑 주문 등록: 기준 가격이 {stop_price:,.2f} {'이상' if direction == 'above' else '이하'}가 되면 "
+               f"{price:,.2f} 에 {quantity} {market.target} {side}")
+    return trigger
+
+def track_order(log_data):
+    if 'order_tracking' not in st.session_state:
+        st.session_state.order_tracking = {}
+    st.session_state.order_tracking[log_data["uuid"]] = {
+        'order_id': log_data.get("order_id"),
+        'status': 'pending',
+        'side': log_data["side"],
+        'type': log_data["order_type"],
+        'price': log_data["price"],
+        'quantity': log_data["quantity"],
+        'market': Market(log_data.get("quote_currency", "KRW"), log_data.get("target_currency", "USDT"))
+    }
+    get_fill_tracker().track(log_data["uuid"], log_data.get("order_id"),
+                             st.session_state.order_tracking[log_data["uuid"]])
+
+def place_order(order_type, side, price, quantity, market=None):
+    market = market or current_market()
+    log_data = submit_order(order_type, side, price, quantity, market)
+    status = log_data["status"]
+
+    if status == "success":
+        st.success(f"{side} 주문이 성공적으로 접수되었습니다. 주문 ID: {log_data['order_id']}")
+        track_order(log_data)
+        invalidate_panels('orders', 'balances')
+    elif status == "unknown":
+        st.warning(f"주문 응답을 받지 못했고 접수 여부도 확인하지 못했습니다. 미체결 주문 목록을 확인하세요. "
+                   f"(user_order_id: {log_data['user_order_id']})")
+        invalidate_panels('orders', 'balances')
+    elif status == "api_error":
+        st.error(f"주문 오류 발생: {log_data['error_message']}")
+    elif status == "input_error":
+        st.error(f"입력 오류: {log_data['error_message']}")
+    else:
+        st.error(f"주문 처리 중 오류 발생: {log_data['error_message']}")
+
+    return status == "success"
 
 
 # 미체결 주문 조회 함수
-def fetch_active_orders():
+def query_active_orders(market=DEFAULT_MARKET):
+    # 화면 출력 없는 미체결 주문 조회 (백그라운드 스레드에서도 사용). 실패 시 None
     action = "/v2.1/order/active_orders"
     payload = {
         "access_token": ACCESS_TOKEN,
         "nonce": str(uuid.uuid4()),
-        "quote_currency": "KRW",
-        "target_currency": "USDT"
+        "quote_currency": market.quote,
+        "target_currency": market.target
     }
 
-    result = get_response(action, payload)
+    try:
+        return get_response(action, payload).get('active_orders', [])
+    except ApiError:
+        return None
 
-    if result:
-        return result.get('active_orders', [])
-    else:
-        st.error("미체결 주문 조회 오류 발생")
+def fetch_active_orders(market=None):
+    market = market or current_market()
+
+    def load():
+        orders = query_active_orders(market)
+        if orders is None:
+            raise PrivateReadError("미체결 주문 조회 오류 발생")
+        return orders
+
+    try:
+        return read_private(orders_key(market), load)
+    except PrivateReadError as e:
+        st.error(str(e))
         return []
 
+def poll_active_orders(market):
+    # 체결 추적기가 주기적으로 받는 최신 미체결 목록으로 캐시도 새로 고친다
+    orders = query_active_orders(market)
+    if orders is not None:
+        get_private_cache().put(orders_key(market), orders)
+    return orders
+
+# 체결 추적기 (프로세스 전체 공유). 체결/부분 체결/취소 이벤트를 주문 저널에 남긴다.
+@st.cache_resource
+def get_fill_tracker():
+    tracker = FillTracker(poll_active_orders, query_order_detail)
+    journal = get_order_journal()
+
+    def journal_fill_event(event):
+        journal.append({
+            "timestamp": datetime.now().isoformat(),
+            "uuid": event["uuid"],
+            "order_id": event["order_id"],
+            "quote_currency": event["market"].quote,
+            "target_currency": event["market"].target,
+            "order_type": event["order_type"],
+            "side": event["side"],
+            "price": event["avg_price"] or event["price"],
+            "quantity": event["delta_qty"],
+            "status": event["type"],
+            "event": event
+        })
+
+    tracker.add_listener(journal_fill_event)
+    # 체결/취소 알림이 오면 그 마켓의 계좌 상태를 다시 조회하게 한다
+    tracker.add_listener(lambda event: invalidate_private(event["market"]))
+    return tracker
+
+# 포지션 / 손익 (프로세스 전체 공유). 주문 저널의 체결 이벤트를 이어서 반영하고, PNL_CHECKPOINT_FILE 에 주기적으로 저장한다.
+PNL_CHECKPOINT_FILE = 'pnl_checkpoint.json'
+
+@st.cache_resource
+def get_pnl_ledger():
+    journal = get_order_journal()
+    ledger = PnlLedger(os.path.join(REPO_PATH, PNL_CHECKPOINT_FILE))
+    ledger.sync(journal)  # 체크포인트 이후에 쌓인 저널만 읽는다
+    journal.add_listener(lambda entry: ledger.sync(journal) if 'event' in entry else None)
+    atexit.register(ledger.checkpoint)
+    return ledger
+
+# 새 체결 이벤트를 세션의 주문 추적 상태에 반영하고 알림 표시
+def sync_fill_events():
+    tracker = get_fill_tracker()
+    if 'fill_event_seq' not in st.session_state:
+        # 새 세션은 지금 이후의 이벤트만 알린다
+        st.session_state.fill_event_seq = tracker.events_since(float('inf'))[1]
+    events, st.session_state.fill_event_seq = tracker.events_since(st.session_state.fill_event_seq)
+    tracking = st.session_state.get('order_tracking', {})
+    labels = {'filled': '체결 완료', 'partially_filled': '부분 체결', 'cancelled': '취소됨'}
+    for event in events:
+        if event['uuid'] in tracking:
+            tracking[event['uuid']]['status'] = event['type']
+            tracking[event['uuid']]['executed_qty'] = event['executed_qty']
+        st.toast(f"{event['side']} 주문 {labels[event['type']]}: {event['executed_qty']:.4f} {event['market'].target} ({event['order_id']})")
+
 # 주문 취소 함수
-def cancel_order(order_id):
+def submit_cancel(order_id, market=DEFAULT_MARKET):
     action = "/v2.1/order/cancel"
     payload = {
         "access_token": ACCESS_TOKEN,
         "nonce": str(uuid.uuid4()),
         "order_id": order_id,
-        "quote_currency": "KRW",
-        "target_currency": "USDT"
+        "quote_currency": market.quote,
+        "target_currency": market.target
     }
 
-    result = get_response(action, payload)
+    # 같은 주문의 취소는 다시 보내도 결과가 같으므로 받지 못한 응답은 재전송한다
+    deadline = Deadline(ORDER_DEADLINE)
+    retried = []
 
-    if result:
+    def on_retry(error):
+        retried.append(error)
+        get_api_metrics().record_retry(action)
+
+    try:
+        call_with_retry(lambda: get_response(action, payload, deadline=deadline), deadline, ORDER_RETRY, on_retry)
+    except ApiRejected:
+        # 앞선 취소가 이미 처리돼서 거절됐을 수 있다
+        detail = query_order_detail(order_id, market) if retried else None
+        if detail is None or detail.get('status') not in ('CANCELED', 'PARTIALLY_CANCELED'):
+            return False
+    except ApiError:
+        return False
+    invalidate_private(market)
+    return True
+
+def cancel_order(order_id, market=None):
+    if submit_cancel(order_id, market or current_market()):
+        invalidate_panels('orders', 'balances')
         st.success(f"주문이 성공적으로 취소되었습니다. 주문 ID: {order_id}")
     else:
         st.error("주문 취소 오류 발생")
 
-def place_market_sell_all(initial_balance=None, attempt=1):
-    if attempt > 3:  # 최대 3번까지 시도
-        st.error("최대 시도 횟수를 초과했습니다. 일부 USDT가 판매되지 않았을 수 있습니다.")
-        return False
+# 일괄 주문 함수 (독립적인 주문을 동시에 보내고 결과를 한 번에 표시)
+def place_order_batch(orders, market=None):
+    import pandas as pd
+
+    market = market or current_market()
+    ctx = get_script_run_ctx()
+    results = run_concurrently(
+        lambda o: _run_with_ctx(ctx, lambda: submit_order("LIMIT", o['side'], o['price'], o['quantity'], market)),
+        orders)
+    rows = []
+    for order, log_data in results:
+        if isinstance(log_data, Exception):
+            rows.append({**order, 'status': 'processing_error', 'order_id': None, 'message': str(log_data)})
+            continue
+        if log_data["status"] == "success":
+            track_order(log_data)
+        rows.append({**order, 'status': log_data["status"], 'order_id': log_data.get("order_id"),
+                     'message': log_data.get("error_message", "")})
+    invalidate_panels('orders', 'balances')
+    return pd.DataFrame(rows)
+
+# 일괄 취소 함수
+def cancel_orders(order_ids, market=None):
+    import pandas as pd
+
+    market = market or current_market()
+    ctx = get_script_run_ctx()
+    results = run_concurrently(lambda order_id: _run_with_ctx(ctx, lambda: submit_cancel(order_id, market)),
+                               order_ids)
+    rows = [{'order_id': order_id,
+             'status': 'error' if isinstance(ok, Exception) else 'cancelled' if ok else 'failed',
+             'message': str(ok) if isinstance(ok, Exception) else ''}
+            for order_id, ok in results]
+    invalidate_panels('orders', 'balances')
+    return pd.DataFrame(rows)
+
+# 분할 집행 엔진이 쓰는 실거래 어댑터
+class LiveExchange:
+    def __init__(self, market):
+        self.market = market
+        self.qty_decimals = get_order_path(market).limits.qty_decimals
+
+    def book(self):
+        return get_market_data(self.market).top(15)
+
+    def place_limit(self, side, price, qty):
+        log_data = submit_order("LIMIT", side, price, f"{qty:.{self.qty_decimals}f}", self.market)
+        if log_data["status"] != "success":
+            return None
+        # 자식 주문도 체결 추적기에 맡겨 체결 이벤트가 주문 저널(손익 계산)에 남게 한다
+        get_fill_tracker().track(log_data["uuid"], log_data.get("order_id"), {
+            'side': side, 'type': "SLICED_LIMIT", 'price': price, 'quantity': qty, 'market': self.market})
+        return log_data.get("order_id")
 
-    balances = fetch_balances()
-    usdt_balance = float(balances.get('usdt', {}).get('available', 0))
-    
-    if initial_balance is None:
-        initial_balance = usdt_balance
+    def cancel(self, order_id):
+        return submit_cancel(order_id, self.market)
 
-    if usdt_balance > 0:
-        # 소수점 첫째 자리 아래를 버림 처리
-        sell_amount = math.floor(usdt_balance * 10) / 10
-        result = place_order("MARKET", "SELL", None, str(sell_amount))
-        
-        if result:
-            order_details = fetch_order_detail(result.get('order_id'))
-            if order_details:
-                executed_amount = float(order_details.get('executed_qty', 0))
-                executed_price = float(order_details.get('avg_price', 0))
-                
-                remaining_balance = usdt_balance - executed_amount
-                execution_ratio = executed_amount / initial_balance
-
-                if execution_ratio >= 0.995:  # 99.5% 이상 실행됨
-                    st.success(f"전체 USDT 중 {executed_amount:.1f} USDT가 평균 시장가 {executed_price:.2f} KRW에 매도되었습니다.")
-                    return True
-                else:
-                    st.warning(f"{executed_amount:.1f} USDT가 매도되었습니다. 남은 수량을 다시 매도합니다.")
-                    return place_market_sell_all(initial_balance, attempt + 1)
-            else:
-                st.warning(f"주문이 접수되었지만 상세 정보를 가져올 수 없습니다. 남은 수량을 다시 확인합니다.")
-                return place_market_sell_all(initial_balance, attempt + 1)
-        else:
-            st.error("시장가 매도 중 오류가 발생했습니다.")
-            return False
-    else:
-        if attempt == 1:
-            st.error("판매할 USDT가 없습니다.")
-        else:
-            st.success("모든 USDT가 성공적으로 매도되었습니다.")
+    def order_status(self, order_id):
+        detail = query_order_detail(order_id, self.market)
+        if detail is None:
+            return None
+        return (detail.get('status', ''), float(detail.get('executed_qty') or 0),
+                float(detail.get('average_executed_price') or 0))
+
+# 선택한 마켓의 보유 수량 전체 분할 매도 (TWAP / 아이스버그)
+def place_market_sell_all(strategy="twap", slices=5, interval=2.0, max_slippage=0.003, market=None):
+    market = market or current_market()
+    target = market.target
+    balances = fetch_balances(fresh=True)  # 전량 매도는 캐시가 아닌 최신 잔고로
+    limits = get_order_path(market).limits
+    # 마켓의 수량 소수 자릿수 아래를 버림 처리
+    scale = 10 ** limits.qty_decimals
+    target_balance = math.floor(float(balances.get(target.lower(), {}).get('available', 0)) * scale) / scale
+
+    if target_balance <= 0:
+        st.error(f"판매할 {target}가 없습니다.")
+        return False
+
+    best_bid, _ = get_market_data(market).best_bid_ask()
+    # 자식 주문 최소 수량: 최소 주문 수량과 최소 주문 금액에 해당하는 수량 중 큰 쪽 (수량 단위로 올림)
+    min_child_qty = limits.min_qty
+    if best_bid and limits.min_amount:
+        min_child_qty = max(min_child_qty, math.ceil(limits.min_amount / best_bid * scale) / scale)
+    if target_balance < min_child_qty:
+        st.error(f"보유 {target_balance} {target}가 최소 주문 수량 {min_child_qty} {target}보다 작아 매도할 수 없습니다.")
+        return False
+    execution = SlicedExecution(LiveExchange(market), "SELL", target_balance, strategy=strategy, slices=slices,
+                                interval=interval, max_slippage=max_slippage,
+                                tick=price_tick((best_bid or 1000) * (1 - max_slippage)),  # 한계 가격 가격대의 호가 단위
+                                min_child_qty=min_child_qty, qty_decimals=limits.qty_decimals)
+    with st.status(f"{target_balance} {target} 분할 매도 진행 중...") as status:
+        report = execution.run(on_progress=lambda e: status.write(
+            f"자식 주문 {len(e.children)}건 전송, 체결 {e.executed_qty:.4f} {target}"))
+        status.update(state="complete" if report['status'] == 'completed' else "error")
+
+    # 자식 주문은 전송 시 각각 기록되고, 여기서는 집행 결과 요약을 남긴다
+    save_order_log({
+        "timestamp": datetime.now().isoformat(),
+        "uuid": str(uuid.uuid4()),
+        "quote_currency": market.quote,
+        "target_currency": target,
+        "order_type": f"SLICED_{strategy.upper()}",
+        "side": "SELL",
+        "price": report['avg_price'],
+        "quantity": report['executed_qty'],
+        "status": f"execution_{report['status']}",
+        "execution": report
+    })
+
+    if report['status'] == 'completed':
+        st.success(f"전체 {target} 중 {report['executed_qty']:.4f} {target}가 평균 {report['avg_price']:,.2f} {market.quote}에 매도되었습니다. "
+                   f"(슬리피지 {report['slippage'] * 100:.3f}%)")
         return True
+    elif report['status'] == 'partial':
+        st.warning(f"{report['executed_qty']:.4f} {target}가 평균 {report['avg_price']:,.2f} {market.quote}에 매도되었습니다. "
+                   f"일부 {target}가 판매되지 않았습니다. {report['message']}")
+    else:
+        st.error(f"시장가 매도 중 오류가 발생했습니다. {report['message']}")
+    return False
+
+# 동시 조회용 스레드 풀 (프로세스 전체 공유)
+REFRESH_DEADLINE = 2.0  # 초. 이 시간 안에 끝나지 않은 패널은 이전 데이터를 유지한다.
+REFRESH_PANELS = ('balances', 'orders', 'watchlist')
+ORDERBOOK_STALE_AFTER = 5.0  # 초. 호가 스트림이 이보다 오래 멈추면 지연 표시
+
+# 패널별 마지막 조회 결과 (프로세스 전체 공유). 새 세션의 첫 화면은 이 값으로 먼저 그린다.
+@st.cache_resource
+def get_last_known():
+    return {}
+
+@st.cache_resource
+def get_refresh_executor():
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="refresh")
+
+def _run_with_ctx(ctx, fn):
+    # 작업 스레드에서도 st.error 등이 현재 세션에 표시되도록 실행 컨텍스트를 붙인다
+    add_script_run_ctx(threading.current_thread(), ctx)
+    return fn()
+
+# 패널별 데이터 조회 (패널마다 자기 주기로 갱신)
+def panel_fetchers(market):
+    return {
+        'balances': fetch_balances,
+        'orders': lambda: fetch_active_orders(market),
+        'watchlist': fetch_watchlist,
+    }
+
+def start_refresh(names):
+    # 마지막 조회 후 0.5초가 지난 패널의 조회를 백그라운드로 보낸다 (기다리지 않음)
+    pending = st.session_state.setdefault('pending_refresh', {})
+    refreshed_at = st.session_state.setdefault('refreshed_at', {})
+    fetchers = panel_fetchers(current_market())
+    ctx = get_script_run_ctx()
+    now = time.time()
+    for name in names:
+        if name in pending or now - refreshed_at.get(name, 0) < 0.5:
+            continue  # 아직 진행 중이거나 방금 조회했다
+        refreshed_at[name] = now
+        pending[name] = get_refresh_executor().submit(_run_with_ctx, ctx, fetchers[name])
+
+def invalidate_panels(*names):
+    # 우리 주문/취소로 바뀐 패널은 다음 갱신 때 주기와 상관없이 다시 조회한다
+    refreshed_at = st.session_state.get('refreshed_at', {})
+    for name in names:
+        refreshed_at.pop(name, None)
+
+def collect_refresh(name):
+    # 이 패널의 조회 결과를 최대 REFRESH_DEADLINE 동안 기다려 반영. 늦으면 이전 데이터를 유지한다.
+    start_refresh([name])
+    pending = st.session_state.pending_refresh
+    stale = st.session_state.setdefault('stale_panels', set())
+    market = current_market()
+    last_known = get_last_known()
+    future = pending.get(name)
+    if future is not None:
+        # 첫 실행은 기다리지 않고 바로 그린다. 늦은 결과는 finish_first_paint 가 반영한다.
+        first_paint = 'first_paint_ms' not in st.session_state
+        wait([future], timeout=0 if first_paint else REFRESH_DEADLINE)
+        if future.done():
+            del pending[name]
+            if future.exception() is None:
+                st.session_state[name] = last_known[(name, market)] = future.result()
+                stale.discard(name)
+                return
+            st.error(f"데이터 조회 중 오류 발생 ({name}): {future.exception()}")
+    stale.add(name)
+    if name not in st.session_state and (name, market) in last_known:
+        st.session_state[name] = last_known[(name, market)]
 
-# 자동으로 잔고와 주문내역 업데이트 함수
 def update_data():
-    if st.session_state.get('last_update_time', 0) < time.time() - 0.5:
-        st.session_state.balances = fetch_balances()
-        st.session_state.orders = fetch_active_orders()
-        st.session_state.orderbook = fetch_order_book()
-        st.session_state.last_update_time = time.time()
+    # 전체 실행 시: 각 패널의 조회를 한꺼번에 먼저 보내 두고, 패널은 자기 결과만 기다린다
+    start_refresh(REFRESH_PANELS)
+    market = current_market()
+
+    # 주문 버튼을 누르기 전에 keep-alive 커넥션을 데워 둔다 (한동안 요청이 없었을 때만)
+    get_refresh_executor().submit(get_client().warm, f"/public/v2/orderbook/{market.quote}/{market.target}")
+
+def refresh_order_book():
+    # 호가는 백그라운드 서비스가 유지하는 메모리에서 바로 읽는다
+    stale = st.session_state.setdefault('stale_panels', set())
+    st.session_state.orderbook = fetch_order_book()
+    age = get_market_data(current_market()).age()
+    if age is None or age > ORDERBOOK_STALE_AFTER:
+        stale.add('orderbook')
+    else:
+        stale.discard('orderbook')
+    return st.session_state.orderbook
+
+# 첫 화면을 다 그린 뒤, 그때 비어 있던 패널의 데이터가 도착하면 한 번 더 그린다 (세션당 한 번)
+def finish_first_paint():
+    elapsed_ms = (time.perf_counter() - SCRIPT_START) * 1000
+    st.session_state.last_render_ms = elapsed_ms
+    if 'first_paint_ms' in st.session_state:
+        return
+    st.session_state.first_paint_ms = elapsed_ms
+
+    pending = st.session_state.get('pending_refresh', {})
+    futures = [pending[name] for name in REFRESH_PANELS if name in pending and name not in st.session_state]
+    market_data = get_market_data(current_market())
+    waiting_book = market_data.last_update is None
+    if not futures and not waiting_book:
+        return
+    wait(futures, timeout=REFRESH_DEADLINE)
+    if waiting_book:
+        market_data.wait_ready(timeout=REFRESH_DEADLINE)
+    if any(f.done() for f in futures) or (waiting_book and market_data.last_update is not None):
+        st.rerun()
+
+def show_stale_notice(name, label):
+    if name in st.session_state.get('stale_panels', ()):
+        st.caption(f"⚠️ {label} 갱신 지연 - 이전 데이터를 표시합니다.")
+
+# 패널별 자동 갱신 주기 (초). 각 패널은 자기 주기로만 다시 그려지고 나머지 화면은 건드리지 않는다.
+PANEL_INTERVALS = {'balances': 5.0, 'orders': 3.0, 'watchlist': 3.0, 'orderbook': 1.0, 'history': 5.0,
+                   'chart': 5.0, 'triggers': 3.0, 'pnl': 3.0}
+
+def panel_fragment(func=None, *, run_every=None):
+    # st.fragment 와 같지만, 패널만 다시 실행될 때도 계좌 조회 결과를 새 실행 기준으로 다시 읽는다
+    def decorate(body):
+        @functools.wraps(body)
+        def run(*args, **kwargs):
+            if get_script_run_ctx().fragment_ids_this_run:
+                st.session_state.run_memo = {}
+            return body(*args, **kwargs)
+        return st.fragment(run, run_every=run_every)
+    return decorate(func) if func is not None else decorate
 
 # 잔고 정보 업데이트 및 표시 함수
+@panel_fragment(run_every=PANEL_INTERVALS['balances'])
 def update_balance_info():
-    balances = st.session_state.balances
-    krw_balance = balances.get('krw', {})
-    usdt_balance = balances.get('usdt', {})
-    
-    available_krw = float(krw_balance.get('available', '0'))
-    limit_krw = float(krw_balance.get('limit', '0'))
-    total_krw = available_krw + limit_krw
-    
-    available_usdt = float(usdt_balance.get('available', '0'))
-    limit_usdt = float(usdt_balance.get('limit', '0'))
-    total_usdt = available_usdt + limit_usdt
+    collect_refresh('balances')
+    balances = st.session_state.get('balances', {})
+    markets = get_market_registry().watched()
+    # 호가 통화(KRW)를 먼저, 이어서 관심 마켓 순서대로 표시
+    currencies = list(dict.fromkeys([m.quote for m in markets] + [m.target for m in markets]))
+
+    rows = []
+    for currency in currencies:
+        balance = balances.get(currency.lower(), {})
+        available = float(balance.get('available', '0'))
+        limit = float(balance.get('limit', '0'))
+        total = available + limit
+        fmt = "{:,.0f}" if currency == "KRW" else "{:,.2f}" if currency == "USDT" else "{:,.4f}"
+        rows.append(f"| {currency} | {fmt.format(total)} | {fmt.format(available)} |")
 
     st.markdown("""
     ### 계좌 잔고
     | 화폐 | 보유 | 주문 가능 |
     |:-----|-----:|----------:|
-    | KRW  | {:,.0f} | {:,.0f} |
-    | USDT | {:,.2f} | {:,.2f} |
-    """.format(total_krw, available_krw, total_usdt, available_usdt))
+    {}
+    """.format("\n    ".join(rows)))
+    show_stale_notice('balances', '잔고 정보')
+
+# 마켓을 바꾸면 이전 마켓의 조회 결과를 버리고 모든 패널을 새로 조회한다
+def reset_panel_refresh():
+    st.session_state.pop('refreshed_at', None)
+    st.session_state.pop('pending_refresh', None)
+
+# 마켓 선택 및 관심 마켓 추가 (사이드바)
+def market_selector():
+    registry = get_market_registry()
+    current_market()  # 선택값이 관심 목록에 없으면 첫 마켓으로 맞춘다
+    st.sidebar.selectbox("거래 마켓", registry.watched(), format_func=str, key='market',
+                         on_change=reset_panel_refresh)
+    new_market = st.sidebar.text_input("관심 마켓 추가 (예: BTC)", key="new_market")
+    if st.sidebar.button("추가", key="add_market") and new_market:
+        try:
+            registry.add(parse_market(new_market))
+            st.rerun()
+        except ValueError as e:
+            st.sidebar.error(str(e))
 
-# 초기 세션 상태 설정
-if 'orderbook' not in st.session_state:
-    st.session_state.orderbook = fetch_order_book()
+market_selector()
+if PAPER_TRADING:
+    st.sidebar.info("모의 거래 중 - 실제 주문이 나가지 않습니다.")
 
-# 업데이트 호출
+# 업데이트 호출 (패널별 조회를 한꺼번에 먼저 보낸다)
 update_data()
 
 # 잔고 정보 표시
 update_balance_info()
 
+# API 요청 현황 (대기 / 제한 / 합쳐진 요청 수)
+with st.sidebar.expander("API 요청 현황"):
+    st.json(get_scheduler().stats())
+    st.caption("계좌 조회 캐시")
+    st.json(get_private_cache().stats())
+    if PAPER_TRADING:
+        st.caption("모의 거래 엔진")
+        st.json(get_paper_exchange().stats)
+
+# 호가 녹화 재생 제어 (orderbook_replay 가 .obl 일 때만)
+def replay_controls():
+    feed = get_market_data(current_market()).feed
+    if not isinstance(feed, ReplayEngine):
+        return
+    first, last = feed.log.time_range()
+    if first is None:
+        return
+    with st.sidebar.expander("호가 재생", expanded=True):
+        speeds = [1, 2, 5, 10, 50, 100, 500, int(MAX_SPEED)]
+        speed = st.select_slider("재생 속도 (배)", speeds, value=min(speeds, key=lambda s: abs(s - (feed.speed or MAX_SPEED))),
+                                 key='replay_speed')
+        if speed != feed.speed:
+            feed.set_speed(speed)
+        position = feed.position if feed.position is not None else first
+        st.caption(f"재생 위치 {datetime.fromtimestamp(position / 1000):%Y-%m-%d %H:%M:%S}"
+                   + (" (끝까지 재생함 - 이동하면 다시 재생)" if feed.finished else ""))
+        target = st.slider("이동", datetime.fromtimestamp(first / 1000), datetime.fromtimestamp(last / 1000),
+                           value=datetime.fromtimestamp(min(max(position, first), last) / 1000),
+                           format="MM-DD HH:mm:ss", key='replay_seek')
+        if st.button("이 시각으로 이동", key='replay_seek_go'):
+            feed.seek(int(target.timestamp() * 1000))
+
+replay_controls()
+
+# 요청 경로별 지연 / 오류 / 타임아웃 (최근 1분 요청률)
+with st.sidebar.expander("API 지표"):
+    api_metrics = get_api_metrics().snapshot()
+    if api_metrics:
+        st.dataframe([{'경로': m['endpoint'], '요청': m['requests'], '초당': round(m['rate_per_s'], 2),
+                       'p50(ms)': m['p50_ms'], 'p99(ms)': m['p99_ms'], '오류': m['errors'],
+                       '타임아웃': m['timeouts'], '재시도': m['retries'], '헤지': m['hedges']} for m in api_metrics],
+                     hide_index=True)
+        errors = {m['endpoint']: m['error_codes'] for m in api_metrics if m['error_codes']}
+        if errors:
+            st.json(errors)
+    else:
+        st.caption("아직 요청이 없습니다.")
+
 # 스타일 설정
 st.markdown("""
 <style>
@@ -448,6 +1069,9 @@ st.markdown("""
     .stTextInput > div > div > input {
         font-size: 0.7rem;
     }
+    div[data-testid="stTextInput"] > div > div > input {
+        font-size: 1rem !important;
+    }
     .sidebar .sidebar-content {
         width: 200px;
     }
@@ -510,40 +1134,86 @@ st.markdown("""
 
 # 메인 페이지 내용
 # st.title("Coinone 매도 Tool", anchor=False)
-
-# 주문 창
-col_left, col_right = st.columns([1, 1])
-
-with col_right:
-    order_type_display = st.selectbox("주문 유형", ["지정가"], key='order_type')
+# 각 패널은 fragment 라서 패널 안의 조작이나 자동 갱신은 그 패널만 다시 실행한다.
+
+# 관심 마켓 시세 (전체 시세 한 번의 요청으로 모든 관심 마켓 표시)
+@panel_fragment(run_every=PANEL_INTERVALS['watchlist'])
+def watchlist_panel():
+    collect_refresh('watchlist')
+    st.markdown("### 관심 마켓 시세")
+    watchlist = st.session_state.get('watchlist')
+    if watchlist is not None and len(watchlist) > 0:
+        st.dataframe(watchlist, hide_index=True)
+    elif 'watchlist' in st.session_state.get('pending_refresh', {}):
+        st.caption("시세를 불러오는 중입니다.")
+    show_stale_notice('watchlist', '시세')
+
+# 실시간 호가 (메모리의 호가창만 읽으므로 자주 갱신해도 API 요청이 없다)
+@panel_fragment(run_every=PANEL_INTERVALS['orderbook'])
+def orderbook_panel():
+    book = refresh_order_book()
+    st.markdown(f"### 호가 ({current_market()})")
+    show_stale_notice('orderbook', '호가 정보')
+    if book:
+        asks = book.levels('ask')[::-1]
+        bids = book.levels('bid')
+        st.dataframe([{'매도 잔량': qty, '가격': price, '매수 잔량': None} for price, qty in asks] +
+                     [{'매도 잔량': None, '가격': price, '매수 잔량': qty} for price, qty in bids],
+                     hide_index=True)
+        if book.spread is not None:
+            st.caption(f"스프레드 {book.spread:,.2f} / 중간가 {book.mid:,.2f}")
+
+# 가격 차트 (로컬에 쌓은 캔들 구간을 memmap 으로 잘라 최대 CHART_POINTS 개로 묶어서 그린다)
+CHART_WINDOWS = {'6시간': 6 * 3_600_000, '1일': 86_400_000, '1주': 7 * 86_400_000, '1개월': 30 * 86_400_000,
+                 '전체': None}
+CHART_POINTS = 1500
+
+@panel_fragment(run_every=PANEL_INTERVALS['chart'])
+def price_chart_panel():
+    history = get_price_history(current_market())
+    st.markdown("### 가격 차트")
+    if 'first_paint_ms' not in st.session_state:
+        # 차트 라이브러리 로딩이 첫 화면을 늦추지 않도록 첫 실행에서는 건너뛴다 (finish_first_paint 가 다시 그린다)
+        st.caption("차트를 불러오는 중입니다.")
+        return
+
+    import pandas as pd
+
+    col1, col2 = st.columns(2)
+    interval = col1.radio("캔들", list(history.candles), horizontal=True, key="chart_interval")
+    window = col2.radio("구간", list(CHART_WINDOWS), index=1, horizontal=True, key="chart_window")
+    now = int(time.time() * 1000)
+    span = CHART_WINDOWS[window]
+    candles = downsample_ohlc(history.candle_window(interval, None if span is None else now - span), CHART_POINTS)
+    if not len(candles['timestamp']):
+        st.caption("캔들 데이터를 받는 중입니다." + (f" ({history.last_error})" if history.last_error else ""))
+        return
+    index = pd.to_datetime(candles['timestamp'], unit='ms', utc=True).tz_convert('Asia/Seoul')
+    st.line_chart(pd.DataFrame({'고가': candles['high'], '저가': candles['low'], '종가': candles['close']}, index=index),
+                  height=260)
+
+    # 최근 1분 체결 요약
+    trades = history.trade_window(now - 60_000)
+    summary = f"저장된 캔들 {history.candles[interval].rows:,}개 / 체결 {history.trades.rows:,}건"
+    if len(trades['price']):
+        volume = float(trades['qty'].sum())
+        vwap = float((trades['price'] * trades['qty']).sum()) / volume if volume else float(trades['price'][-1])
+        summary = (f"최근 체결가 {float(trades['price'][-1]):,.2f} / 1분 VWAP {vwap:,.2f} / "
+                   f"1분 거래량 {volume:,.4f} {history.market.target} · " + summary)
+    st.caption(summary)
+
+# 호가 버튼으로 가격 입력칸을 채운다 (위젯이 그려지기 전에 실행되는 콜백이라 값이 바로 반영된다)
+def select_price(price_text):
+    st.session_state.price = price_text
+
+# 주문 입력 (호가 버튼, 가격, 비율, 수량, 주문 버튼)
+@panel_fragment
+def order_form():
+    market = current_market()
+    target = market.target
+    order_type_display = st.selectbox("주문 유형", ["지정가", "스탑 지정가"], key='order_type')
     order_type = "LIMIT" if order_type_display == "지정가" else "MARKET" if order_type_display == "시장가" else "STOP_LIMIT"
 
-    # 커스텀 라디오 버튼 스타일
-    st.markdown("""
-    <style>
-    .stRadio [role=radiogroup] {
-        flex-direction: row;
-        justify-content: space-between;
-    }
-    .stRadio [role=radiogroup] label {
-        width: 50%;
-        padding: 10px;
-        text-align: center;
-        transition: all 0.3s ease;
-    }
-    .stRadio [role=radiogroup] label:first-child {
-        text-align: left;
-    }
-    .stRadio [role=radiogroup] label:last-child {
-        text-align: right;
-    }
-    .stRadio [role=radiogroup] label[data-baseweb="radio"] input:checked + div {
-        background-color: #4CAF50;
-        color: white;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-
     side_display = st.radio("주문 종류", ["매도", "매수"], horizontal=True, key='side_radio')
     side = "SELL" if side_display == "매도" else "BUY"
 
@@ -563,30 +1233,34 @@ with col_right:
         col1, col2 = st.columns([1, 2])
         with col1:
             st.markdown("<div style='font-size: 1.1em; margin-bottom: 0.5em;'>매도 호가</div>", unsafe_allow_html=True)
-            bids_df, asks_df = st.session_state.orderbook
-            if asks_df is not None:
-                # 첫 번째와 두 번째 행을 건너뛰고 나머지 행을 표시
-                for i, ask in asks_df.iloc[2:].iterrows():
-                    if st.button(f"{ask['price']:,.0f}", key=f"ask_btn_{i}", help="클릭하여 가격 선택"):
-                        st.session_state.selected_price = f"{ask['price']:,.0f}"
-            
+            book = refresh_order_book()
+            show_stale_notice('orderbook', '호가 정보')
+            if book is not None and len(book.ask_prices) > 0:
+                # 최우선 매도 호가 3개를 높은 가격부터 표시 (가격은 호가 단위 자릿수로)
+                for i in reversed(range(min(3, len(book.ask_prices)))):
+                    ask_price = format_price(book.ask_prices[i])
+                    st.button(ask_price, key=f"ask_btn_{i}", help="클릭하여 가격 선택",
+                              on_click=select_price, args=(ask_price,))
+
             st.markdown("<div style='font-size: 1.1em; margin-top: 1em; margin-bottom: 0.5em;'>매수 호가</div>", unsafe_allow_html=True)
-            if bids_df is not None and len(bids_df) > 0:
-                highest_bid = bids_df['price'].max()
-                for i in range(3):  # 3개의 매수 호가 표시
-                    price = highest_bid - i  # 여기를 수정: + 에서 - 로 변경
-                    if st.button(f"{price:,.0f}", key=f"bid_btn_{i}", help="클릭하여 가격 선택"):
-                        st.session_state.selected_price = f"{price:,.0f}"
-            
+            if book is not None and len(book.bid_prices) > 0:
+                # 최우선 매수 호가 3개 (호가창에 실제로 있는 가격)
+                for i in range(min(3, len(book.bid_prices))):
+                    bid_price = format_price(book.bid_prices[i])
+                    st.button(bid_price, key=f"bid_btn_{i}", help="클릭하여 가격 선택",
+                              on_click=select_price, args=(bid_price,))
+
             # 호가 정보 업데이트 버튼 추가
             if st.button("호가 정보 업데이트", key="update_orderbook"):
-                st.session_state.orderbook = fetch_order_book()
+                refresh_order_book()
                 st.success("호가 정보가 업데이트되었습니다.")
 
         with col2:
-            price_display = st.text_input("가격 (KRW)", st.session_state.get('selected_price', ''), key='price')
-            st.markdown('<style>div[data-testid="stTextInput"] > div > div > input { font-size: 1rem !important; }</style>', unsafe_allow_html=True)
+            price_display = st.text_input("가격 (KRW)", key='price')
             price = price_display.replace(',', '') if price_display else None
+            if order_type == "STOP_LIMIT":
+                stop_price = st.text_input("감시 가격 (KRW)", key='stop_price',
+                                           help="매도는 최우선 매수호가, 매수는 최우선 매도호가가 이 가격에 닿으면 위 가격으로 주문")
     else:
         price = None
 
@@ -604,66 +1278,249 @@ with col_right:
                 if price_value <= 0:
                     st.warning("가격은 0보다 커야 합니다.")
                 else:
-                    available_usdt = float(st.session_state.balances.get('usdt', {}).get('available', '0'))
-                    available_krw = float(st.session_state.balances.get('krw', {}).get('available', '0'))
+                    balances = st.session_state.get('balances', {})
+                    available_target = float(balances.get(target.lower(), {}).get('available', '0'))
+                    available_krw = float(balances.get('krw', {}).get('available', '0'))
                     if side == "BUY":
                         amount_krw = available_krw * (percentage / 100)
                         quantity_value = amount_krw / price_value
                         quantity = f"{math.floor(quantity_value * 10000) / 10000:.4f}"  # 소수점 4자리까지 표시
                         krw_equivalent = amount_krw
                     else:
-                        amount_usdt = available_usdt * (percentage / 100)
-                        quantity_value = math.floor(amount_usdt * 10000) / 10000  # 소수점 4자리까지 내림
+                        amount_target = available_target * (percentage / 100)
+                        quantity_value = math.floor(amount_target * 10000) / 10000  # 소수점 4자리까지 내림
                         quantity = f"{quantity_value:.4f}"
                         krw_equivalent = quantity_value * price_value
         except ValueError:
             st.warning("유효한 가격을 입력해주세요.")
-        
+
         st.markdown("<div class='small-font'>", unsafe_allow_html=True)
         col1, col2 = st.columns(2)
         with col1:
-            quantity_input = st.text_input("수량 (USDT)", value=quantity, disabled=True)
+            quantity_input = st.text_input(f"수량 ({target})", value=quantity, disabled=True)
         with col2:
             st.write(f"환산 금액: {krw_equivalent:,.0f} KRW")
         st.markdown("</div>", unsafe_allow_html=True)
     else:
-        quantity = st.text_input("수량 (USDT)", value="0")
+        quantity = st.text_input(f"수량 ({target})", value="0")
 
     button_color = "sell-button" if side == "SELL" else "buy-button"
     if st.button(f"{side_display} 주문하기", key="place_order", help="클릭하여 주문 실행"):
-        place_order(order_type, side, price, quantity)
-
-    # 전체 시장가 매도 버튼 추가
-    if st.button("전체 시장가 매도", key="market_sell_all", help="전체 USDT를 시장가로 매도"):
-        confirm = st.button("정말로 전체 USDT를 시장가로 매도하시겠습니까?", key="confirm_market_sell_all")
-        if confirm:
-            place_market_sell_all()
-
-    st.markdown("</div>", unsafe_allow_html=True)
+        if order_type == "STOP_LIMIT":
+            arm_stop_order(side, stop_price, price, quantity)
+        else:
+            place_order(order_type, side, price, quantity)
 
-    # 미체결 주문 관련 기능 추가
+# 전체 시장가 매도 버튼 추가 (분할 집행)
+@panel_fragment
+def sell_all_panel():
+    target = current_market().target
+    with st.expander("분할 매도 설정"):
+        col1, col2 = st.columns(2)
+        with col1:
+            sell_strategy = st.selectbox("집행 방식", list(STRATEGIES), format_func=STRATEGIES.get, key="sell_strategy")
+            sell_slices = st.number_input("분할 수", min_value=1, max_value=50, value=5, step=1, key="sell_slices")
+        with col2:
+            sell_interval = st.number_input("조각 간격 (초)", min_value=0.0, max_value=60.0, value=2.0, step=0.5,
+                                            key="sell_interval")
+            sell_slippage = st.number_input("최대 슬리피지 (%)", min_value=0.01, max_value=5.0, value=0.3, step=0.05,
+                                            key="sell_slippage")
+    if st.button("전체 시장가 매도", key="market_sell_all", help=f"전체 {target}를 시장가로 매도"):
+        st.session_state.confirm_market_sell_all = True
+    if st.session_state.get('confirm_market_sell_all'):
+        col1, col2 = st.columns(2)
+        if col1.button(f"정말로 전체 {target}를 시장가로 매도하시겠습니까?", key="confirm_market_sell_all_button"):
+            st.session_state.confirm_market_sell_all = False
+            place_market_sell_all(sell_strategy, int(sell_slices), sell_interval, sell_slippage / 100)
+        if col2.button("취소", key="cancel_market_sell_all"):
+            st.session_state.confirm_market_sell_all = False
+            st.rerun(scope="fragment")
+
+# 일괄 주문 (호가 사다리)
+@panel_fragment
+def ladder_panel():
+    target = current_market().target
+    with st.expander("일괄 주문 (호가 사다리)"):
+        ladder_side_display = st.radio("주문 종류", ["매도", "매수"], horizontal=True, key='ladder_side')
+        ladder_side = "SELL" if ladder_side_display == "매도" else "BUY"
+        col1, col2 = st.columns(2)
+        with col1:
+            ladder_start = st.number_input("시작 가격 (KRW)", min_value=0.0, step=1.0, key='ladder_start')
+            ladder_count = st.number_input("주문 수", min_value=1, max_value=50, value=5, step=1, key='ladder_count')
+        with col2:
+            ladder_end = st.number_input("끝 가격 (KRW)", min_value=0.0, step=1.0, key='ladder_end')
+            ladder_qty = st.number_input(f"총 수량 ({target})", min_value=0.0, step=1.0, format="%.4f", key='ladder_qty')
+        ladder_distribution = st.selectbox("수량 분배", list(DISTRIBUTIONS), format_func=DISTRIBUTIONS.get,
+                                           key='ladder_distribution')
+
+        ladder = []
+        if ladder_start > 0 and ladder_end > 0 and ladder_qty > 0:
+            try:
+                ladder = build_ladder(ladder_side, ladder_start, ladder_end, int(ladder_count), ladder_qty,
+                                      ladder_distribution, tick=price_tick)
+                st.dataframe(ladder, hide_index=True)
+            except ValueError as e:
+                st.warning(f"입력 오류: {e}")
+
+        if st.button(f"사다리 {ladder_side_display} 주문 실행", key="place_ladder", disabled=not ladder):
+            batch_result = place_order_batch(ladder)
+            success_count = int((batch_result['status'] == 'success').sum())
+            st.info(f"{len(batch_result)}건 중 {success_count}건 접수")
+            st.dataframe(batch_result, hide_index=True)
+
+# 미체결 주문 (백그라운드 조회 결과를 표시. 체결 알림도 이 주기로 띄운다)
+@panel_fragment(run_every=PANEL_INTERVALS['orders'])
+def open_orders_panel():
+    import pandas as pd
+
+    sync_fill_events()
+    collect_refresh('orders')
     st.markdown("### 미체결 주문")
-    orders = fetch_active_orders()
-
-    if orders:
-        for order in orders:
-            col1, col2, col3, col4, col5, col6 = st.columns(6)
-            col1.write(f"종목: {order['target_currency']}")
-            col2.write(f"유형: {order['type']}")
-            col3.write(f"매수/매도: {order['side']}")
-            col4.write(f"가격: {float(order['price']):,.2f}")
-            col5.write(f"수량: {float(order['remain_qty']):,.4f}")
-            if col6.button(f"취소", key=f"cancel_{order['order_id']}", help="클릭하여 주문 취소"):
-                cancel_order(order['order_id'])
-                st.rerun()
-    else:
+    show_stale_notice('orders', '미체결 주문')
+    # 주문이 몇 건이든 표 하나로 그린다. 이전 갱신과 비교해서 바뀐 행만 반영한다.
+    table = st.session_state.setdefault('order_table', OrderTable())
+    diff = table.update(st.session_state.get('orders') or [])
+    if not len(table):
         st.info("미체결 주문 없음")
-
-    # UUID 조회 기능 추가
+        return
+
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 2])
+    side = col1.radio("방향", ['전체', 'BUY', 'SELL'], horizontal=True, key="orders_side")
+    price_min = col2.number_input("최저가", min_value=0.0, value=None, key="orders_price_min")
+    price_max = col3.number_input("최고가", min_value=0.0, value=None, key="orders_price_max")
+    sort_labels = {'price_desc': '가격 높은 순', 'price_asc': '가격 낮은 순', 'newest': '최근 주문 순', 'oldest': '오래된 주문 순'}
+    sort = col4.selectbox("정렬", list(SORTS), format_func=sort_labels.get, key="orders_sort")
+    view = table.view(None if side == '전체' else side, price_min, price_max, sort)
+
+    pages = page_count(view)
+    page = st.number_input(f"페이지 (총 {pages}, 페이지당 {PAGE_SIZE}건)", min_value=1, max_value=pages,
+                           value=1, key="orders_page") if pages > 1 else 1
+    page_view = page_of(view, min(page, pages))
+
+    st.caption(f"전체 {len(table)}건 / 조건에 맞는 주문 {len(view)}건"
+               + (f" · 이번 갱신: 신규 {len(diff.added)}, 변경 {len(diff.changed)}, 종료 {len(diff.removed)}"
+                  if any(diff) else ""))
+    # 행이 바뀌거나 필터/페이지가 바뀌면 선택을 비운다 (다른 주문이 선택된 채로 남지 않도록)
+    selection_key = f"orders_table_{table.version}_{side}_{price_min}_{price_max}_{sort}_{page}"
+    # 한 페이지 분량만 보낸다. 주문 시각(ms)은 이 페이지 행만 변환한다.
+    ordered_at = pd.to_datetime(page_view['ordered_at'], unit='ms', utc=True).dt.tz_convert('Asia/Seoul')
+    event = st.dataframe(
+        page_view.drop(columns=['order_id']).assign(ordered_at=ordered_at),
+        key=selection_key, on_select="rerun", selection_mode="multi-row", hide_index=True,
+        column_config={
+            'target_currency': '종목', 'type': '유형', 'side': '매수/매도',
+            'price': st.column_config.NumberColumn('가격', format="localized"),
+            'remain_qty': st.column_config.NumberColumn('미체결 수량', format="%.4f"),
+            'executed_qty': st.column_config.NumberColumn('체결 수량', format="%.4f"),
+            'ordered_at': st.column_config.DatetimeColumn('주문 시각', format="MM-DD HH:mm:ss"),
+        })
+    selected_ids = list(page_view['order_id'].iloc[event.selection.rows])
+
+    # 선택한 주문, 필터 결과 전체, 또는 한쪽 방향 전체 취소
+    col1, col2, col3, col4 = st.columns(4)
+    cancel_ids = []
+    if col1.button(f"선택 주문 취소 ({len(selected_ids)})", key="cancel_selected", disabled=not selected_ids):
+        cancel_ids = selected_ids
+    if col2.button(f"조건에 맞는 주문 취소 ({len(view)})", key="cancel_filtered"):
+        cancel_ids = list(view['order_id'])
+    if col3.button("매수 전체 취소", key="cancel_all_buy"):
+        cancel_ids = [row[0] for row in table.rows.values() if row[3] == 'BUY']
+    if col4.button("매도 전체 취소", key="cancel_all_sell"):
+        cancel_ids = [row[0] for row in table.rows.values() if row[3] == 'SELL']
+    if cancel_ids:
+        cancel_result = cancel_orders(cancel_ids)
+        cancelled_count = int((cancel_result['status'] == 'cancelled').sum())
+        st.info(f"{len(cancel_result)}건 중 {cancelled_count}건 취소")
+        st.dataframe(cancel_result, hide_index=True)
+
+# 조건부 주문 (손절 / 익절 OCO 등록, 걸어 둔 조건 목록 / 취소, 최근 발동)
+@panel_fragment(run_every=PANEL_INTERVALS['triggers'])
+def trigger_panel():
+    market = current_market()
+    engine = get_trigger_engine()
+    for quote, target in engine.markets():
+        get_market_data(Market(quote, target))  # 다른 마켓에 걸어 둔 조건도 호가를 받아야 발동한다
+
+    with st.expander("조건부 주문 (손절 / 익절 OCO)"):
+        oco_side_display = st.radio("주문 종류", ["매도", "매수"], horizontal=True, key='oco_side')
+        oco_side = "SELL" if oco_side_display == "매도" else "BUY"
+        col1, col2 = st.columns(2)
+        with col1:
+            tp_trigger = st.number_input("익절 감시 가격", min_value=0.0, step=1.0, key='oco_tp_trigger')
+            sl_trigger = st.number_input("손절 감시 가격", min_value=0.0, step=1.0, key='oco_sl_trigger')
+            oco_qty = st.number_input(f"수량 ({market.target})", min_value=0.0, step=0.0001, format="%.4f", key='oco_qty')
+        with col2:
+            tp_price = st.number_input("익절 주문 가격", min_value=0.0, step=1.0, key='oco_tp_price')
+            sl_price = st.number_input("손절 주문 가격", min_value=0.0, step=1.0, key='oco_sl_price')
+        if st.button("OCO 등록", key="arm_oco"):
+            try:
+                if tp_trigger <= 0 or sl_trigger <= 0:
+                    raise ValueError("감시 가격은 0보다 커야 합니다.")
+                for order_price in (tp_price, sl_price):
+                    get_order_path(market).validate(order_price, oco_qty)
+                best_bid, best_ask = get_market_data(market).best_bid_ask()
+                engine.arm_oco(market, oco_side, (tp_trigger, tp_price), (sl_trigger, sl_price), oco_qty,
+                               best_bid if oco_side == "SELL" else best_ask)
+                st.success("OCO 조건이 등록되었습니다. 한쪽이 발동하면 다른 쪽은 취소됩니다.")
+            except ValueError as e:
+                st.error(f"입력 오류: {e}")
+
+    armed = sorted(engine.armed(market), key=lambda t: t.created_at)
+    st.markdown(f"### 조건부 주문 ({len(armed)})")
+    if armed:
+        rows = [{'종류': KINDS.get(t.kind, t.kind) + (' (OCO)' if t.group else ''), '매수/매도': t.side,
+                 '감시 가격': t.trigger_price, '조건': '이상' if t.direction == 'above' else '이하',
+                 '주문 가격': t.price, '수량': t.qty} for t in armed]
+        event = st.dataframe(rows, key=f"triggers_table_{len(armed)}_{armed[-1].trigger_id}", on_select="rerun",
+                             selection_mode="multi-row", hide_index=True)
+        selected = [armed[i].trigger_id for i in event.selection.rows]
+        if st.button(f"선택 조건 취소 ({len(selected)})", key="cancel_triggers", disabled=not selected):
+            canceled = sum(engine.cancel(trigger_id) for trigger_id in selected)
+            st.info(f"조건 {canceled}건 취소")
+            st.rerun(scope="fragment")
+
+    fired = [f for f in list(engine.fired) if (f['trigger']['quote'], f['trigger']['target']) == market][-5:]
+    for record in reversed(fired):
+        trigger, result = record['trigger'], record['result'] or {}
+        st.caption(f"{datetime.fromtimestamp(record['fired_at']):%H:%M:%S} {KINDS.get(trigger['kind'], trigger['kind'])} "
+                   f"{trigger['side']} {trigger['qty']} @ {trigger['price']:,.2f} 발동 → "
+                   f"{result.get('status') or record['error']} {result.get('order_id') or ''}")
+    latency = engine.latency_stats()
+    if latency:
+        st.caption(f"발동 ~ 전송 시작 지연 p50 {latency['p50_ms']:.2f} ms / p99 {latency['p99_ms']:.2f} ms")
+
+# 포지션 / 손익 (선입선출 / 평균 단가 기준을 나란히 표시)
+@panel_fragment(run_every=PANEL_INTERVALS['pnl'])
+def pnl_panel():
+    market = current_market()
+    ledger = get_pnl_ledger()
+    summary = ledger.summary(market)
+    st.markdown("### 포지션 / 손익")
+    if not summary:
+        st.caption(f"{market} 체결 기록이 없습니다.")
+        return
+    names = {'fifo': '선입선출', 'average': '평균 단가'}
+    rows = [{'기준': names[method], f'보유 ({market.target})': f"{s['qty']:,.4f}",
+             '평균 단가': '-' if s['avg_price'] is None else f"{s['avg_price']:,.2f}",
+             f'실현 손익 ({market.quote})': f"{s['realized']:,.0f}",
+             f'평가 손익 ({market.quote})': f"{s['unrealized']:,.0f}",
+             f'합계 ({market.quote})': f"{s['realized'] + s['unrealized']:,.0f}"}
+            for method, s in summary.items()]
+    st.dataframe(rows, hide_index=True)
+    saved = (f"{datetime.fromtimestamp(ledger.checkpointed_at):%H:%M:%S}"
+             if ledger.checkpointed_at else "없음")
+    st.caption(f"체결 {ledger.fills}건 반영 (수수료 제외) / 마지막 체크포인트 {saved}")
+
+# UUID 조회 기능 추가
+@panel_fragment
+def order_lookup_panel():
     st.markdown("### 주문 조회")
     order_id_input = st.text_input("주문 ID 입력", key="order_id_input")
     if st.button("주문 조회", key="fetch_order_detail"):
         if order_id_input:
+            # 로컬 주문 기록은 order_id 색인으로 바로 찾는다
+            for log in sync_order_store().get_by_order_id(order_id_input):
+                st.caption(f"로컬 기록: {log['timestamp']} / {log['side']} / 가격: {log['price']} / 수량: {log['quantity']} / 상태: {log['status']}")
             order_detail = fetch_order_detail(order_id_input)
             if order_detail:
                 st.write("주문 정보:")
@@ -687,16 +1544,26 @@ with col_right:
         else:
             st.warning("주문 ID를 입력해주세요.")
 
-
-    # 최근 주문 정보 표시
+# 최근 주문 정보 표시 (로컬 저널 색인만 읽는다)
+@panel_fragment(run_every=PANEL_INTERVALS['history'])
+def order_history_panel():
     st.markdown("### 최근 주문 내역")
-    logs = load_order_log()
-
-    # 주문 시간을 기준으로 내림차순 정렬
-    sorted_logs = sorted(logs, key=lambda x: x['timestamp'], reverse=True)
-
-    # 최대 20개까지 표시
-    for log in sorted_logs[:20]:
+    store = sync_order_store()
+    col1, col2 = st.columns(2)
+    with col1:
+        history_side = st.selectbox("매수/매도", ["전체", "BUY", "SELL"], key="history_side")
+    side = None if history_side == "전체" else history_side
+    # 페이지 수는 고른 조건에 맞는 건수로 계산한다
+    page_count = max(1, math.ceil(store.count(side=side) / HISTORY_PAGE_SIZE))
+    if st.session_state.get("history_page", 1) > page_count:
+        st.session_state.history_page = page_count  # 조건을 바꿔 페이지가 줄어든 경우
+    with col2:
+        history_page = st.number_input("페이지", min_value=1, max_value=page_count, value=1, key="history_page")
+
+    # 주문 시간 색인으로 최신순 페이지만 조회
+    logs = store.query(limit=HISTORY_PAGE_SIZE, offset=(history_page - 1) * HISTORY_PAGE_SIZE, side=side)
+
+    for log in logs:
         # 타임스탬프를 datetime 객체로 변환
         timestamp = datetime.fromisoformat(log['timestamp'])
         # UTC 시간을 태국 시간으로 변환 (UTC+7)
@@ -704,14 +1571,28 @@ with col_right:
         # 초 단위까지만 포맷팅
         formatted_time = thailand_time.strftime("%Y-%m-%d %H:%M:%S")
         st.write(f"주문 시간(태국): {formatted_time}")
-        order_id = log.get('order_id')
-        if order_id is None or order_id == "null":
-            # response 내부의 market_order에서 order_id 찾기
-            response = log.get('response', {})
-            market_order = response.get('market_order', {})
-            order_id = market_order.get('order_id', '주문 ID 없음')
-        
-        st.write(f"{order_id}")
+        st.write(f"{log['order_id'] or '주문 ID 없음'}")
         st.write(f"가격: {log['price']} / 수량: {log['quantity']} / 상태: {log['status']}")
         st.write("---")  # 각 주문 사이에 구분선 추가
-    
+
+# 주문 창
+col_left, col_right = st.columns([1, 1])
+
+with col_left:
+    watchlist_panel()
+    orderbook_panel()
+    price_chart_panel()
+    pnl_panel()
+
+with col_right:
+    order_form()
+    sell_all_panel()
+    st.markdown("</div>", unsafe_allow_html=True)
+    ladder_panel()
+    trigger_panel()
+    open_orders_panel()
+    order_lookup_panel()
+    order_history_panel()
+
+# 첫 화면 이후 늦게 도착한 데이터 반영
+finish_first_paint()
@@ -0,0 +1,78 @@
+# 호가 녹화 / 재생 벤치마크
+# 합성 호가 메시지(15단계 스냅샷 + 한두 레벨짜리 델타)를 BookRecorder 로 녹화해서
+# 메시지당 크기(JSONL 대비), 녹화 속도, 임의 시각 이동 시간, 대기 없는 재생 속도를 잰다.
+#
+#   python benchmarks/bench_book_log.py [메시지 수 ...]
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from book_log import BookLog, BookRecorder, ReplayEngine  # noqa: E402
+
+SNAPSHOT_EVERY = 20  # 웹소켓 ORDERBOOK 채널은 매번 전체 호가라서 스냅샷 비중이 크다
+
+
+def synthetic(n, seed=0):
+    rng = random.Random(seed)
+    timestamp, mid = 1_700_000_000_000, 1400.0
+    for seq in range(1, n + 1):
+        timestamp += rng.randint(20, 300)
+        if seq % SNAPSHOT_EVERY == 1:
+            mid = round(mid + rng.choice((-0.5, 0, 0.5)), 1)
+            yield {'type': 'snapshot', 'seq': seq, 'timestamp': timestamp,
+                   'bids': [[round(mid - 0.5 * (i + 1), 1), round(rng.uniform(1, 5000), 4)] for i in range(15)],
+                   'asks': [[round(mid + 0.5 * i, 1), round(rng.uniform(1, 5000), 4)] for i in range(15)]}
+        else:
+            side = rng.choice(('bids', 'asks'))
+            price = round(mid - 0.5 * rng.randint(1, 15) if side == 'bids' else mid + 0.5 * rng.randint(0, 14), 1)
+            level = [[price, rng.choice((0, round(rng.uniform(1, 5000), 4)))]]
+            yield {'type': 'delta', 'seq': seq, 'timestamp': timestamp,
+                   'bids': level if side == 'bids' else [], 'asks': level if side == 'asks' else []}
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    for n in counts:
+        messages = list(synthetic(n))
+        jsonl_bytes = sum(len(json.dumps(m)) + 1 for m in messages)
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, 'book.obl')
+            recorder = BookRecorder(path)
+            start = time.perf_counter()
+            for message in messages:
+                recorder.record(message)
+            recorder.close()
+            write_s = time.perf_counter() - start
+            size = os.path.getsize(path) + os.path.getsize(path + '.idx')
+            print(f"{n:,} messages: {size / n:.1f} B/msg (jsonl {jsonl_bytes / n:.1f}, "
+                  f"{jsonl_bytes / size:.1f}x smaller), record {n / write_s:,.0f} msg/s")
+
+            log = BookLog(path)
+            first, last = messages[0]['timestamp'], messages[-1]['timestamp']
+            rng = random.Random(1)
+            samples = []
+            for _ in range(50):
+                target = rng.randint(first, last)
+                start = time.perf_counter()
+                next(log.messages(start=target))
+                samples.append((time.perf_counter() - start) * 1000)
+            samples.sort()
+            print(f"  seek: p50 {samples[len(samples) // 2]:.2f} ms  max {samples[-1]:.2f} ms")
+
+            engine = ReplayEngine(log, speed=None, hold=False)
+            start = time.perf_counter()
+            replayed = sum(1 for _ in engine.messages())
+            replay_s = time.perf_counter() - start
+            span_s = (last - first) / 1000
+            print(f"  replay (no wait): {replayed / replay_s:,.0f} msg/s "
+                  f"= {span_s / replay_s:,.0f}x real time")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+# 로컬 모의 서버(mock_coinone) 기반 종단 간 벤치마크
+# 1) 앱 재실행(rerun) 지연: AppTest 로 같은 세션을 여러 번 다시 실행
+# 2) 주문 왕복 시간: 요청 스케줄러 -> 서명 -> 모의 서버 -> 응답 (주문 / 취소)
+# 3) 일괄 주문 / 일괄 취소 처리량 (앱과 같은 run_concurrently + 요청 스케줄러 경로)
+# 4) 가끔 멈추는 서버에서 조회 지연 분포 (헤지 요청 없음 / 있음)
+#
+#   python benchmarks/bench_e2e.py [--latency 0.02] [--reruns 20] [--orders 50] [--reads 200 --hedge-ms 50]
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_retry import Deadline, parse_response, wait_hedged  # noqa: E402
+from coinone_api import CoinoneClient  # noqa: E402
+from mock_coinone import MockCoinone  # noqa: E402
+from order_batch import run_concurrently  # noqa: E402
+from request_scheduler import PRIORITY_ORDER, RequestScheduler  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN, SECRET = 'token', b'secret'
+
+
+def _summary(samples):
+    samples = sorted(samples)
+    return (f"p50 {samples[len(samples) // 2]:.2f} ms  "
+            f"p99 {samples[max(0, int(len(samples) * 0.99) - 1)]:.2f} ms  "
+            f"mean {statistics.mean(samples):.2f} ms  (n={len(samples)})")
+
+
+def bench_reruns(mock, reruns):
+    from streamlit.testing.v1 import AppTest
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)  # 주문 저널/DB 는 임시 디렉토리에 만든다
+        at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=60)
+        at.secrets['api_url'] = mock.url
+        at.secrets['access_key'] = TOKEN
+        at.secrets['private_key'] = SECRET.decode('utf-8')
+        start = time.perf_counter()
+        at.run()
+        cold_ms = (time.perf_counter() - start) * 1000
+
+        samples = []
+        for _ in range(reruns):
+            start = time.perf_counter()
+            at.run()
+            samples.append((time.perf_counter() - start) * 1000)
+        os.chdir(ROOT)
+    if at.exception:
+        raise SystemExit(f"app error: {at.exception[0].value}")
+    print(f"rerun: cold {cold_ms:.1f} ms  warm {_summary(samples)}")
+
+
+def _order_payload(side, price, qty):
+    return {'access_token': TOKEN, 'quote_currency': 'KRW', 'target_currency': 'USDT',
+            'type': 'LIMIT', 'side': side, 'price': str(price), 'qty': str(qty), 'post_only': False}
+
+
+def _submit(scheduler, client, action, payload):
+    status, content = scheduler.submit('order', lambda: client.post_private(action, payload),
+                                       priority=PRIORITY_ORDER).result()
+    data = json.loads(content)
+    if data.get('result') != 'success':
+        raise RuntimeError(f"{action}: {data.get('error_code')} {data.get('error_msg')}")
+    return data
+
+
+def bench_round_trip(mock, n):
+    client = CoinoneClient(TOKEN, SECRET, base_url=mock.url)
+    scheduler = RequestScheduler(budgets={'order': (1000.0, 1000)}, global_budget=(1000.0, 1000))
+    place, cancel = [], []
+    for i in range(n):
+        start = time.perf_counter()
+        order_id = _submit(scheduler, client, '/v2.1/order', _order_payload('BUY', 1300 - i % 10, 1))['order_id']
+        place.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        _submit(scheduler, client, '/v2.1/order/cancel',
+                {'access_token': TOKEN, 'order_id': order_id, 'quote_currency': 'KRW', 'target_currency': 'USDT'})
+        cancel.append((time.perf_counter() - start) * 1000)
+    print(f"order round trip:  {_summary(place)}")
+    print(f"cancel round trip: {_summary(cancel)}")
+    client.close()
+
+
+def bench_batch(mock, n):
+    # 앱과 같은 기본 요청량 제한(주문 초당 10건)으로 일괄 주문 / 취소
+    client = CoinoneClient(TOKEN, SECRET, base_url=mock.url)
+    scheduler = RequestScheduler()
+    orders = [_order_payload('BUY', 1300 - i, 1) for i in range(n)]
+
+    start = time.perf_counter()
+    results = run_concurrently(lambda p: _submit(scheduler, client, '/v2.1/order', p), orders)
+    elapsed = time.perf_counter() - start
+    order_ids = [r['order_id'] for _, r in results if not isinstance(r, Exception)]
+    print(f"batch place:  {len(order_ids)}/{n} ok in {elapsed * 1000:.0f} ms  ({len(order_ids) / elapsed:.1f} orders/s)")
+
+    start = time.perf_counter()
+    results = run_concurrently(
+        lambda order_id: _submit(scheduler, client, '/v2.1/order/cancel',
+                                 {'access_token': TOKEN, 'order_id': order_id,
+                                  'quote_currency': 'KRW', 'target_currency': 'USDT'}),
+        order_ids)
+    elapsed = time.perf_counter() - start
+    ok = sum(not isinstance(r, Exception) for _, r in results)
+    print(f"batch cancel: {ok}/{len(order_ids)} ok in {elapsed * 1000:.0f} ms  ({ok / elapsed:.1f} cancels/s)")
+    client.close()
+
+
+def bench_hedged_reads(n, hedge_ms):
+    # 5% 확률로 0.5초 멈추는 서버. 헤지하면 멈춘 요청 대신 두 번째 요청의 응답을 쓴다
+    mock = MockCoinone(TOKEN, SECRET, latency=0.01, stall_rate=0.05, stall=0.5).start()
+    client = CoinoneClient(TOKEN, SECRET, base_url=mock.url)
+    scheduler = RequestScheduler(budgets={'read': (1e6, 1000)}, global_budget=None)
+    action = '/v2.1/account/balance/all'
+
+    def start(primary):
+        return scheduler.submit('read', lambda: parse_response(action, *client.post_private(action, {'access_token': TOKEN})))
+
+    for label, hedge_after in (('no hedge', None), (f'hedge {hedge_ms:.0f} ms', hedge_ms / 1000)):
+        requests_before = mock.stats['requests']
+        samples = []
+        for _ in range(n):
+            begin = time.perf_counter()
+            wait_hedged(start, Deadline(5.0), hedge_after)
+            samples.append((time.perf_counter() - begin) * 1000)
+        sent = mock.stats['requests'] - requests_before
+        print(f"read, {label:>14}: {_summary(samples)}  requests {sent} (+{(sent - n) / n:.0%})")
+    client.close()
+    mock.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.02, help='모의 서버 응답 지연 (초)')
+    parser.add_argument('--reruns', type=int, default=20)
+    parser.add_argument('--orders', type=int, default=50)
+    parser.add_argument('--reads', type=int, default=200)
+    parser.add_argument('--hedge-ms', type=float, default=50.0, help='헤지 요청을 보내기까지 기다리는 시간 (ms)')
+    parser.add_argument('--skip-app', action='store_true', help='앱 재실행 측정 생략')
+    args = parser.parse_args()
+
+    mock = MockCoinone(TOKEN, SECRET, latency=args.latency).start()
+    print(f"mock server {mock.url}  latency {args.latency * 1000:.0f} ms")
+    if not args.skip_app:
+        bench_reruns(mock, args.reruns)
+    bench_round_trip(mock, args.orders)
+    bench_batch(mock, args.orders)
+    print(f"server stats: {mock.stats}")
+    mock.stop()
+    bench_hedged_reads(args.reads, args.hedge_ms)
+
+
+if __name__ == '__main__':
+    main()
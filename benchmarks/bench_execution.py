@@ -0,0 +1,105 @@
+# 분할 집행 엔진 시뮬레이션
+# 간단한 모의 거래소(호가가 일정 속도로 다시 쌓이는 매수 호가창)에 대해
+# 한 번에 시장가로 파는 경우와 TWAP / 아이스버그 분할 매도의 평균 체결가를 비교한다.
+#
+#   python benchmarks/bench_execution.py [매도 수량]
+
+import itertools
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from execution import SlicedExecution  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class SimulatedExchange:
+    # 매수 호가 depth 개 레벨, 레벨마다 level_qty. 소진된 잔량은 초당 refill 비율로 회복된다.
+    def __init__(self, clock, best_bid=1400, depth=15, level_qty=300.0, refill=0.2):
+        self.clock = clock
+        self.levels = {best_bid - i: level_qty for i in range(depth)}
+        self.level_qty = level_qty
+        self.refill = refill
+        self.updated = clock()
+        self.orders = {}
+        self._ids = itertools.count(1)
+
+    def _replenish(self):
+        elapsed = self.clock() - self.updated
+        self.updated = self.clock()
+        for price in self.levels:
+            self.levels[price] = min(self.level_qty, self.levels[price] + self.level_qty * self.refill * elapsed)
+
+    def book(self):
+        self._replenish()
+        bids = sorted(((p, q) for p, q in self.levels.items() if q > 0), reverse=True)
+        return bids, []
+
+    def sell(self, limit_price, qty):
+        self._replenish()
+        executed = notional = 0.0
+        for price in sorted(self.levels, reverse=True):
+            if price < limit_price or executed >= qty:
+                break
+            take = min(self.levels[price], qty - executed)
+            self.levels[price] -= take
+            executed += take
+            notional += take * price
+        return executed, notional
+
+    def place_limit(self, side, price, qty):
+        executed, notional = self.sell(price, qty)
+        order_id = str(next(self._ids))
+        self.orders[order_id] = {'qty': qty, 'executed': executed, 'notional': notional, 'price': price,
+                                 'status': 'FILLED' if executed >= qty else 'LIVE'}
+        return order_id
+
+    def cancel(self, order_id):
+        order = self.orders[order_id]
+        order['status'] = 'CANCELED' if order['executed'] == 0 else 'PARTIALLY_CANCELED'
+        return True
+
+    def order_status(self, order_id):
+        order = self.orders[order_id]
+        if order['status'] == 'LIVE':
+            # 남은 수량은 회복된 호가에 대해 다시 체결 시도
+            executed, notional = self.sell(order['price'], order['qty'] - order['executed'])
+            order['executed'] += executed
+            order['notional'] += notional
+            if order['executed'] >= order['qty']:
+                order['status'] = 'FILLED'
+        avg = order['notional'] / order['executed'] if order['executed'] else 0.0
+        return order['status'], order['executed'], avg
+
+
+def main():
+    quantity = float(sys.argv[1]) if len(sys.argv) > 1 else 3000.0
+
+    clock = FakeClock()
+    exchange = SimulatedExchange(clock)
+    executed, notional = exchange.sell(0, quantity)
+    print(f"{'single market order':>22}: executed {executed:.1f}  avg {notional / executed:,.2f}")
+
+    for strategy in ('twap', 'iceberg'):
+        clock = FakeClock()
+        execution = SlicedExecution(SimulatedExchange(clock), 'SELL', quantity, strategy=strategy, slices=10,
+                                    interval=2.0, max_slippage=0.003, clock=clock, sleep=clock.sleep)
+        report = execution.run()
+        print(f"{strategy:>22}: executed {report['executed_qty']:.1f}  avg {report['avg_price']:,.2f}  "
+              f"slippage {report['slippage'] * 100:.3f}%  children {len(report['children'])}  "
+              f"time {clock.now:.1f}s  ({report['status']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# 캔들 이력 저장소 벤치마크
+# ColumnStore(memmap 열 파일)에 N개 캔들을 쌓고, 다시 열기 / 구간 읽기 + 차트용 다운샘플 시간을 잰다.
+# 같은 양의 캔들을 API 응답 형식 JSON 에서 읽는 경우와 비교한다.
+#
+#   python benchmarks/bench_history.py [행 수]
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from column_store import ColumnStore  # noqa: E402
+from price_history import CANDLE_SCHEMA, downsample_ohlc  # noqa: E402
+
+CHUNK = 500  # 수집기가 한 번에 추가하는 최대 개수 (캔들 한 페이지)
+
+
+def synthetic(start, n):
+    ts = start + np.arange(n, dtype=np.int64) * 60_000
+    close = 1400 + np.cumsum(np.random.default_rng(start).normal(0, 0.5, n))
+    return {'timestamp': ts, 'open': close, 'high': close + 0.5, 'low': close - 0.5, 'close': close,
+            'target_volume': np.full(n, 10.0), 'quote_volume': close * 10}
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'candles_1m')
+        store = ColumnStore(path, CANDLE_SCHEMA)
+        data = synthetic(0, n)
+        _, bulk_ms = timed(lambda: store.append(data))
+        print(f"append {n:,} rows at once: {bulk_ms:.0f} ms")
+
+        pages = 200
+        _, page_ms = timed(lambda: [store.append(synthetic(n * 60_000 + i * CHUNK * 60_000, CHUNK))
+                                    for i in range(pages)])
+        print(f"append {pages} pages of {CHUNK}: {page_ms / pages:.2f} ms/page")
+
+        reopened, open_ms = timed(lambda: ColumnStore(path, CANDLE_SCHEMA))
+        print(f"reopen ({reopened.rows:,} rows): {open_ms:.2f} ms")
+
+        end = reopened.last('timestamp') + 1
+        for rows in (10_000, 1_000_000, reopened.rows):
+            def load():
+                return downsample_ohlc(reopened.window(end - rows * 60_000, end), 1500)
+            chart, load_ms = timed(load)
+            print(f"window {rows:>10,} rows -> {len(chart['timestamp'])} points: {load_ms:.1f} ms")
+
+    # 같은 캔들을 API 응답 형식 JSON 으로 읽으면 (100,000 행만 재고 비례 환산)
+    sample = 100_000
+    payload = json.dumps({'chart': [{'timestamp': int(t), 'open': f'{c:.2f}', 'high': f'{c:.2f}', 'low': f'{c:.2f}',
+                                     'close': f'{c:.2f}', 'target_volume': '10', 'quote_volume': f'{c * 10:.2f}'}
+                                    for t, c in zip(data['timestamp'][:sample], data['close'][:sample])]})
+
+    def parse():
+        rows = json.loads(payload)['chart']
+        return {name: np.array([float(row[name]) for row in rows]) for name, _ in CANDLE_SCHEMA}
+
+    _, json_ms = timed(parse)
+    print(f"json parse {sample:,} rows: {json_ms:.0f} ms (~{json_ms * 10:.0f} ms per 1,000,000)")
+
+
+if __name__ == '__main__':
+    main()
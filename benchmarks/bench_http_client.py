@@ -0,0 +1,74 @@
+# 커넥션 풀 효과 측정용 벤치마크
+# 로컬 mock 서버에 대해 "매 호출 새 연결" 과 "공유 keep-alive 클라이언트" 의 호출당 지연을 비교한다.
+#
+#   python benchmarks/bench_http_client.py [호출 횟수]
+
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coinone_api import CoinoneClient  # noqa: E402
+
+BODY = json.dumps({"result": "success", "error_code": "0", "balances": []}).encode('utf-8')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive 허용
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def _measure(call, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    action = '/v2.1/account/balance/all'
+
+    client = CoinoneClient('token', b'secret', base_url=base_url)
+
+    def fresh_connection():
+        # 기존 방식: 호출마다 새 연결
+        requests.post(f'{base_url}{action}', data=b'{}', headers={'Connection': 'close'})
+
+    def pooled():
+        client.post_private(action, {'access_token': 'token'})
+
+    for name, call in (('fresh connection', fresh_connection), ('pooled client', pooled)):
+        mean, p50, p99 = _measure(call, n)
+        print(f"{name:>16}: mean {mean:.3f} ms  p50 {p50:.3f} ms  p99 {p99:.3f} ms  (n={n})")
+
+    client.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# 미체결 주문 수에 따른 화면 재실행 시간
+# 모의 서버에 N건의 지정가 주문을 걸어 두고 AppTest 로 같은 세션을 여러 번 다시 실행한다.
+# st.cache_resource (API 클라이언트 등)가 프로세스 전체에 남으므로 주문 수마다 새 프로세스에서 잰다.
+#
+#   python benchmarks/bench_open_orders.py [--counts 10 100 500] [--reruns 10]
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coinone_api import CoinoneClient  # noqa: E402
+from mock_coinone import MockCoinone  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN, SECRET = 'token', b'secret'
+
+
+def place_resting_orders(mock, count):
+    # 최우선 매수호가보다 낮은 매수 주문 (체결되지 않고 남는다)
+    client = CoinoneClient(TOKEN, SECRET, base_url=mock.url)
+    for i in range(count):
+        client.post_private('/v2.1/order', {
+            'access_token': TOKEN, 'quote_currency': 'KRW', 'target_currency': 'USDT', 'type': 'LIMIT',
+            'side': 'BUY' if i % 2 else 'SELL', 'price': str(1300 - i % 50 if i % 2 else 1500 + i % 50),
+            'qty': '1', 'post_only': False})
+    client.close()
+
+
+def bench(count, reruns):
+    from streamlit.testing.v1 import AppTest
+
+    mock = MockCoinone(TOKEN, SECRET, balances={'KRW': 1e9, 'USDT': 1e6}).start()
+    place_resting_orders(mock, count)
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=60)
+        at.secrets['api_url'] = mock.url
+        at.secrets['access_key'] = TOKEN
+        at.secrets['private_key'] = SECRET.decode('utf-8')
+        at.run()
+        at.run()  # 첫 화면 이후 미체결 목록이 채워진 상태부터 잰다
+        samples = []
+        for _ in range(reruns):
+            start = time.perf_counter()
+            at.run()
+            samples.append((time.perf_counter() - start) * 1000)
+        os.chdir(ROOT)
+    mock.stop()
+    if at.exception:
+        raise SystemExit(f"app error: {at.exception[0].value}")
+    samples.sort()
+    print(f"{count:>5} open orders: rerun p50 {samples[len(samples) // 2]:.1f} ms  "
+          f"max {samples[-1]:.1f} ms  mean {statistics.mean(samples):.1f} ms  buttons {len(at.button)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--counts', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--reruns', type=int, default=10)
+    args = parser.parse_args()
+    for count in args.counts:
+        process = multiprocessing.get_context('spawn').Process(target=bench, args=(count, args.reruns))
+        process.start()
+        process.join()
+
+
+if __name__ == '__main__':
+    main()
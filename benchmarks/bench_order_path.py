@@ -0,0 +1,120 @@
+# 원클릭 주문 경로 벤치마크 (클릭 -> 요청이 서버에 도착할 때까지)
+# 기존 경로: dict 구성 + 검증 + get_encoded_payload + get_signature + 스케줄러 큐 + 전송
+# 준비된 경로: FastOrderPath.prepare (본문 앞부분/서명 상태 재사용) + run_inline + 전송
+# 별도 프로세스의 모의 서버가 요청 본문을 다 받은 시각까지를 잰다 (time.perf_counter 는 프로세스 간 공통 시계).
+# 서명/인코딩만의 비용도 따로 잰다.
+#
+#   python benchmarks/bench_order_path.py [반복 횟수]
+
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+import timeit
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coinone_api import CoinoneClient, get_encoded_payload, get_signature  # noqa: E402
+from fast_order import FastOrderPath, format_price  # noqa: E402
+from markets import Market  # noqa: E402
+from mock_coinone import MockCoinone  # noqa: E402
+from request_scheduler import PRIORITY_ORDER, RequestScheduler  # noqa: E402
+
+TOKEN, SECRET = 'token', b'secret'
+MARKET = Market('KRW', 'USDT')
+ACTION = '/v2.1/order'
+
+
+def legacy_prepare(side, price, quantity):
+    payload = {
+        "access_token": TOKEN,
+        "nonce": str(uuid.uuid4()),
+        "side": side,
+        "quote_currency": MARKET.quote,
+        "target_currency": MARKET.target,
+        "type": "LIMIT",
+        "price": format_price(float(price)),
+        "qty": f"{float(quantity):.4f}",
+        "post_only": False,
+    }
+    price_value, quantity_value = float(price), float(quantity)
+    if price_value <= 0 or quantity_value <= 0 or price_value * quantity_value < 1000 or quantity_value < 0.0001:
+        raise ValueError
+    encoded = get_encoded_payload(payload)
+    return encoded, get_signature(SECRET, encoded)
+
+
+def _serve(arrival, ready):
+    # 측정 대상과 GIL 을 나눠 쓰지 않도록 모의 서버는 별도 프로세스에서 돌린다
+    def on_request(path):
+        arrival.value = time.perf_counter()
+
+    # 주문이 쌓여도 체결되지 않도록 아주 먼 가격의 매도만 보낸다
+    mock = MockCoinone(TOKEN, SECRET, balances={'KRW': 0.0, 'USDT': 1e12}, on_request=on_request).start()
+    ready.send(mock.url)
+    while True:
+        time.sleep(3600)
+
+
+def _summary(samples):
+    samples = sorted(samples)
+    return (f"p50 {samples[len(samples) // 2] * 1e6:8.1f} us  "
+            f"p99 {samples[max(0, int(len(samples) * 0.99) - 1)] * 1e6:8.1f} us  "
+            f"mean {statistics.mean(samples) * 1e6:8.1f} us")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    arrival = multiprocessing.Value('d', 0.0, lock=False)
+    ready, child_end = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=_serve, args=(arrival, child_end), daemon=True)
+    server.start()
+    client = CoinoneClient(TOKEN, SECRET, base_url=ready.recv())
+    scheduler = RequestScheduler(budgets={'order': (1e6, 1000)}, global_budget=(1e6, 1000))
+    fast_path = FastOrderPath(client, TOKEN, MARKET)
+
+    handed_off = [0.0]  # HTTP 클라이언트에 넘긴 시각
+
+    def send(encoded, signature):
+        handed_off[0] = time.perf_counter()
+        return client.post_signed(ACTION, encoded, signature)
+
+    def legacy_click():
+        encoded, signature = legacy_prepare('SELL', 2000, 1)
+        scheduler.submit('order', lambda: send(encoded, signature), priority=PRIORITY_ORDER).result()
+
+    def fast_click():
+        encoded, signature = fast_path.prepare('SELL', 2000, 1, str(uuid.uuid4()))
+        scheduler.run_inline('order', lambda: send(encoded, signature))
+
+    def cold_fast_click():
+        client.session.close()  # 커넥션을 미리 데우지 않았을 때
+        fast_click()
+
+    print("prepare only (검증 + 인코딩 + 서명)")
+    for name, fn in (('legacy', lambda: legacy_prepare('SELL', 2000, 1)),
+                     ('prepared', lambda: fast_path.prepare('SELL', 2000, 1, str(uuid.uuid4())))):
+        per_call = min(timeit.repeat(fn, number=2000, repeat=5)) / 2000
+        print(f"  {name:>22}: {per_call * 1e6:.2f} us")
+
+    print(f"click -> HTTP client / request received by server (n={n})")
+    for name, click in (('prepared', fast_click), ('legacy', legacy_click),
+                        ('prepared, cold conn', cold_fast_click)):
+        click()  # 커넥션 준비
+        to_client, to_server = [], []
+        for _ in range(n):
+            start = time.perf_counter()
+            click()  # 응답까지 기다리지만, 넘긴 시각과 서버 도착 시각만 쓴다
+            to_client.append(handed_off[0] - start)
+            to_server.append(arrival.value - start)
+        print(f"  {name:>22}: handoff {_summary(to_client)}")
+        print(f"  {'':>22}  on wire {_summary(to_server)}")
+
+    client.close()
+    server.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# 호가 파싱~렌더링 준비 비용 비교
+# 기존 방식(DataFrame 2개 + pd.to_numeric 4번 + iloc 역순 + iterrows)과
+# 배열 기반 BookSnapshot 을 호가 깊이 5 / 15 / 전체에서 비교한다.
+#
+#   python benchmarks/bench_orderbook.py [전체 호가 깊이]
+
+import os
+import sys
+import timeit
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orderbook import BookSnapshot  # noqa: E402
+
+
+def make_response(depth):
+    return {
+        'bids': [{'price': str(1400 - i), 'qty': f"{10 + i * 0.5:.4f}"} for i in range(depth)],
+        'asks': [{'price': str(1401 + i), 'qty': f"{8 + i * 0.25:.4f}"} for i in range(depth)],
+    }
+
+
+def dataframe_path(data):
+    bids_df = pd.DataFrame(data['bids'])
+    asks_df = pd.DataFrame(data['asks'])
+    bids_df['price'] = pd.to_numeric(bids_df['price'])
+    bids_df['qty'] = pd.to_numeric(bids_df['qty'])
+    asks_df['price'] = pd.to_numeric(asks_df['price'])
+    asks_df['qty'] = pd.to_numeric(asks_df['qty'])
+    asks_df = asks_df.iloc[::-1]
+    labels = [f"{ask['price']:,.0f}" for _, ask in asks_df.iterrows()]
+    labels.append(f"{bids_df['price'].max():,.0f}")
+    return labels
+
+
+def snapshot_path(data):
+    book = BookSnapshot.from_levels(data['bids'], data['asks'])
+    labels = [f"{price:,.0f}" for price in book.ask_prices[::-1].tolist()]
+    labels.append(f"{book.best_bid:,.0f}")
+    book.spread, book.cumulative_depth('bid')
+    return labels
+
+
+def main():
+    full_depth = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    for depth in (5, 15, full_depth):
+        data = make_response(depth)
+        assert dataframe_path(data) == snapshot_path(data)
+        number = 2000 if depth <= 15 else 200
+        results = {}
+        for name, fn in (('DataFrame', dataframe_path), ('BookSnapshot', snapshot_path)):
+            seconds = min(timeit.repeat(lambda: fn(data), number=number, repeat=3))
+            results[name] = seconds / number * 1e6
+        print(f"depth {depth:>4}: DataFrame {results['DataFrame']:9.1f} us  "
+              f"BookSnapshot {results['BookSnapshot']:8.1f} us  "
+              f"({results['DataFrame'] / results['BookSnapshot']:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# 모의 거래 체결 엔진 처리량
+# 최우선 호가 근처의 지정가 / 시장가 / 취소를 섞은 주문 흐름을 PaperExchange 에 넣어 초당 처리 건수를 잰다.
+#   engine: place / cancel 직접 호출
+#   client: PaperClient.post_private (앱의 엔드포인트 함수가 주고받는 것과 같은 요청 dict / JSON 응답)
+# 외부 호가(15단계 스냅샷)를 seed 해 둔 경우와 내 주문끼리만 체결되는 경우를 함께 잰다.
+#
+#   python benchmarks/bench_paper_exchange.py [주문 수]
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coinone_api import CoinoneClient  # noqa: E402
+from markets import Market  # noqa: E402
+from orderbook import BookSnapshot  # noqa: E402
+from paper_exchange import PaperClient, PaperExchange  # noqa: E402
+
+MARKET = Market('KRW', 'USDT')
+BALANCES = {'KRW': 1e12, 'USDT': 1e9}
+
+
+def flow(n, seed=0):
+    # (동작, 인자) 목록. 지정가 70%, 시장가 10%, 취소 20% (직전 지정가 주문 중 하나)
+    rng = random.Random(seed)
+    actions = []
+    for i in range(n):
+        r = rng.random()
+        side = 'BUY' if rng.random() < 0.5 else 'SELL'
+        if r < 0.7:
+            offset = rng.randint(0, 20) * (-1 if side == 'BUY' else 1) + rng.choice((-2, -1, 0, 1, 2))
+            actions.append(('limit', side, 1400 + offset, rng.choice((0.5, 1, 2, 5))))
+        elif r < 0.8:
+            actions.append(('market', side, None, rng.choice((1, 3))))
+        else:
+            actions.append(('cancel', None, None, None))
+    return actions
+
+
+def seeded(exchange):
+    exchange.seed(MARKET, BookSnapshot.from_levels([[1400 - i, 10 + i] for i in range(15)],
+                                                   [[1401 + i, 10 + i] for i in range(15)]))
+    return exchange
+
+
+def run_engine(exchange, actions):
+    live = []
+    rng = random.Random(1)
+    for action, side, price, qty in actions:
+        if action == 'limit':
+            live.append(exchange.place(side, 'KRW', 'USDT', 'LIMIT', price=price, qty=qty).order_id)
+        elif action == 'market':
+            if side == 'BUY':
+                exchange.place(side, 'KRW', 'USDT', 'MARKET', amount=qty * 1400)
+            else:
+                exchange.place(side, 'KRW', 'USDT', 'MARKET', qty=qty)
+        elif live:
+            exchange.cancel(live.pop(rng.randrange(len(live))))
+
+
+def run_client(client, actions):
+    live = []
+    rng = random.Random(1)
+    for action, side, price, qty in actions:
+        payload = {'access_token': 'token', 'quote_currency': 'KRW', 'target_currency': 'USDT'}
+        if action == 'limit':
+            payload.update(side=side, type='LIMIT', price=str(price), qty=str(qty), post_only=False)
+            _, body = client.post_private('/v2.1/order', payload)
+            live.append(json.loads(body)['order_id'])
+        elif action == 'market':
+            size = {'amount': str(qty * 1400)} if side == 'BUY' else {'qty': str(qty)}
+            payload.update(side=side, type='MARKET', **size)
+            client.post_private('/v2.1/order', payload)
+        elif live:
+            client.post_private('/v2.1/order/cancel', dict(payload, order_id=live.pop(rng.randrange(len(live)))))
+
+
+def timed(label, fn, n):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {n / elapsed:>10,.0f} orders/s  ({elapsed * 1000:.0f} ms)")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    actions = flow(n)
+    for name, make in (('internal', lambda: PaperExchange(BALANCES)),
+                       ('seeded book', lambda: seeded(PaperExchange(BALANCES)))):
+        exchange = make()
+        timed(f"engine / {name}", lambda: run_engine(exchange, actions), n)
+        print(f"  {exchange.stats}, open {sum(1 for o in exchange.orders.values() if o.status in ('LIVE', 'PARTIALLY_FILLED'))}")
+    upstream = CoinoneClient('token', b'secret', base_url='http://127.0.0.1:9')  # 공개 요청은 보내지 않는다
+    client = PaperClient(PaperExchange(BALANCES), upstream)
+    timed("client (endpoint JSON)", lambda: run_client(client, actions), n)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# 포지션 / 손익 계산 벤치마크
+#   1) 체결 한 건 반영 시간 (매수/매도가 섞인 흐름, 선입선출 + 평균 단가 동시)
+#   2) 호가 갱신 한 번 (현재가 반영) 과 손익 조회 시간
+#   3) 재시작: 체크포인트에서 이어 읽기 vs 저널 전체 다시 읽기
+#
+#   python benchmarks/bench_pnl.py [체결 수]
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from order_journal import OrderJournal  # noqa: E402
+from pnl import PnlLedger  # noqa: E402
+
+MARKET = ('KRW', 'USDT')
+
+
+def fills(n, seed=0):
+    # (side, qty, price). 가격은 1400 근처를 오가고, 매수가 조금 많다
+    rng = random.Random(seed)
+    price = 1400.0
+    for _ in range(n):
+        price += rng.choice((-1, 0, 1))
+        yield ('BUY' if rng.random() < 0.55 else 'SELL'), rng.choice((0.5, 1, 2, 5)), price
+
+
+def write_journal(path, n):
+    # 앱의 체결 이벤트와 같은 모양의 저널 (주문마다 부분 체결 2번 + 체결 완료 1번)
+    journal = OrderJournal(path)
+    with open(path, 'a', encoding='utf-8') as f:  # fsync 없이 빠르게 채운다
+        for i, (side, qty, price) in enumerate(fills(n // 3 + 1)):
+            executed = 0.0
+            for step, typ in ((qty / 4, 'partially_filled'), (qty / 4, 'partially_filled'), (qty / 2, 'filled')):
+                executed += step
+                f.write(json.dumps({'quote_currency': 'KRW', 'target_currency': 'USDT', 'side': side, 'status': typ,
+                                    'event': {'type': typ, 'order_id': str(i), 'side': side, 'price': price,
+                                              'executed_qty': executed, 'delta_qty': step,
+                                              'avg_price': str(price)}}) + '\n')
+    return journal
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    with tempfile.TemporaryDirectory() as workdir:
+        ledger = PnlLedger(os.path.join(workdir, 'direct.json'))
+        flow = list(fills(n))
+        start = time.perf_counter()
+        for side, qty, price in flow:
+            ledger.apply_fill(MARKET, side, qty, price)
+        per_fill = (time.perf_counter() - start) / n * 1e6
+        lots = ledger.summary(MARKET)['fifo']['lots']
+        print(f"apply fill: {per_fill:.2f} us/fill ({n:,} fills, {lots:,} FIFO lots left)")
+
+        ticks = 200_000
+        start = time.perf_counter()
+        for i in range(ticks):
+            ledger.mark(MARKET, 1400 + i % 3, 1401 + i % 3)
+        per_tick = (time.perf_counter() - start) / ticks * 1e6
+        start = time.perf_counter()
+        for _ in range(ticks // 10):
+            ledger.summary(MARKET)
+        per_read = (time.perf_counter() - start) / (ticks // 10) * 1e6
+        print(f"book tick: {per_tick:.2f} us, PnL read: {per_read:.2f} us")
+
+        path = os.path.join(workdir, 'journal.jsonl')
+        journal = write_journal(path, n)
+        checkpoint = os.path.join(workdir, 'checkpoint.json')
+        start = time.perf_counter()
+        full = PnlLedger(os.path.join(workdir, 'full.json'))
+        full.sync(journal)
+        full_ms = (time.perf_counter() - start) * 1000
+        PnlLedger(checkpoint).sync(journal)  # 체크포인트까지 만든다 (재시작 사이에 새 체결은 없다고 본다)
+        start = time.perf_counter()
+        resumed = PnlLedger(checkpoint)
+        resumed.sync(journal)
+        resume_ms = (time.perf_counter() - start) * 1000
+        print(f"restart with {full.fills:,} fills in journal: full replay {full_ms:.0f} ms, "
+              f"from checkpoint {resume_ms:.1f} ms (replayed {resumed.replayed})")
+        journal.close()
+
+
+if __name__ == '__main__':
+    main()
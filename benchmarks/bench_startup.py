@@ -0,0 +1,68 @@
+# 시작 시간 벤치마크
+# 1) 새 인터프리터에서 app.py 가 쓰는 모듈을 불러오는 시간과, 그 시점에 pandas / git 이 로드됐는지
+# 2) 응답이 느린 로컬 mock 서버에 대해 첫 화면까지 걸린 시간(first_paint_ms)과 전체 실행 시간
+#
+#   python benchmarks/bench_startup.py [API 지연(초)]
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mock_coinone import MockCoinone  # noqa: E402
+
+IMPORTS = ("import streamlit, coinone_api, execution, fill_tracker, market_data, markets, metrics, "
+           "order_batch, order_journal, order_store, request_scheduler, shared_cache")
+IMPORT_PROBE = f"""
+import sys, time
+start = time.perf_counter()
+{IMPORTS}
+print(time.perf_counter() - start, 'pandas' in sys.modules, 'git' in sys.modules)
+"""
+
+
+def measure_imports(runs=5):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', IMPORT_PROBE], cwd=ROOT, capture_output=True,
+                             text=True, check=True).stdout.split()
+        samples.append(float(out[0]) * 1000)
+    samples.sort()
+    print(f"module imports: p50 {samples[len(samples) // 2]:.1f} ms  "
+          f"(pandas loaded: {out[1]}, git loaded: {out[2]})")
+
+
+def measure_first_paint(mock):
+    from streamlit.testing.v1 import AppTest
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)  # 주문 저널/DB 는 임시 디렉토리에 만든다
+        at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=60)
+        at.secrets['api_url'] = mock.url
+        at.secrets['access_key'] = 'token'
+        at.secrets['private_key'] = 'secret'
+        start = time.perf_counter()
+        at.run()
+        total_ms = (time.perf_counter() - start) * 1000
+        os.chdir(ROOT)
+    if at.exception:
+        raise SystemExit(f"app error: {at.exception[0].value}")
+    print(f"cold session: first paint {at.session_state.first_paint_ms:.1f} ms  "
+          f"until fresh data {total_ms:.1f} ms  (API latency {mock.latency * 1000:.0f} ms)")
+
+
+def main():
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+    mock = MockCoinone('token', b'secret', latency=latency).start()
+
+    measure_imports()
+    measure_first_paint(mock)
+    mock.stop()
+
+
+if __name__ == '__main__':
+    main()
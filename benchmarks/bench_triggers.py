@@ -0,0 +1,109 @@
+# 조건부 주문 감시 벤치마크
+# N개의 조건을 걸어 둔 상태에서
+#   1) 아무것도 발동하지 않는 호가 갱신 한 번의 확인 시간 (정렬 색인 vs 전체 훑기)
+#   2) 조건 하나가 발동했을 때 갱신 ~ 전송 시작 / 갱신 ~ 주문 응답 시간 (원클릭 주문 경로 -> 로컬 모의 서버)
+# 을 잰다.
+#
+#   python benchmarks/bench_triggers.py [--counts 100 1000 10000] [--fires 200]
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coinone_api import CoinoneClient  # noqa: E402
+from fast_order import FastOrderPath  # noqa: E402
+from markets import Market  # noqa: E402
+from mock_coinone import MockCoinone  # noqa: E402
+from triggers import TriggerEngine  # noqa: E402
+
+MARKET = Market('KRW', 'USDT')
+TOKEN, SECRET = 'token', b'secret'
+
+
+def arm_many(engine, count, rng):
+    # 현재가(1400) 아래 손절 매도 / 위 익절 매도를 절반씩
+    for _ in range(count // 2):
+        engine.arm(MARKET, 'stop_loss', 'SELL', rng.uniform(1000, 1390), 1000, 1)
+        engine.arm(MARKET, 'take_profit', 'SELL', rng.uniform(1410, 1800), 1800, 1)
+
+
+def linear_scan(triggers, best_bid):
+    # 비교용: 갱신마다 모든 조건을 훑는 방식
+    return [t for t in triggers if (t.trigger_price >= best_bid if t.direction == 'below' else t.trigger_price <= best_bid)]
+
+
+def bench_checks(count, workdir):
+    engine = TriggerEngine(os.path.join(workdir, f'checks_{count}.jsonl'), lambda trigger: None)
+    arm_many(engine, count, random.Random(count))
+    updates = 20_000
+    start = time.perf_counter()
+    for i in range(updates):
+        engine.on_book(MARKET, 1400 + i % 3, 1401 + i % 3)
+    indexed_us = (time.perf_counter() - start) / updates * 1e6
+    triggers = engine.armed()
+    start = time.perf_counter()
+    for i in range(updates // 10):
+        linear_scan(triggers, 1400 + i % 3)
+    scan_us = (time.perf_counter() - start) / (updates // 10) * 1e6
+    print(f"{count:>6} armed: check per book update {indexed_us:.2f} us (full scan {scan_us:.1f} us)")
+    engine.close()
+
+
+def bench_fire(count, fires, workdir, mock):
+    client = CoinoneClient(TOKEN, SECRET, base_url=mock.url)
+    order_path = FastOrderPath(client, TOKEN, MARKET)
+    done = {}
+
+    def submit(trigger):
+        encoded, signature = order_path.prepare(trigger.side, trigger.price, trigger.qty, str(uuid.uuid4()),
+                                                extra=f'"user_order_id": "{trigger.trigger_id}", ')
+        order_path.send(encoded, signature)
+        done[trigger.trigger_id] = time.perf_counter()
+
+    executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='trigger')
+    engine = TriggerEngine(os.path.join(workdir, f'fire_{count}.jsonl'), submit, executor=executor)
+    arm_many(engine, count, random.Random(count))
+    client.warm('/public/v2/ticker_new/KRW', idle=0)
+    total = []
+    for i in range(fires):
+        # 현재가 바로 아래에 손절 하나를 걸고, 그 가격까지 내려오는 갱신을 넣는다
+        trigger = engine.arm(MARKET, 'stop_loss', 'SELL', 1399.5, 1399, 1)
+        start = time.perf_counter()
+        engine.on_book(MARKET, 1399.5, 1400.5)
+        while trigger.trigger_id not in done:
+            time.sleep(0.0001)
+        total.append((done[trigger.trigger_id] - start) * 1000)
+    executor.shutdown()
+    latency = engine.latency_stats()
+    total.sort()
+    print(f"{count:>6} armed: update -> submit start p50 {latency['p50_ms']:.3f} ms p99 {latency['p99_ms']:.3f} ms, "
+          f"update -> order response p50 {total[len(total) // 2]:.2f} ms p99 {total[int(len(total) * 0.99)]:.2f} ms "
+          f"(mean {statistics.mean(total):.2f})")
+    engine.close()
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--counts', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--fires', type=int, default=200)
+    args = parser.parse_args()
+    mock = MockCoinone(TOKEN, SECRET, balances={'KRW': 1e9, 'USDT': 1e6}).start()
+    with tempfile.TemporaryDirectory() as workdir:
+        for count in args.counts:
+            bench_checks(count, workdir)
+        for count in args.counts:
+            bench_fire(count, args.fires, workdir, mock)
+    mock.stop()
+
+
+if __name__ == '__main__':
+    main()
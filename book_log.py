@@ -0,0 +1,400 @@
+# 호가 녹화 / 재생
+# 피드 메시지(market_data 의 정규화된 snapshot/delta)를 압축한 바이너리 로그로 남기고,
+# 원하는 시각으로 바로 이동해서 1배~1000배 속도로 다시 흘려보낸다.
+#
+# 로그 파일 (.obl)
+#   헤더: b'OBL1' + 가격 배율 varint + 수량 배율 varint
+#   레코드: 길이 varint + 본문. 본문은 종류(u8), 시각, seq, 매수 레벨들, 매도 레벨들
+#     KEYFRAME: 호가 전체 (시각/seq 는 절대값)
+#     SNAPSHOT: 원래 스냅샷이던 메시지를 직전 상태와의 차이로만 저장 (재생할 때는 다시 전체 스냅샷으로)
+#     DELTA:    원래 델타였던 메시지 (재생할 때도 델타로)
+#   시각/seq 는 직전 레코드와의 차이, 레벨은 (직전 레벨과의 가격 차이, 수량) 을 정수 배율로 바꿔 zigzag varint 로 쓴다.
+#   수량 0 은 레벨 삭제. 파일 끝의 덜 쓴 레코드는 읽을 때 무시한다.
+# 색인 파일 (.obl.idx): KEYFRAME 마다 (시각 int64, 파일 위치 int64). 이동은 이진 탐색 후 가장 가까운
+#   KEYFRAME 부터 최대 keyframe_every 개 레코드만 풀면 된다.
+
+import mmap
+import os
+import threading
+import time
+
+import numpy as np
+
+MAGIC = b'OBL1'
+KEYFRAME, SNAPSHOT, DELTA = 0, 1, 2
+PRICE_SCALE = 10 ** 8
+QTY_SCALE = 10 ** 8
+MAX_SPEED = 1000.0
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write_signed(out, value):
+    _write_varint(out, (value << 1) ^ (value >> 63))
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _read_signed(data, pos):
+    value, pos = _read_varint(data, pos)
+    return (value >> 1) ^ -(value & 1), pos
+
+
+def _diff(old, new):
+    # 두 레벨 dict 의 차이 [(가격, 수량)] (사라진 레벨은 수량 0)
+    changes = [(price, qty) for price, qty in new.items() if old.get(price) != qty]
+    changes += [(price, 0) for price in old if price not in new]
+    return changes
+
+
+class BookRecorder:
+    # 피드 메시지를 받아 로그에 이어 쓴다. 다시 열면 상태를 모르므로 첫 레코드는 항상 KEYFRAME.
+    def __init__(self, path, keyframe_every=200, keyframe_seconds=60.0,
+                 price_scale=PRICE_SCALE, qty_scale=QTY_SCALE):
+        self.path = path
+        self.keyframe_every = keyframe_every
+        self.keyframe_ms = int(keyframe_seconds * 1000)
+        self.bids = {}  # 정수 가격 -> 정수 수량
+        self.asks = {}
+        self.records = 0
+        self.bytes = 0
+        self._since_keyframe = None  # None 이면 다음 레코드는 KEYFRAME
+        self._keyframe_ts = 0
+        self._prev_ts = 0
+        self._prev_seq = 0
+        self._lock = threading.Lock()
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new:
+            with open(path, 'rb') as f:
+                header = f.read(len(MAGIC))
+                if header != MAGIC:
+                    raise ValueError(f"{path}: 호가 로그 파일이 아닙니다.")
+                head = f.read(20)
+            price_scale, pos = _read_varint(head, 0)
+            qty_scale, _ = _read_varint(head, pos)
+            self._drop_partial_tail()
+        self.price_scale, self.qty_scale = price_scale, qty_scale
+        self._file = open(path, 'ab')
+        self._index = open(path + '.idx', 'ab')
+        if new:
+            header = bytearray(MAGIC)
+            _write_varint(header, price_scale)
+            _write_varint(header, qty_scale)
+            self._file.write(header)
+            self._file.flush()
+
+    def _drop_partial_tail(self):
+        # 쓰다 중단된 마지막 레코드를 잘라낸다 (그대로 두면 뒤에 이어 쓴 레코드를 읽을 수 없다)
+        log = BookLog(self.path)
+        _, offsets = log.index()
+        offset = int(offsets[-1]) if len(offsets) else log.data_start
+        with open(self.path, 'r+b') as f:
+            f.seek(offset)
+            data = f.read()
+            pos = 0
+            while pos < len(data):
+                try:
+                    length, body = _read_varint(data, pos)
+                except IndexError:
+                    break
+                if body + length > len(data):
+                    break
+                pos = body + length
+            if pos < len(data):
+                f.truncate(offset + pos)
+
+    def _levels(self, rows):
+        return {round(float(price) * self.price_scale): round(float(qty) * self.qty_scale) for price, qty in rows}
+
+    def record(self, message):
+        timestamp = int(message['timestamp'])
+        seq = int(message.get('seq') or 0)
+        bids, asks = self._levels(message['bids']), self._levels(message['asks'])
+        with self._lock:
+            keyframe = (self._since_keyframe is None or self._since_keyframe >= self.keyframe_every
+                        or timestamp - self._keyframe_ts >= self.keyframe_ms)
+            if message['type'] == 'snapshot':
+                bid_changes, ask_changes = _diff(self.bids, bids), _diff(self.asks, asks)
+                self.bids = {p: q for p, q in bids.items() if q > 0}
+                self.asks = {p: q for p, q in asks.items() if q > 0}
+                kind = SNAPSHOT
+            else:
+                bid_changes, ask_changes = list(bids.items()), list(asks.items())
+                for levels, changes in ((self.bids, bid_changes), (self.asks, ask_changes)):
+                    for price, qty in changes:
+                        if qty > 0:
+                            levels[price] = qty
+                        else:
+                            levels.pop(price, None)
+                kind = DELTA
+            if keyframe:
+                kind = KEYFRAME
+                bid_changes, ask_changes = list(self.bids.items()), list(self.asks.items())
+
+            body = bytearray([kind])
+            if kind == KEYFRAME:
+                _write_varint(body, timestamp)
+                _write_signed(body, seq)
+            else:
+                _write_signed(body, timestamp - self._prev_ts)
+                _write_signed(body, seq - self._prev_seq)
+            for changes in (bid_changes, ask_changes):
+                _write_varint(body, len(changes))
+                prev = 0
+                for price, qty in sorted(changes):
+                    _write_signed(body, price - prev)
+                    _write_varint(body, qty)
+                    prev = price
+            record = bytearray()
+            _write_varint(record, len(body))
+            record += body
+
+            offset = self._file.tell()
+            self._file.write(record)
+            if kind == KEYFRAME:
+                self._file.flush()  # 색인이 가리키는 위치는 항상 파일에 있어야 한다
+                self._index.write(np.array([timestamp, offset], dtype='<i8').tobytes())
+                self._index.flush()
+                self._since_keyframe = 0
+                self._keyframe_ts = timestamp
+            else:
+                self._since_keyframe += 1
+            self._prev_ts, self._prev_seq = timestamp, seq
+            self.records += 1
+            self.bytes += len(record)
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+            self._index.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            self._index.close()
+
+
+class BookLog:
+    # 녹화된 로그 읽기. messages(start) 는 start 시점의 호가를 스냅샷 하나로 만든 뒤 이후 메시지를 이어서 준다.
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            data = f.read(len(MAGIC) + 20)
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: 호가 로그 파일이 아닙니다.")
+        self.price_scale, pos = _read_varint(data, len(MAGIC))
+        self.qty_scale, pos = _read_varint(data, pos)
+        self.data_start = pos
+
+    def index(self):
+        # (KEYFRAME 시각 배열, 파일 위치 배열). 녹화 중에도 늘어나므로 매번 읽는다 (16바이트/KEYFRAME)
+        try:
+            raw = np.fromfile(self.path + '.idx', dtype='<i8')
+        except FileNotFoundError:
+            raw = np.empty(0, dtype='<i8')
+        raw = raw[:len(raw) // 2 * 2].reshape(-1, 2)
+        return raw[:, 0], raw[:, 1]
+
+    def time_range(self):
+        times, _ = self.index()
+        return (int(times[0]), int(times[-1])) if len(times) else (None, None)
+
+    def _records(self, offset):
+        # offset 부터 (종류, 시각, seq, 매수 변경, 매도 변경) 를 순서대로. 덜 쓴 마지막 레코드는 건너뛴다
+        # 파일 전체를 읽지 않고 mmap 으로 필요한 레코드만 본다 (이동 시간이 파일 크기와 무관)
+        with open(self.path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield from self._decode(data, offset)
+        finally:
+            data.close()
+
+    def _decode(self, data, pos):
+        end = len(data)
+        timestamp = seq = 0
+        while pos < end:
+            try:
+                length, body = _read_varint(data, pos)
+            except IndexError:
+                return
+            if body + length > end:
+                return
+            pos = body + length
+            kind = data[body]
+            p = body + 1
+            if kind == KEYFRAME:
+                timestamp, p = _read_varint(data, p)
+                seq, p = _read_signed(data, p)
+            else:
+                delta, p = _read_signed(data, p)
+                timestamp += delta
+                delta, p = _read_signed(data, p)
+                seq += delta
+            sides = []
+            for _ in range(2):
+                count, p = _read_varint(data, p)
+                price = 0
+                changes = []
+                for _ in range(count):
+                    step, p = _read_signed(data, p)
+                    price += step
+                    qty, p = _read_varint(data, p)
+                    changes.append((price, qty))
+                sides.append(changes)
+            yield kind, timestamp, seq, sides[0], sides[1]
+
+    def _start_offset(self, start):
+        times, offsets = self.index()
+        if start is None or not len(times):
+            return self.data_start
+        i = int(np.searchsorted(times, start, side='right')) - 1
+        return int(offsets[max(i, 0)])
+
+    def _levels(self, levels, reverse):
+        return [[price / self.price_scale, qty / self.qty_scale] for price, qty in sorted(levels.items(), reverse=reverse)]
+
+    def _snapshot(self, bids, asks, timestamp, seq):
+        return {'type': 'snapshot', 'seq': seq, 'timestamp': timestamp,
+                'bids': self._levels(bids, True), 'asks': self._levels(asks, False)}
+
+    def messages(self, start=None, end=None):
+        # [start, end) 구간의 피드 메시지. start 가 있으면 그 시점의 호가 스냅샷으로 시작한다.
+        bids, asks = {}, {}
+        pending = start is not None
+        for kind, timestamp, seq, bid_changes, ask_changes in self._records(self._start_offset(start)):
+            if end is not None and timestamp >= end:
+                return
+            if kind == KEYFRAME:
+                bids, asks = {}, {}
+            for levels, changes in ((bids, bid_changes), (asks, ask_changes)):
+                for price, qty in changes:
+                    if qty:
+                        levels[price] = qty
+                    else:
+                        levels.pop(price, None)
+            if pending:
+                if timestamp < start:
+                    continue  # start 직전까지는 상태만 맞춘다
+                pending = False
+                yield self._snapshot(bids, asks, timestamp, seq)
+            elif kind == DELTA:
+                yield {'type': 'delta', 'seq': seq, 'timestamp': timestamp,
+                       'bids': [[p / self.price_scale, q / self.qty_scale] for p, q in bid_changes],
+                       'asks': [[p / self.price_scale, q / self.qty_scale] for p, q in ask_changes]}
+            else:
+                yield self._snapshot(bids, asks, timestamp, seq)
+
+    def book_at(self, timestamp):
+        # timestamp 시점(그 이전 마지막 메시지 기준)의 호가 스냅샷. 녹화가 없으면 None
+        times, _ = self.index()
+        if not len(times) or timestamp < times[0]:
+            return None
+        last = None
+        for message in self.messages(start=int(times[np.searchsorted(times, timestamp, side='right') - 1])):
+            if message['timestamp'] > timestamp:
+                break
+            last = message
+        if last is None:
+            return None
+        if last['type'] == 'snapshot':
+            return last
+        # 마지막이 델타면 그 시점까지의 상태를 다시 스냅샷으로
+        return next(self.messages(start=last['timestamp']))
+
+
+class ReplayEngine:
+    # 로그를 실제 시간 간격의 1/speed 로 흘려보내는 피드 (MarketDataService 에 그대로 넣을 수 있다)
+    # 재생 중에 seek / set_speed 를 다른 스레드에서 불러도 된다. speed=None 이면 기다리지 않는다.
+    # hold: 끝까지 재생한 뒤 피드를 끝내지 않고 seek / close 를 기다린다 (서비스 스레드가 살아 있어야 이동할 수 있다)
+    def __init__(self, log, speed=1.0, start=None, end=None, clock=time.monotonic, hold=True):
+        self.log = log
+        self.hold = hold
+        self.finished = False  # 끝까지 재생하고 기다리는 중
+        self.speed = self._clamp(speed)
+        self.start = start
+        self.end = end
+        self.clock = clock
+        self.position = start  # 마지막으로 내보낸 메시지 시각
+        self.emitted = 0
+        self._seek_to = None
+        self._changed = threading.Event()  # seek / 속도 변경 / 종료
+        self._stop = threading.Event()
+
+    @staticmethod
+    def _clamp(speed):
+        return None if speed is None else min(max(float(speed), 1.0), MAX_SPEED)
+
+    def snapshot(self):
+        # 재시도용 스냅샷: 현재 재생 위치의 호가
+        return None if self.position is None else self.log.book_at(self.position)
+
+    def seek(self, timestamp):
+        self._seek_to = timestamp
+        self._changed.set()
+
+    def set_speed(self, speed):
+        # 대기 중인 메시지는 바뀐 속도로 다시 계산한다
+        self.speed = self._clamp(speed)
+        self._changed.set()
+
+    def messages(self):
+        start = self.start
+        while not self._stop.is_set():
+            self._changed.clear()
+            anchor = None  # (벽시계, 로그 시각, 속도)
+            seeked = start is not None
+            for message in self.log.messages(start=start, end=self.end):
+                # 다음 메시지 시각까지 기다린다. 속도가 바뀌면 마지막으로 내보낸 위치부터 다시 맞춘다
+                while not self._stop.is_set() and self._seek_to is None:
+                    speed = self.speed
+                    if speed is None:
+                        anchor = None
+                        break
+                    if anchor is None or anchor[2] != speed:
+                        since = self.position if anchor is not None else message['timestamp']
+                        anchor = (self.clock(), since, speed)
+                    wait = anchor[0] + (message['timestamp'] - anchor[1]) / 1000 / speed - self.clock()
+                    if wait <= 0 or not self._changed.wait(wait):
+                        break
+                    self._changed.clear()
+                if self._stop.is_set():
+                    return
+                if self._seek_to is not None:
+                    break
+                if seeked:
+                    # 이동 직후 스냅샷: 이전 위치보다 seq 가 작아도 호가창을 통째로 바꾸라는 표시
+                    message = dict(message, seek=True)
+                    seeked = False
+                self.position = message['timestamp']
+                self.emitted += 1
+                yield message
+            else:
+                # 끝까지 재생했다. 다른 시각으로 이동하거나 닫을 때까지 기다린다
+                if not self.hold:
+                    return
+                self.finished = True
+                while not self._stop.is_set() and self._seek_to is None:
+                    self._changed.wait()
+                    self._changed.clear()
+                self.finished = False
+                if self._stop.is_set():
+                    return
+            start, self._seek_to = self._seek_to, None
+
+    def close(self):
+        self._stop.set()
+        self._changed.set()
@@ -0,0 +1,139 @@
+# Coinone API 통신 모듈
+# 프로세스 전체에서 하나의 keep-alive 커넥션 풀을 공유해서
+# 매 호출마다 TCP/TLS 핸드셰이크를 새로 하지 않도록 한다.
+
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+
+API_URL = 'https://api.coinone.co.kr'
+
+# Coinone 오류 코드 (모의 서버와 모의 거래 엔진이 같은 응답을 만들 때 쓴다)
+ERROR_INVALID_SIGNATURE = '12'
+ERROR_INVALID_TOKEN = '11'
+ERROR_RATE_LIMITED = '24'
+ERROR_INJECTED = '151'  # 모의 서버가 일부러 실패시킨 요청
+ERROR_INVALID_PARAMETER = '107'
+ERROR_INSUFFICIENT_BALANCE = '103'
+ERROR_ORDER_NOT_FOUND = '104'
+ERROR_DUPLICATE_ORDER = '110'
+
+# (connect, read) 타임아웃 (초)
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+POOL_SIZE = 10
+
+
+def get_encoded_payload(payload):
+    payload['nonce'] = str(uuid.uuid4())  # nonce 추가
+    dumped_json = json.dumps(payload)
+    encoded_json = base64.b64encode(dumped_json.encode('utf-8'))  # UTF-8 인코딩 추가
+    return encoded_json.decode('utf-8')  # 결과를 문자열로 디코딩
+
+
+def get_signature(secret_key, encoded_payload):
+    signature = hmac.new(secret_key, encoded_payload.encode('utf-8'), hashlib.sha512)  # encoded_payload 인코딩
+    return signature.hexdigest()
+
+
+class HmacSigner:
+    # 비밀키로 초기화한 HMAC-SHA512 상태를 한 번 만들어 두고 복사해서 쓴다 (get_signature 와 같은 결과)
+    def __init__(self, secret_key):
+        self._base = hmac.new(secret_key, digestmod=hashlib.sha512)
+
+    def with_prefix(self, prefix):
+        # 서명 대상 앞부분이 항상 같을 때, 그 부분까지 반영한 상태를 미리 만들어 둔다
+        signer = HmacSigner.__new__(HmacSigner)
+        signer._base = self._base.copy()
+        signer._base.update(prefix)
+        return signer
+
+    def sign(self, data):
+        mac = self._base.copy()
+        mac.update(data)
+        return mac.hexdigest()
+
+
+class CoinoneClient:
+    # requests.Session 은 스레드 간 공유해도 urllib3 커넥션 풀 자체는 안전하다.
+    # 세션 설정(헤더, 어댑터)은 생성 시에만 바꾸고 이후에는 건드리지 않는다.
+    def __init__(self, access_token, secret_key, base_url=API_URL,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 pool_size=POOL_SIZE, metrics=None, payload_logger=None):
+        # metrics: metrics.ApiMetrics (요청 경로별 지연/오류 기록), payload_logger: metrics.PayloadLogger
+        self.metrics = metrics
+        self.payload_logger = payload_logger
+        self.access_token = access_token
+        self.secret_key = secret_key
+        self.signer = HmacSigner(secret_key)
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, pool_block=False)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.last_request = 0.0  # 마지막 요청 시각 (time.monotonic)
+
+    def post_private(self, action, payload, timeout=None):
+        encoded_payload = get_encoded_payload(payload)
+        return self.post_signed(action, encoded_payload, self.signer.sign(encoded_payload.encode('utf-8')), timeout)
+
+    def post_signed(self, action, encoded_payload, signature, timeout=None):
+        # 이미 인코딩/서명한 본문을 그대로 보낸다 (원클릭 주문 경로)
+        # timeout: 읽기 타임아웃 (초, 호출 마감 시간에 맞춰 줄일 때). 없으면 생성 시 설정
+        headers = {
+            'Content-type': 'application/json',
+            'X-COINONE-PAYLOAD': encoded_payload,
+            'X-COINONE-SIGNATURE': signature,
+        }
+        response = self._send(action, self.session.post, f'{self.base_url}{action}', data=encoded_payload,
+                              headers=headers, timeout=self._timeout(timeout))
+        return response.status_code, response.content
+
+    def get_public(self, path, params=None):
+        return self._send(path, self.session.get, f'{self.base_url}{path}', params=params,
+                          headers={'accept': 'application/json'}, timeout=self.timeout)
+
+    def _timeout(self, read_timeout):
+        if read_timeout is None:
+            return self.timeout
+        return (min(self.timeout[0], read_timeout), min(self.timeout[1], read_timeout))
+
+    def warm(self, path='/public/v2/ticker_new/KRW', idle=20.0):
+        # idle 초 넘게 요청이 없었으면 가벼운 공개 요청으로 keep-alive 커넥션을 미리 열어 둔다
+        if time.monotonic() - self.last_request < idle:
+            return False
+        self.get_public(path).close()
+        return True
+
+    def _send(self, endpoint, method, url, **kwargs):
+        self.last_request = time.monotonic()
+        start = time.perf_counter()
+        try:
+            response = method(url, **kwargs)
+        except requests.Timeout:
+            if self.metrics is not None:
+                self.metrics.record_timeout(endpoint)
+            raise
+        if self.metrics is not None:
+            error_code = None if response.status_code == 200 else f'http_{response.status_code}'
+            self.metrics.observe(endpoint, time.perf_counter() - start, error_code)
+        if self.payload_logger is not None:
+            self.payload_logger.maybe_log(endpoint, response.status_code, response.content)
+        return response
+
+    def close(self):
+        with self._lock:
+            if not self._closed:
+                self.session.close()
+                self._closed = True
@@ -0,0 +1,99 @@
+# 추가 전용 열 저장소 (memory-mapped NumPy)
+# 디렉토리 하나가 표 하나. 열마다 고정 dtype 원시 파일(<열>.bin)을 두고 끝에 이어 쓴다.
+# meta.json 의 rows 가 확정된 행 수이고, 쓰다 중단돼서 남은 뒷부분은 다음에 열 때 잘라낸다.
+# 읽을 때는 파일을 np.memmap 으로 열어 필요한 구간만 잘라 본다 (JSON 파싱/복사 없음).
+# 첫 열(정렬 키, 보통 timestamp)은 오름차순으로만 추가한다고 가정하고 구간 검색에 쓴다.
+
+import json
+import os
+import threading
+
+import numpy as np
+
+
+class ColumnStore:
+    def __init__(self, path, schema):
+        # schema: [(열 이름, dtype)]. 첫 열이 정렬 키
+        self.path = path
+        self.schema = [(name, np.dtype(dtype)) for name, dtype in schema]
+        self.key = self.schema[0][0]
+        self._lock = threading.Lock()
+        self._maps = {}  # 열 이름 -> (행 수, memmap)
+        os.makedirs(path, exist_ok=True)
+        meta = self._read_meta()
+        if meta is not None and meta['columns'] != [[name, dtype.str] for name, dtype in self.schema]:
+            raise ValueError(f"{path}: 저장된 열 구성이 다릅니다 {meta['columns']}")
+        self.rows = meta['rows'] if meta else 0
+        self.meta = meta.get('extra', {}) if meta else {}
+        for name, dtype in self.schema:
+            self._truncate(name, dtype)
+
+    def _file(self, name):
+        return os.path.join(self.path, f'{name}.bin')
+
+    def _read_meta(self):
+        try:
+            with open(os.path.join(self.path, 'meta.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self):
+        # 임시 파일에 쓰고 바꿔치기 (rows 는 모든 열을 쓴 뒤에만 늘어난다)
+        meta = {'columns': [[name, dtype.str] for name, dtype in self.schema], 'rows': self.rows,
+                'extra': self.meta}
+        tmp = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, 'meta.json'))
+
+    def _truncate(self, name, dtype):
+        # 확정되지 않은 꼬리 행 제거 (없는 파일은 빈 파일로)
+        with open(self._file(name), 'ab') as f:
+            if f.tell() != self.rows * dtype.itemsize:
+                f.truncate(self.rows * dtype.itemsize)
+
+    def append(self, columns, **meta):
+        # columns: {열 이름: 배열}. meta 는 행과 함께 확정할 부가 정보 (예: 수집 커서)
+        arrays = [np.ascontiguousarray(columns[name], dtype=dtype) for name, dtype in self.schema]
+        n = len(arrays[0])
+        if any(len(array) != n for array in arrays):
+            raise ValueError("열 길이가 서로 다릅니다.")
+        with self._lock:
+            if n:
+                last = self.last(self.key)
+                if last is not None and arrays[0][0] < last:
+                    raise ValueError(f"{self.key} 는 오름차순으로만 추가할 수 있습니다.")
+                for (name, _), array in zip(self.schema, arrays):
+                    with open(self._file(name), 'ab') as f:
+                        f.write(array.tobytes())
+                self.rows += n
+            self.meta.update(meta)
+            self._write_meta()
+        return n
+
+    def column(self, name):
+        # 확정된 전체 행의 읽기 전용 memmap (행 수가 그대로면 다시 열지 않는다)
+        rows = self.rows
+        cached = self._maps.get(name)
+        if cached is not None and cached[0] == rows:
+            return cached[1]
+        dtype = dict(self.schema)[name]
+        if rows == 0:
+            array = np.empty(0, dtype=dtype)
+        else:
+            array = np.memmap(self._file(name), dtype=dtype, mode='r', shape=(rows,))
+        self._maps[name] = (rows, array)
+        return array
+
+    def last(self, name):
+        return self.column(name)[-1].item() if self.rows else None
+
+    def window(self, start=None, end=None, columns=None):
+        # 정렬 키가 [start, end) 인 행. {열 이름: memmap 구간} (복사 없음)
+        keys = self.column(self.key)
+        lo = 0 if start is None else int(np.searchsorted(keys, start, side='left'))
+        hi = len(keys) if end is None else int(np.searchsorted(keys, end, side='left'))
+        return {name: self.column(name)[lo:hi] for name in (columns or [name for name, _ in self.schema])}
@@ -0,0 +1,195 @@
+# 분할 집행 엔진 (TWAP / 아이스버그)
+# 큰 수량을 여러 개의 자식 주문으로 나눠서 보낸다.
+# - 자식 주문 크기는 허용 슬리피지 안쪽 호가 잔량의 일정 비율을 넘지 않는다
+# - 자식 주문은 한계 가격의 지정가로 내서 허용 슬리피지보다 나쁜 가격에는 체결되지 않는다
+# - 체결 확인은 다음 조각 전송과 함께 진행하고, 오래 남은 자식 주문은 취소 후 다시 나눈다
+#
+# exchange 는 다음 메서드를 가진 객체 (실거래 / 모의 거래소 공통)
+#   book() -> (bids, asks)  각각 [(price, qty), ...] 최우선 호가부터
+#   place_limit(side, price, qty) -> order_id (실패 시 None)
+#   cancel(order_id) -> bool
+#   order_status(order_id) -> (status, executed_qty, avg_price)  (실패 시 None)
+
+import math
+import time
+
+TERMINAL_STATUSES = {'FILLED', 'CANCELED', 'PARTIALLY_CANCELED'}
+STRATEGIES = {'twap': 'TWAP (시간 분할)', 'iceberg': '아이스버그 (체결 후 다음 조각)'}
+
+
+class ChildOrder:
+    __slots__ = ('order_id', 'price', 'qty', 'executed_qty', 'avg_price', 'placed_at', 'status', 'cancel_sent_at')
+
+    def __init__(self, order_id, price, qty, placed_at):
+        self.order_id = order_id
+        self.price = price
+        self.qty = qty
+        self.executed_qty = 0.0
+        self.avg_price = 0.0
+        self.placed_at = placed_at
+        self.status = 'LIVE'
+        self.cancel_sent_at = None  # 마지막 취소 요청 시각
+
+    @property
+    def done(self):
+        return self.status in TERMINAL_STATUSES
+
+    def as_dict(self):
+        return {'order_id': self.order_id, 'price': self.price, 'qty': self.qty,
+                'executed_qty': self.executed_qty, 'avg_price': self.avg_price, 'status': self.status}
+
+
+class SlicedExecution:
+    def __init__(self, exchange, side, quantity, strategy='twap', slices=5, interval=2.0,
+                 max_slippage=0.003, depth_fraction=0.5, child_timeout=5.0, min_child_qty=None,
+                 tick=1, qty_decimals=4, deadline=120.0, poll_interval=0.3,
+                 clock=time.monotonic, sleep=time.sleep):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"알 수 없는 집행 방식: {strategy}")
+        if quantity <= 0 or slices < 1:
+            raise ValueError("수량과 분할 수는 0보다 커야 합니다.")
+        self.exchange = exchange
+        self.side = side
+        self.quantity = quantity
+        self.strategy = strategy
+        self.slice_qty = quantity / slices
+        self.interval = interval if strategy == 'twap' else 0.0
+        self.max_slippage = max_slippage
+        self.depth_fraction = depth_fraction
+        self.child_timeout = child_timeout
+        self.tick = tick
+        self.qty_scale = 10 ** qty_decimals
+        # 자식 주문 최소 수량 (거래소 최소 주문 수량). 주지 않으면 수량 단위 하나
+        self.min_child_qty = min_child_qty if min_child_qty is not None else 1 / self.qty_scale
+        self.deadline = deadline
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.sleep = sleep
+        self.children = []
+        self.arrival_price = None
+        self.limit_price = None
+
+    def _floor_qty(self, qty):
+        # 0.07 * 10000 = 699.999... 같은 부동소수 오차로 한 단위가 깎이지 않게 한다
+        return math.floor(qty * self.qty_scale + 1e-9) / self.qty_scale
+
+    def _set_limit_price(self, bids, asks):
+        if self.side == 'SELL':
+            self.arrival_price = bids[0][0]
+            self.limit_price = math.ceil(self.arrival_price * (1 - self.max_slippage) / self.tick) * self.tick
+        else:
+            self.arrival_price = asks[0][0]
+            self.limit_price = math.floor(self.arrival_price * (1 + self.max_slippage) / self.tick) * self.tick
+
+    def _available_depth(self, bids, asks):
+        # 한계 가격 안쪽에 쌓인 상대편 잔량
+        if self.side == 'SELL':
+            return sum(qty for price, qty in bids if price >= self.limit_price)
+        return sum(qty for price, qty in asks if price <= self.limit_price)
+
+    @property
+    def executed_qty(self):
+        return sum(child.executed_qty for child in self.children)
+
+    def _open_children(self):
+        return [child for child in self.children if not child.done]
+
+    def _refresh_children(self, now, final=False):
+        # final: 집행을 끝낼 때. 끝나지 않은 자식 주문은 모두 (다시) 취소한다
+        for child in self._open_children():
+            status = self.exchange.order_status(child.order_id)
+            if status is not None:
+                child.status, child.executed_qty, child.avg_price = status
+            if not child.done and (final or (now - child.placed_at > self.child_timeout and (
+                    child.cancel_sent_at is None or now - child.cancel_sent_at > self.child_timeout))):
+                # 오래 남은 자식 주문은 취소한다. 거래소에서 끝난 상태를 확인하기 전까지는 열린 주문으로 두어
+                # 남은 수량을 다시 나누지 않는다 (취소가 실패했으면 다음 확인 때 다시 보낸다)
+                self.exchange.cancel(child.order_id)
+                child.cancel_sent_at = now
+                status = self.exchange.order_status(child.order_id)
+                if status is not None:
+                    child.status, child.executed_qty, child.avg_price = status
+
+    def _next_child_qty(self, remaining, bids, asks):
+        qty = self.slice_qty if remaining - self.slice_qty >= self.min_child_qty else remaining
+        qty = min(qty, self._available_depth(bids, asks) * self.depth_fraction)
+        return self._floor_qty(qty)
+
+    def run(self, on_progress=None):
+        if self.quantity < self.min_child_qty:
+            return self.report('aborted', f'수량이 최소 주문 수량 {self.min_child_qty:g} 보다 작습니다.')
+        bids, asks = self.exchange.book()
+        if not (bids if self.side == 'SELL' else asks):
+            return self.report('aborted', '호가 정보가 없습니다.')
+        self._set_limit_price(bids, asks)
+
+        start = self.clock()
+        next_slice_at = start
+        message = ''
+        while True:
+            now = self.clock()
+            self._refresh_children(now)
+            open_children = self._open_children()
+            open_qty = sum(child.qty - child.executed_qty for child in open_children)
+            remaining = self.quantity - self.executed_qty - open_qty
+
+            if remaining < self.min_child_qty and not open_children:
+                break
+            if now - start > self.deadline:
+                message = '제한 시간을 초과했습니다.'
+                break
+
+            ready = now >= next_slice_at and (self.strategy == 'twap' or not open_children)
+            if ready and remaining >= self.min_child_qty:
+                bids, asks = self.exchange.book()
+                qty = self._next_child_qty(remaining, bids, asks)
+                if qty >= self.min_child_qty:
+                    order_id = self.exchange.place_limit(self.side, self.limit_price, qty)
+                    if order_id is None:
+                        message = '자식 주문 전송에 실패했습니다.'
+                        break
+                    self.children.append(ChildOrder(order_id, self.limit_price, qty, now))
+                    next_slice_at = now + self.interval
+                    if on_progress:
+                        on_progress(self)
+                # 허용 슬리피지 안쪽 잔량이 부족하면 호가가 다시 쌓일 때까지 기다린다
+            self.sleep(self.poll_interval)
+
+        # 남은 자식 주문을 취소하고 끝난 상태를 확인한다 (몇 번까지 다시 시도)
+        for _ in range(3):
+            self._refresh_children(self.clock(), final=True)
+            if not self._open_children():
+                break
+            self.sleep(self.poll_interval)
+        unconfirmed = self._open_children()
+        if unconfirmed:
+            # 아직 살아 있을 수 있는 주문이 있으면 취소됐다고 가정하지 않는다
+            return self.report('partial', f'자식 주문 {len(unconfirmed)}건의 최종 상태를 확인하지 못했습니다. '
+                                          f'체결 수량이 더 늘어날 수 있습니다. {message}'.strip())
+
+        # 하나도 체결되지 않았으면 완료로 보지 않는다
+        remaining = self.quantity - self.executed_qty
+        if self.executed_qty <= 0:
+            return self.report('aborted', message or '체결된 수량이 없습니다.')
+        status = 'completed' if remaining < self.min_child_qty else 'partial'
+        return self.report(status, message)
+
+    def report(self, status, message=''):
+        executed = self.executed_qty
+        notional = sum(child.executed_qty * child.avg_price for child in self.children)
+        avg_price = notional / executed if executed else 0.0
+        slippage = 0.0
+        if executed and self.arrival_price:
+            sign = 1 if self.side == 'SELL' else -1
+            slippage = sign * (self.arrival_price - avg_price) / self.arrival_price
+        return {
+            'status': status,
+            'message': message,
+            'quantity': self.quantity,
+            'executed_qty': executed,
+            'avg_price': avg_price,
+            'arrival_price': self.arrival_price,
+            'limit_price': self.limit_price,
+            'slippage': slippage,
+            'children': [child.as_dict() for child in self.children],
+        }
@@ -0,0 +1,93 @@
+# 원클릭 주문 전송 경로
+# 클릭부터 전송까지 매번 하던 일을 마켓/방향별로 미리 해 둔다.
+# - 주문 본문 JSON 중 바뀌지 않는 앞부분(토큰, 마켓, 방향, 유형)을 미리 base64 로 인코딩
+#   (앞부분 길이를 3바이트 배수로 맞춰 두면 base64 결과를 이어 붙일 수 있다)
+# - 그 앞부분까지 반영한 HMAC-SHA512 상태를 만들어 두고 복사해서 나머지만 서명
+# - 최소 주문 금액/수량 같은 검증 기준은 마켓별로 한 번만 정한다
+# 결과 본문과 서명은 get_encoded_payload / get_signature 로 만든 것과 같은 형식이다.
+
+import base64
+import json
+import math
+from collections import namedtuple
+
+from markets import Market, price_tick
+
+# 마켓별 주문 검증 기준. 마켓별 값이 없으면 호가 통화별 값을 쓴다.
+# USDT 는 예전 MIN_ORDER_QTY_USDT(0.001) 를 그대로 쓰고, 다른 원화 마켓은 최소 주문 금액(1,000원)이 기준이 된다.
+OrderLimits = namedtuple('OrderLimits', ['min_amount', 'min_qty', 'qty_decimals'])
+MARKET_LIMITS = {Market('KRW', 'USDT'): OrderLimits(1000, 0.001, 4)}
+DEFAULT_LIMITS = {'KRW': OrderLimits(1000, 0.0001, 4)}
+FALLBACK_LIMITS = OrderLimits(0, 0.0001, 4)
+
+
+def order_limits(market):
+    return MARKET_LIMITS.get(market) or DEFAULT_LIMITS.get(market.quote, FALLBACK_LIMITS)
+
+
+def format_price(price):
+    # 호가 단위에 맞는 소수 자릿수 (최소 2자리)
+    decimals = max(2, -math.floor(math.log10(price_tick(price))))
+    return f"{price:.{decimals}f}"
+
+
+class OrderTemplate:
+    def __init__(self, signer, access_token, market, side, order_type='LIMIT'):
+        fixed = json.dumps({
+            'access_token': access_token,
+            'side': side,
+            'quote_currency': market.quote,
+            'target_currency': market.target,
+            'type': order_type,
+            'post_only': False,
+        })[:-1] + ', '
+        # JSON 공백으로 길이를 3의 배수로 맞춘다
+        fixed += ' ' * (-len(fixed.encode('utf-8')) % 3)
+        self.encoded_prefix = base64.b64encode(fixed.encode('utf-8'))
+        self.signer = signer.with_prefix(self.encoded_prefix)
+
+    def encode(self, price_text, qty_text, nonce, extra=''):
+        # (X-COINONE-PAYLOAD 문자열, 서명). extra 는 '"key": "value", ' 형태의 추가 필드
+        rest = base64.b64encode(f'{extra}"price": "{price_text}", "qty": "{qty_text}", "nonce": "{nonce}"}}'
+                                .encode('utf-8'))
+        return (self.encoded_prefix + rest).decode('ascii'), self.signer.sign(rest)
+
+
+class FastOrderPath:
+    def __init__(self, client, access_token, market, limits=None):
+        self.client = client
+        self.market = market
+        self.limits = limits or order_limits(market)
+        self.access_token = access_token
+        self.templates = {(side, 'LIMIT'): OrderTemplate(client.signer, access_token, market, side)
+                          for side in ('BUY', 'SELL')}
+
+    def template(self, side, order_type='LIMIT'):
+        template = self.templates.get((side, order_type))
+        if template is None:
+            template = self.templates[(side, order_type)] = OrderTemplate(
+                self.client.signer, self.access_token, self.market, side, order_type)
+        return template
+
+    def validate(self, price, quantity):
+        # submit_order 의 기존 검증과 같은 순서/메시지
+        if price <= 0 or quantity <= 0:
+            raise ValueError("가격 및 수량은 0보다 커야 합니다.")
+        if price * quantity < self.limits.min_amount:
+            raise ValueError(f"주문 금액이 최소 금액 {self.limits.min_amount} {self.market.quote}보다 작습니다.")
+        if quantity < self.limits.min_qty:
+            raise ValueError(f"주문 수량이 최소 수량 {self.limits.min_qty} {self.market.target}보다 작습니다.")
+        tick = price_tick(price)
+        if abs(price / tick - round(price / tick)) > 1e-6:
+            raise ValueError(f"주문 가격이 호가 단위 {tick:g} {self.market.quote}에 맞지 않습니다.")
+
+    def prepare(self, side, price, quantity, nonce, order_type='LIMIT', extra=''):
+        # 검증 후 (인코딩된 본문, 서명)
+        price = float(price)
+        quantity = float(quantity)
+        self.validate(price, quantity)
+        qty_text = f"{quantity:.{self.limits.qty_decimals}f}"
+        return self.template(side, order_type).encode(format_price(price), qty_text, nonce, extra)
+
+    def send(self, encoded_payload, signature, timeout=None):
+        return self.client.post_signed('/v2.1/order', encoded_payload, signature, timeout)
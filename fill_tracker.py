@@ -0,0 +1,166 @@
+# 주문 체결 추적기
+# 접수된 주문을 백그라운드에서 확인해서 체결/부분 체결/취소를 이벤트로 알린다.
+# - 추적 중인 주문 전체를 미체결 주문 조회 한 번으로 확인한다 (주문마다 따로 조회하지 않음)
+# - 미체결 목록에서 사라진 주문만 상세 조회로 최종 상태를 확인한다
+# - 방금 접수한 주문은 자주, 변화 없이 오래된 주문은 점점 드물게 확인한다
+
+import threading
+import time
+from collections import deque
+
+TERMINAL_STATUSES = {'FILLED', 'CANCELED', 'PARTIALLY_CANCELED'}
+
+
+class TrackedOrder:
+    __slots__ = ('uuid', 'order_id', 'info', 'executed_qty', 'interval', 'next_poll', 'created')
+
+    def __init__(self, order_uuid, order_id, info, interval):
+        now = time.monotonic()
+        self.uuid = order_uuid
+        self.order_id = order_id
+        self.info = info
+        self.executed_qty = 0.0
+        self.interval = interval
+        self.next_poll = now + interval
+        self.created = now
+
+
+class FillTracker:
+    def __init__(self, fetch_active_orders, fetch_order_detail, min_interval=0.5, max_interval=30.0,
+                 backoff=1.6, max_events=500):
+        # fetch_active_orders(market) -> 미체결 주문 목록 (실패 시 None)
+        # fetch_order_detail(order_id, market) -> 주문 상세 dict (실패 시 None)
+        # market 은 track() 에 넘긴 info['market'] (없으면 None)
+        self.fetch_active_orders = fetch_active_orders
+        self.fetch_order_detail = fetch_order_detail
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.stats = {'polls': 0, 'detail_calls': 0, 'events': 0, 'errors': 0}
+        self.events = deque(maxlen=max_events)  # (순번, 이벤트)
+        self._event_seq = 0
+        self._listeners = []
+        self._orders = {}  # order_id -> TrackedOrder
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='fill-tracker', daemon=True)
+        self._thread.start()
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def track(self, order_uuid, order_id, info=None):
+        if not order_id:
+            return
+        with self._cond:
+            self._orders[order_id] = TrackedOrder(order_uuid, order_id, info or {}, self.min_interval)
+            self._cond.notify()
+
+    def tracked(self):
+        with self._cond:
+            return {o.order_id: {'uuid': o.uuid, 'executed_qty': o.executed_qty, 'interval': o.interval}
+                    for o in self._orders.values()}
+
+    def events_since(self, seq):
+        # seq 이후의 이벤트 목록과 마지막 순번
+        with self._cond:
+            events = [event for event_seq, event in self.events if event_seq > seq]
+            return events, self._event_seq
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._orders:
+                    self._cond.wait()
+                    continue
+                now = time.monotonic()
+                wait = min(o.next_poll for o in self._orders.values()) - now
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                due = [o for o in self._orders.values() if o.next_poll <= now]
+            # 마켓마다 미체결 주문 조회 한 번
+            by_market = {}
+            for order in due:
+                by_market.setdefault(order.info.get('market'), []).append(order)
+            for market, orders in by_market.items():
+                try:
+                    self._poll(market, orders)
+                except Exception:
+                    self.stats['errors'] += 1
+                    self._reschedule(orders, grow=True)
+
+    def _reschedule(self, orders, grow):
+        now = time.monotonic()
+        with self._cond:
+            for order in orders:
+                if grow:
+                    order.interval = min(order.interval * self.backoff, self.max_interval)
+                else:
+                    order.interval = self.min_interval
+                order.next_poll = now + order.interval
+
+    def _poll(self, market, due):
+        self.stats['polls'] += 1
+        active_orders = self.fetch_active_orders(market)
+        if active_orders is None:
+            self.stats['errors'] += 1
+            return self._reschedule(due, grow=True)
+        active_by_id = {o.get('order_id'): o for o in active_orders}
+
+        for order in due:
+            active = active_by_id.get(order.order_id)
+            if active is not None:
+                changed = self._update_executed(order, active, 'LIVE')
+                self._reschedule([order], grow=not changed)
+                continue
+
+            # 미체결 목록에 없으면 상세 조회로 최종 상태 확인
+            self.stats['detail_calls'] += 1
+            detail = self.fetch_order_detail(order.order_id, market)
+            if detail is None:
+                self._reschedule([order], grow=True)
+                continue
+            status = detail.get('status', '')
+            self._update_executed(order, detail, status)
+            if status in TERMINAL_STATUSES:
+                with self._cond:
+                    self._orders.pop(order.order_id, None)
+                if status != 'FILLED':
+                    self._emit(order, 'cancelled', detail, 0.0)
+            else:
+                self._reschedule([order], grow=True)
+
+    def _update_executed(self, order, data, status):
+        executed = float(data.get('executed_qty') or 0)
+        if executed <= order.executed_qty:
+            return False
+        delta = executed - order.executed_qty
+        order.executed_qty = executed
+        self._emit(order, 'filled' if status == 'FILLED' else 'partially_filled', data, delta)
+        return True
+
+    def _emit(self, order, kind, data, delta):
+        event = {
+            'type': kind,
+            'uuid': order.uuid,
+            'order_id': order.order_id,
+            'market': order.info.get('market'),
+            'side': order.info.get('side'),
+            'order_type': order.info.get('type'),
+            'price': order.info.get('price'),
+            'quantity': order.info.get('quantity'),
+            'executed_qty': order.executed_qty,
+            'delta_qty': delta,
+            'avg_price': data.get('average_executed_price') or data.get('avg_price'),
+            'status': data.get('status'),
+            'timestamp': time.time(),
+        }
+        with self._cond:
+            self._event_seq += 1
+            self.events.append((self._event_seq, event))
+            self.stats['events'] += 1
+        for callback in self._listeners:
+            try:
+                callback(event)
+            except Exception:
+                self.stats['errors'] += 1
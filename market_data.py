@@ -0,0 +1,360 @@
+# 호가 스트리밍 / 로컬 호가창 미러 모듈
+# 백그라운드 스레드가 피드(웹소켓, REST 폴링, 녹화 재생)에서 스냅샷/델타를 받아
+# 정렬된 L2 호가창을 메모리에 유지한다. UI 는 네트워크 호출 없이 여기서 최우선 호가를 읽는다.
+#
+# 피드 메시지 형식 (정규화된 dict)
+#   {"type": "snapshot" | "delta", "seq": int, "timestamp": ms,
+#    "bids": [[price, qty], ...], "asks": [[price, qty], ...]}
+# delta 에서 qty 가 0 이면 해당 가격 레벨 삭제.
+# 녹화 재생에서 시각을 옮긴 직후의 snapshot 에는 "seek": True 가 붙는다 (seq 가 되돌아가도 받아들인다).
+
+import json
+import threading
+import time
+from bisect import bisect_left, insort
+
+import numpy as np
+
+from orderbook import BookSnapshot
+
+WS_URL = 'wss://stream.coinone.co.kr'
+REST_URL = 'https://api.coinone.co.kr'
+
+
+def stream_url(api_url):
+    # REST 주소에 맞는 웹소켓 주소. 실서버가 아니면 같은 호스트의 ws(s):// 로 본다 (모의 서버 등)
+    if api_url.rstrip('/') == REST_URL:
+        return WS_URL
+    return 'ws' + api_url[len('http'):] if api_url.startswith('http') else api_url
+
+
+class SequenceGap(Exception):
+    pass
+
+
+class L2Book:
+    # 가격 -> 수량 dict 와 정렬된 가격 리스트로 구성. 둘 다 오름차순이며 최우선 매수는 bid 리스트의 마지막.
+    def __init__(self):
+        self.bids = {}
+        self.asks = {}
+        self._bid_prices = []
+        self._ask_prices = []
+        self.seq = None
+        self.timestamp = None
+
+    def clear(self):
+        self.bids.clear()
+        self.asks.clear()
+        self._bid_prices.clear()
+        self._ask_prices.clear()
+        self.seq = None
+
+    def apply_snapshot(self, bids, asks, seq=None, timestamp=None):
+        self.bids = {float(p): float(q) for p, q in bids if float(q) > 0}
+        self.asks = {float(p): float(q) for p, q in asks if float(q) > 0}
+        self._bid_prices = sorted(self.bids)
+        self._ask_prices = sorted(self.asks)
+        self.seq = seq
+        self.timestamp = timestamp
+
+    def apply_delta(self, bids, asks, seq, timestamp=None):
+        if self.seq is not None and seq != self.seq + 1:
+            raise SequenceGap(f"expected seq {self.seq + 1}, got {seq}")
+        for price, qty in bids:
+            self._set_level(self.bids, self._bid_prices, float(price), float(qty))
+        for price, qty in asks:
+            self._set_level(self.asks, self._ask_prices, float(price), float(qty))
+        self.seq = seq
+        self.timestamp = timestamp
+
+    @staticmethod
+    def _set_level(levels, prices, price, qty):
+        if qty <= 0:
+            if levels.pop(price, None) is not None:
+                del prices[bisect_left(prices, price)]
+        else:
+            if price not in levels:
+                insort(prices, price)
+            levels[price] = qty
+
+    def best_bid(self):
+        return self._bid_prices[-1] if self._bid_prices else None
+
+    def best_ask(self):
+        return self._ask_prices[0] if self._ask_prices else None
+
+    def top(self, depth=5):
+        # (매수 높은 가격순, 매도 낮은 가격순) 리스트 반환
+        bids = [(p, self.bids[p]) for p in reversed(self._bid_prices[-depth:])]
+        asks = [(p, self.asks[p]) for p in self._ask_prices[:depth]]
+        return bids, asks
+
+    def snapshot(self, depth=None):
+        # 배열 기반 스냅샷 (depth=None 이면 전체)
+        bid_prices = self._bid_prices[::-1] if depth is None else self._bid_prices[:-depth - 1:-1]
+        ask_prices = self._ask_prices if depth is None else self._ask_prices[:depth]
+        return BookSnapshot(np.array(bid_prices, dtype=np.float64),
+                            np.fromiter((self.bids[p] for p in bid_prices), np.float64, len(bid_prices)),
+                            np.array(ask_prices, dtype=np.float64),
+                            np.fromiter((self.asks[p] for p in ask_prices), np.float64, len(ask_prices)),
+                            self.seq, self.timestamp)
+
+
+def _levels(rows):
+    return [[row['price'], row['qty']] for row in rows]
+
+
+def normalize_orderbook(data):
+    # Coinone 호가 응답(REST / 웹소켓 공통 필드)을 스냅샷 메시지로 변환
+    return {
+        'type': 'snapshot',
+        'seq': int(data.get('id') or data.get('timestamp') or 0),
+        'timestamp': int(data.get('timestamp') or time.time() * 1000),
+        'bids': _levels(data.get('bids', [])),
+        'asks': _levels(data.get('asks', [])),
+    }
+
+
+class RestPollingFeed:
+    # 웹소켓을 쓸 수 없을 때의 대체 피드. 일정 간격으로 REST 스냅샷을 가져온다.
+    # cache(TTLCache) 를 주면 같은 호가 요청을 다른 사용처와 공유한다.
+    def __init__(self, client, quote='KRW', target='USDT', interval=0.5, size=15, cache=None):
+        self.client = client
+        self.path = f'/public/v2/orderbook/{quote}/{target}'
+        self.interval = interval
+        self.size = size
+        self.cache = cache
+        self._stop = threading.Event()
+
+    def _fetch(self):
+        return self.client.get_public(self.path, params={'size': self.size}).json()
+
+    def snapshot(self):
+        if self.cache is not None:
+            data = self.cache.get_or_load((self.path, self.size), self._fetch)
+        else:
+            data = self._fetch()
+        if data.get('result') != 'success':
+            raise RuntimeError(f"orderbook error: {data.get('error_code')}")
+        return normalize_orderbook(data)
+
+    def messages(self):
+        while not self._stop.is_set():
+            yield self.snapshot()
+            self._stop.wait(self.interval)
+
+    def close(self):
+        self._stop.set()
+
+
+class CoinoneWebSocketFeed:
+    # Coinone 공개 웹소켓 ORDERBOOK 채널. 메시지마다 전체 호가가 오므로 스냅샷으로 처리한다.
+    # 연결이 max_failures 번 연속 실패하면 rest_feed(REST 폴링)로 넘어간다.
+    PING_INTERVAL = 20 * 60  # 서버는 30분 동안 요청이 없으면 연결을 끊는다
+
+    def __init__(self, quote='KRW', target='USDT', rest_feed=None, url=WS_URL, max_failures=5):
+        import websocket  # websocket-client
+
+        self._websocket = websocket
+        self.url = url
+        self.topic = {'quote_currency': quote, 'target_currency': target}
+        self.rest_feed = rest_feed
+        self.max_failures = max_failures
+        self.failures = 0  # 연속 연결 실패 수
+        self.fallback = False  # REST 폴링으로 넘어갔는지
+        self._ws = None
+        self._stop = threading.Event()
+
+    def snapshot(self):
+        if self.rest_feed is None:
+            return None
+        return self.rest_feed.snapshot()
+
+    def _connect(self):
+        self._ws = self._websocket.create_connection(self.url, timeout=30)
+        self._ws.send(json.dumps({'request_type': 'SUBSCRIBE', 'channel': 'ORDERBOOK', 'topic': self.topic}))
+        self._last_ping = time.time()
+
+    def messages(self):
+        while not self._stop.is_set():
+            if self.fallback:
+                yield from self.rest_feed.messages()
+                return
+            try:
+                if self._ws is None:
+                    self._connect()
+                if time.time() - self._last_ping > self.PING_INTERVAL:
+                    self._ws.send(json.dumps({'request_type': 'PING'}))
+                    self._last_ping = time.time()
+                raw = self._ws.recv()
+            except Exception:
+                self._reset()
+                self.failures += 1
+                if self.rest_feed is not None and self.failures >= self.max_failures:
+                    self.fallback = True
+                    continue
+                self._stop.wait(1)
+                continue
+            self.failures = 0
+            message = json.loads(raw)
+            if message.get('response_type') == 'DATA' and message.get('channel') == 'ORDERBOOK':
+                yield normalize_orderbook(message['data'])
+
+    def _reset(self):
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+        self._ws = None
+
+    def close(self):
+        self._stop.set()
+        self._reset()
+        if self.rest_feed is not None:
+            self.rest_feed.close()
+
+
+class ReplayFeed:
+    # 녹화된 메시지(JSONL)를 재생하는 로컬 대체 피드. speed=None 이면 대기 없이 바로 재생.
+    def __init__(self, path, speed=None):
+        self.path = path
+        self.speed = speed
+
+    def snapshot(self):
+        # 재생 중에는 별도 스냅샷을 요청할 수 없으므로 다음 녹화 스냅샷을 기다린다
+        return None
+
+    def messages(self):
+        prev_ts = None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                message = json.loads(line)
+                if self.speed and prev_ts is not None:
+                    time.sleep(max(0, (message['timestamp'] - prev_ts) / 1000 / self.speed))
+                prev_ts = message['timestamp']
+                yield message
+
+    def close(self):
+        pass
+
+
+class MarketDataService:
+    # record_path: 받은 메시지를 JSONL 로 남긴다. recorder: book_log.BookRecorder 같은 record(message) 객체
+    def __init__(self, feed, record_path=None, recorder=None):
+        self.feed = feed
+        self.book = L2Book()
+        self.record_path = record_path
+        self.recorder = recorder
+        self._listeners = []
+        self.updates = 0
+        self.resyncs = 0
+        self.listener_errors = 0
+        self.last_error = None
+        self.last_update = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='market-data', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.feed.close()
+
+    def add_listener(self, callback):
+        # 호가창이 바뀔 때마다 피드 스레드에서 callback(self) 호출 (조건부 주문 감시 등. 오래 걸리는 일은 넘길 것)
+        self._listeners.append(callback)
+
+    def wait_ready(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def _run(self):
+        record = open(self.record_path, 'a', encoding='utf-8') if self.record_path else None
+        try:
+            while not self._stop.is_set():
+                try:
+                    for message in self.feed.messages():
+                        if record is not None:
+                            record.write(json.dumps(message) + '\n')
+                        if self.recorder is not None:
+                            self.recorder.record(message)
+                        self.on_message(message)
+                    break  # 재생 피드처럼 끝이 있는 피드
+                except Exception as e:
+                    # 네트워크 오류 등으로 피드가 끊기면 잠시 후 다시 연결
+                    self.last_error = e
+                    self._stop.wait(1)
+        finally:
+            if record is not None:
+                record.close()
+            if self.recorder is not None:
+                self.recorder.close()
+
+    def on_message(self, message):
+        with self._lock:
+            if message['type'] == 'snapshot':
+                # 웹소켓 재연결 등으로 순서가 뒤바뀐 오래된 스냅샷은 버린다
+                if (self.book.seq is not None and message['seq'] and message['seq'] < self.book.seq
+                        and not message.get('seek')):
+                    return
+                self.book.apply_snapshot(message['bids'], message['asks'], message['seq'], message['timestamp'])
+            elif self.book.seq is None:
+                return  # 스냅샷을 받기 전의 델타는 의미가 없다
+            else:
+                try:
+                    self.book.apply_delta(message['bids'], message['asks'], message['seq'], message['timestamp'])
+                except SequenceGap as e:
+                    # 누락이 생긴 호가창은 비우고, 락 밖에서 새 스냅샷을 받아 다시 맞춘다
+                    self.last_error = e
+                    self.resyncs += 1
+                    self.book.clear()
+                    self.last_update = None
+                    message = None
+            if message is not None:
+                self.updates += 1
+                self.last_update = time.time()
+        if message is None:
+            self._resync()
+        else:
+            self._ready.set()
+            for callback in self._listeners:
+                # 리스너 오류로 피드가 다시 연결되거나 재생이 처음부터 시작되지 않게 여기서 끊는다
+                try:
+                    callback(self)
+                except Exception as e:
+                    self.last_error = e
+                    self.listener_errors += 1
+
+    def _resync(self):
+        try:
+            snapshot = self.feed.snapshot()
+        except Exception as e:
+            self.last_error = e
+            return
+        if snapshot is not None:
+            self.on_message(snapshot)
+
+    def age(self):
+        # 마지막 갱신 이후 경과 시간(초). 아직 호가가 없으면 None
+        last_update = self.last_update
+        return None if last_update is None else time.time() - last_update
+
+    def top(self, depth=5):
+        with self._lock:
+            return self.book.top(depth)
+
+    def snapshot(self, depth=None):
+        with self._lock:
+            return self.book.snapshot(depth)
+
+    def best_bid_ask(self):
+        with self._lock:
+            return self.book.best_bid(), self.book.best_ask()
@@ -0,0 +1,94 @@
+# 마켓 레지스트리와 다중 마켓 시세 일괄 조회
+# 전체 시세는 마켓 수와 관계없이 호가 통화별 한 번의 요청(ticker_new)으로 가져온다.
+# 마켓별 호가창은 market_data.MarketDataService 가 마켓마다 따로 유지한다.
+
+import threading
+from collections import namedtuple
+
+
+class Market(namedtuple('Market', ['quote', 'target'])):
+    __slots__ = ()
+
+    def __str__(self):
+        return f"{self.target}/{self.quote}"
+
+
+DEFAULT_MARKET = Market('KRW', 'USDT')
+
+
+def parse_market(text, quote='KRW'):
+    # "BTC", "btc/krw", "KRW-BTC" 형식을 Market 으로 변환
+    text = text.strip().upper()
+    if '/' in text:
+        target, quote = text.split('/', 1)
+    elif '-' in text:
+        quote, target = text.split('-', 1)
+    else:
+        target = text
+    if not target or not quote:
+        raise ValueError(f"잘못된 마켓 이름: {text}")
+    return Market(quote, target)
+
+
+# 원화 마켓 가격대별 호가 단위: (가격 하한, 호가 단위), 높은 가격대부터
+KRW_TICK_BANDS = (
+    (1_000_000, 1000),
+    (500_000, 500),
+    (100_000, 100),
+    (50_000, 50),
+    (10_000, 10),
+    (5_000, 5),
+    (1_000, 1),
+    (100, 0.1),
+    (10, 0.01),
+    (1, 0.001),
+    (0.1, 0.0001),
+    (0, 0.00001),
+)
+
+
+def price_tick(price):
+    # 가격이 속한 가격대의 호가 단위
+    for floor, tick in KRW_TICK_BANDS:
+        if price >= floor:
+            return tick
+    return KRW_TICK_BANDS[-1][1]
+
+
+class MarketRegistry:
+    def __init__(self, markets=(DEFAULT_MARKET,)):
+        self._lock = threading.Lock()
+        self._markets = list(dict.fromkeys(markets))
+
+    def watched(self):
+        with self._lock:
+            return list(self._markets)
+
+    def add(self, market):
+        with self._lock:
+            if market not in self._markets:
+                self._markets.append(market)
+
+    def remove(self, market):
+        with self._lock:
+            if market in self._markets and len(self._markets) > 1:
+                self._markets.remove(market)
+
+    def currencies(self):
+        # 잔고 조회 시 남길 통화 목록 (대문자)
+        with self._lock:
+            return {m.quote for m in self._markets} | {m.target for m in self._markets}
+
+
+def fetch_tickers(fetch_public, markets):
+    # 호가 통화별 전체 시세를 한 번씩만 조회해서 관심 마켓 것만 골라낸다
+    tickers = {}
+    for quote in sorted({m.quote for m in markets}):
+        data = fetch_public(f"/public/v2/ticker_new/{quote}")
+        if data.get('result') != 'success':
+            raise RuntimeError(f"ticker error: {data.get('error_code')}")
+        by_target = {t['target_currency'].upper(): t for t in data.get('tickers', [])}
+        for market in markets:
+            if market.quote == quote and market.target in by_target:
+                tickers[market] = by_target[market.target]
+    return tickers
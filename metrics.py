@@ -0,0 +1,184 @@
+# API 엔드포인트별 지표 수집
+# 요청 경로마다 지연 히스토그램, 오류 코드별 횟수, 재시도/헤지/타임아웃 횟수, 최근 요청률을 모은다.
+# Prometheus 텍스트 형식으로 내보내는 작은 HTTP 서버와 샘플링된 요청/응답 로그를 함께 제공한다.
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 초 단위 지연 버킷 상한 (마지막은 +Inf)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RATE_WINDOW = 60.0  # 초. 요청률 계산 구간
+
+logger = logging.getLogger('coinone.api')
+
+
+class EndpointStats:
+    __slots__ = ('buckets', 'count', 'latency_sum', 'errors', 'timeouts', 'retries', 'hedges', 'recent')
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.latency_sum = 0.0
+        self.errors = {}  # 오류 코드 -> 횟수
+        self.timeouts = 0
+        self.retries = 0
+        self.hedges = 0  # 응답이 늦어 같은 조회를 한 번 더 보낸 횟수
+        self.recent = deque()  # 최근 RATE_WINDOW 안의 요청 시각
+
+    def quantile(self, q):
+        # 히스토그램 버킷 상한으로 근사한 분위수 (초)
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS, self.buckets):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class ApiMetrics:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _get(self, endpoint):
+        stats = self._stats.get(endpoint)
+        if stats is None:
+            stats = self._stats[endpoint] = EndpointStats()
+        return stats
+
+    def _trim(self, stats, now):
+        while stats.recent and stats.recent[0] < now - RATE_WINDOW:
+            stats.recent.popleft()
+
+    def observe(self, endpoint, latency, error_code=None):
+        # 응답을 받은 요청 한 건. error_code 는 HTTP 상태나 API 오류 코드 (성공이면 None)
+        now = self.clock()
+        idx = len(LATENCY_BUCKETS)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                idx = i
+                break
+        with self._lock:
+            stats = self._get(endpoint)
+            stats.buckets[idx] += 1
+            stats.count += 1
+            stats.latency_sum += latency
+            stats.recent.append(now)
+            self._trim(stats, now)
+            if error_code is not None:
+                stats.errors[str(error_code)] = stats.errors.get(str(error_code), 0) + 1
+
+    def record_error(self, endpoint, error_code):
+        # 응답 본문을 해석한 뒤에야 알 수 있는 API 오류 코드
+        with self._lock:
+            errors = self._get(endpoint).errors
+            errors[str(error_code)] = errors.get(str(error_code), 0) + 1
+
+    def record_timeout(self, endpoint):
+        with self._lock:
+            self._get(endpoint).timeouts += 1
+
+    def record_retry(self, endpoint):
+        with self._lock:
+            self._get(endpoint).retries += 1
+
+    def record_hedge(self, endpoint):
+        with self._lock:
+            self._get(endpoint).hedges += 1
+
+    def snapshot(self):
+        # 진단 패널용 요약 [{endpoint, requests, rate, p50_ms, p99_ms, ...}]
+        now = self.clock()
+        rows = []
+        with self._lock:
+            for endpoint, stats in sorted(self._stats.items()):
+                self._trim(stats, now)
+                p50, p99 = stats.quantile(0.5), stats.quantile(0.99)
+                rows.append({
+                    'endpoint': endpoint,
+                    'requests': stats.count,
+                    'rate_per_s': len(stats.recent) / RATE_WINDOW,
+                    'avg_ms': stats.latency_sum / stats.count * 1000 if stats.count else None,
+                    'p50_ms': p50 * 1000 if p50 is not None else None,
+                    'p99_ms': p99 * 1000 if p99 is not None else None,
+                    'errors': sum(stats.errors.values()),
+                    'error_codes': dict(stats.errors),
+                    'timeouts': stats.timeouts,
+                    'retries': stats.retries,
+                    'hedges': stats.hedges,
+                })
+        return rows
+
+    def render_prometheus(self):
+        lines = [
+            '# HELP coinone_api_request_duration_seconds API request latency.',
+            '# TYPE coinone_api_request_duration_seconds histogram',
+        ]
+        with self._lock:
+            items = sorted(self._stats.items())
+            for endpoint, stats in items:
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS + ('+Inf',), stats.buckets):
+                    cumulative += n
+                    lines.append(f'coinone_api_request_duration_seconds_bucket'
+                                 f'{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+                lines.append(f'coinone_api_request_duration_seconds_sum{{endpoint="{endpoint}"}} {stats.latency_sum}')
+                lines.append(f'coinone_api_request_duration_seconds_count{{endpoint="{endpoint}"}} {stats.count}')
+
+            lines += ['# HELP coinone_api_errors_total API errors by error code.',
+                      '# TYPE coinone_api_errors_total counter']
+            for endpoint, stats in items:
+                for code, n in sorted(stats.errors.items()):
+                    lines.append(f'coinone_api_errors_total{{endpoint="{endpoint}",code="{code}"}} {n}')
+
+            for name, attr in (('timeouts', 'timeouts'), ('retries', 'retries'), ('hedges', 'hedges')):
+                lines += [f'# HELP coinone_api_{name}_total API request {name}.',
+                          f'# TYPE coinone_api_{name}_total counter']
+                for endpoint, stats in items:
+                    lines.append(f'coinone_api_{name}_total{{endpoint="{endpoint}"}} {getattr(stats, attr)}')
+        return '\n'.join(lines) + '\n'
+
+
+class PayloadLogger:
+    # 요청/응답 본문 로그. rate 비율만큼만 남긴다 (0 이면 끔, 1 이면 전부)
+    def __init__(self, rate=0.0, log=logger):
+        self.rate = rate
+        self.log = log
+
+    def maybe_log(self, endpoint, status, content):
+        if self.rate <= 0 or (self.rate < 1 and random.random() >= self.rate):
+            return
+        if isinstance(content, bytes):
+            content = content.decode('utf-8', errors='replace')
+        self.log.info("%s HTTP %s %s", endpoint, status, content)
+
+
+def start_metrics_server(metrics, port, host='127.0.0.1'):
+    # GET /metrics 로 Prometheus 텍스트를 돌려주는 데몬 스레드 서버
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
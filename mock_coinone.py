@@ -0,0 +1,360 @@
+# 로컬 Coinone 모의 서버
+# 실계정/네트워크 없이 앱과 벤치마크를 돌리기 위한 대역 서버.
+# - 공개 API: 호가(/public/v2/orderbook), 전체 시세(/public/v2/ticker_new),
+#   최근 체결(/public/v2/trades), 캔들(/public/v2/chart) - 체결/캔들은 시각으로 정해지는 합성 가격
+# - 비공개 API(v2.1): balance/all, order, order/active_orders, order/cancel, order/detail
+# - X-COINONE-SIGNATURE 를 get_signature 와 같은 방식으로 검증한다
+# - 응답 지연(가끔 멈추는 긴 꼬리 지연 포함), 오류 주입, 초당 요청 수 제한을 설정할 수 있다
+# - 같은 user_order_id 의 주문은 한 번만 받는다
+#
+#   python mock_coinone.py --port 8080 --latency 0.05 --error-rate 0.01 --rate-limit 10
+#   (secrets.toml 에 api_url = "http://127.0.0.1:8080" 지정)
+
+import argparse
+import base64
+import hmac
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from coinone_api import (ERROR_DUPLICATE_ORDER, ERROR_INJECTED, ERROR_INSUFFICIENT_BALANCE, ERROR_INVALID_PARAMETER,
+                         ERROR_INVALID_SIGNATURE, ERROR_INVALID_TOKEN, ERROR_ORDER_NOT_FOUND, ERROR_RATE_LIMITED,
+                         get_signature)
+from request_scheduler import TokenBucket
+
+
+def _num(value):
+    # 지수 표기 없이 숫자 문자열로
+    return f'{value:.8f}'.rstrip('0').rstrip('.')
+
+
+class MockCoinone:
+    def __init__(self, access_token='token', secret_key=b'secret', host='127.0.0.1', port=0,
+                 latency=0.0, jitter=0.0, stall_rate=0.0, stall=0.0, error_rate=0.0, rate_limit=None,
+                 balances=None, best_bid=1400.0, tick=1.0, depth=15, on_request=None):
+        # latency: 고정 지연(초) 또는 {경로: 지연}, jitter: 0~jitter 초 추가 지연
+        # stall_rate: 요청이 stall 초 동안 더 멈출 확률 (꼬리 지연 / 타임아웃 재현)
+        # error_rate: 비공개 API 요청이 ERROR_INJECTED 로 실패할 확률
+        # rate_limit: 비공개 API 초당 요청 수 (None 이면 제한 없음, 넘으면 HTTP 429)
+        # on_request: 비공개 API 요청 본문을 다 받은 직후 on_request(path) 호출 (벤치마크용)
+        self.access_token = access_token
+        self.secret_key = secret_key
+        self.latency = latency
+        self.jitter = jitter
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.error_rate = error_rate
+        self.bucket = TokenBucket(rate_limit, max(1, int(rate_limit))) if rate_limit else None
+        self.balances = dict(balances or {'KRW': 10_000_000.0, 'USDT': 5_000.0})
+        self.locked = {currency: 0.0 for currency in self.balances}
+        self.best_bid = best_bid
+        self.tick = tick
+        self.depth = depth
+        self.on_request = on_request
+        self.orders = {}  # order_id -> 주문 dict
+        self.stats = {'requests': 0, 'rejected_signature': 0, 'rate_limited': 0, 'injected_errors': 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-coinone', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _delay(self, path):
+        latency = self.latency.get(path, 0.0) if isinstance(self.latency, dict) else self.latency
+        if self.jitter:
+            latency += random.uniform(0, self.jitter)
+        if self.stall_rate and random.random() < self.stall_rate:
+            latency += self.stall
+        if latency > 0:
+            time.sleep(latency)
+
+    # 호가 / 시세 ---------------------------------------------------------
+
+    def book(self):
+        best_ask = self.best_bid + self.tick
+        bids = [{'price': _num(self.best_bid - i * self.tick), 'qty': _num(10 + i)} for i in range(self.depth)]
+        asks = [{'price': _num(best_ask + i * self.tick), 'qty': _num(10 + i)} for i in range(self.depth)]
+        return bids, asks
+
+    def _orderbook(self, quote, target, size):
+        bids, asks = self.book()
+        now = int(time.time() * 1000)
+        return {'result': 'success', 'error_code': '0', 'timestamp': now, 'id': str(now),
+                'quote_currency': quote, 'target_currency': target,
+                'bids': bids[:size], 'asks': asks[:size]}
+
+    def _price_at(self, ts):
+        # 시각(ms)마다 정해진 합성 가격 (최우선 매수호가 근처에서 천천히 오르내림)
+        return self.best_bid + round(5 * math.sin(ts / 3_600_000), 2)
+
+    def _trades(self, quote, target, size):
+        # 1초마다 한 건씩 체결됐다고 보고 최근 size 건 (최신순)
+        now = int(time.time()) * 1000
+        transactions = [{'id': str(ts), 'timestamp': ts, 'price': _num(self._price_at(ts)), 'qty': '1',
+                         'is_seller_maker': (ts // 1000) % 2 == 0}
+                        for ts in range(now, now - size * 1000, -1000)]
+        return {'result': 'success', 'error_code': '0', 'quote_currency': quote, 'target_currency': target,
+                'transactions': transactions}
+
+    def _chart(self, quote, target, interval, timestamp, size):
+        # timestamp 이전(포함) 캔들 size 개 (최신순). 간격은 1m/1h/1d 처럼 숫자+단위
+        step = int(interval[:-1]) * {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}[interval[-1]]
+        end = min(timestamp or int(time.time() * 1000), int(time.time() * 1000))
+        end -= end % step
+        chart = []
+        for ts in range(end, end - size * step, -step):
+            prices = [self._price_at(ts + i * step // 4) for i in range(4)]
+            chart.append({'timestamp': ts, 'open': _num(prices[0]), 'high': _num(max(prices)),
+                          'low': _num(min(prices)), 'close': _num(prices[-1]),
+                          'target_volume': '10', 'quote_volume': _num(10 * prices[-1])})
+        return {'result': 'success', 'error_code': '0', 'is_last': False, 'chart': chart}
+
+    def _tickers(self, quote):
+        bids, asks = self.book()
+        tickers = [{'quote_currency': quote.lower(), 'target_currency': currency.lower(),
+                    'last': _num(self.best_bid), 'target_volume': '1000',
+                    'best_bids': bids[:1], 'best_asks': asks[:1]}
+                   for currency in self.balances if currency != quote]
+        return {'result': 'success', 'error_code': '0', 'tickers': tickers}
+
+    # 비공개 API ----------------------------------------------------------
+
+    def _error(self, code, message=''):
+        return {'result': 'error', 'error_code': code, 'error_msg': message}
+
+    def _authenticate(self, headers, body):
+        encoded = headers.get('X-COINONE-PAYLOAD', '')
+        signature = headers.get('X-COINONE-SIGNATURE', '')
+        if encoded != body or not hmac.compare_digest(signature, get_signature(self.secret_key, encoded)):
+            self.stats['rejected_signature'] += 1
+            return None, self._error(ERROR_INVALID_SIGNATURE, 'Invalid signature')
+        payload = json.loads(base64.b64decode(encoded))
+        if payload.get('access_token') != self.access_token:
+            return None, self._error(ERROR_INVALID_TOKEN, 'Invalid access token')
+        return payload, None
+
+    def handle_private(self, path, payload):
+        handlers = {
+            '/v2.1/account/balance/all': self._balance_all,
+            '/v2.1/order': self._place_order,
+            '/v2.1/order/active_orders': self._active_orders,
+            '/v2.1/order/cancel': self._cancel_order,
+            '/v2.1/order/detail': self._order_detail,
+        }
+        handler = handlers.get(path)
+        if handler is None:
+            return self._error(ERROR_INVALID_PARAMETER, f'Unknown endpoint {path}')
+        with self._lock:
+            return handler(payload)
+
+    def _balance_all(self, payload):
+        balances = [{'currency': currency, 'available': _num(amount), 'limit': _num(self.locked[currency])}
+                    for currency, amount in self.balances.items()]
+        return {'result': 'success', 'error_code': '0', 'balances': balances}
+
+    def _place_order(self, payload):
+        try:
+            side = payload['side']
+            quote = payload['quote_currency'].upper()
+            target = payload['target_currency'].upper()
+            price = float(payload['price'])
+            qty = float(payload['qty'])
+        except (KeyError, ValueError):
+            return self._error(ERROR_INVALID_PARAMETER, 'Invalid order parameters')
+        if price <= 0 or qty <= 0 or side not in ('BUY', 'SELL'):
+            return self._error(ERROR_INVALID_PARAMETER, 'Invalid order parameters')
+        user_order_id = payload.get('user_order_id')
+        if user_order_id and any(o['user_order_id'] == user_order_id for o in self.orders.values()):
+            return self._error(ERROR_DUPLICATE_ORDER, 'Duplicate user_order_id')
+
+        # 매수는 호가 통화, 매도는 대상 통화를 주문 가능 잔고에서 묶는다
+        currency, amount = (quote, price * qty) if side == 'BUY' else (target, qty)
+        if self.balances.get(currency, 0.0) < amount:
+            return self._error(ERROR_INSUFFICIENT_BALANCE, 'Insufficient balance')
+        self.balances[currency] -= amount
+        self.locked[currency] = self.locked.get(currency, 0.0) + amount
+
+        order_id = str(uuid.uuid4())
+        now = int(time.time() * 1000)
+        order = {'order_id': order_id, 'user_order_id': payload.get('user_order_id'),
+                 'type': payload.get('type', 'LIMIT'), 'side': side,
+                 'quote_currency': quote, 'target_currency': target,
+                 'price': price, 'original_qty': qty, 'executed_qty': 0.0, 'average_executed_price': 0.0,
+                 'status': 'LIVE', 'ordered_at': now, 'updated_at': now}
+        self.orders[order_id] = order
+
+        # 상대 최우선 호가를 넘는 가격이면 바로 전량 체결
+        bids, asks = self.book()
+        best = float(asks[0]['price']) if side == 'BUY' else float(bids[0]['price'])
+        if (side == 'BUY' and price >= best) or (side == 'SELL' and price <= best):
+            self._fill(order, best)
+        return {'result': 'success', 'error_code': '0', 'order_id': order_id}
+
+    def _fill(self, order, fill_price):
+        qty = order['original_qty']
+        quote, target = order['quote_currency'], order['target_currency']
+        if order['side'] == 'BUY':
+            self.locked[quote] -= order['price'] * qty
+            self.balances[quote] += (order['price'] - fill_price) * qty
+            self.balances[target] = self.balances.get(target, 0.0) + qty
+            self.locked.setdefault(target, 0.0)
+        else:
+            self.locked[target] -= qty
+            self.balances[quote] = self.balances.get(quote, 0.0) + fill_price * qty
+            self.locked.setdefault(quote, 0.0)
+        order.update(executed_qty=qty, average_executed_price=fill_price, status='FILLED',
+                     updated_at=int(time.time() * 1000))
+
+    def _release(self, order):
+        remaining = order['original_qty'] - order['executed_qty']
+        if order['side'] == 'BUY':
+            currency, amount = order['quote_currency'], order['price'] * remaining
+        else:
+            currency, amount = order['target_currency'], remaining
+        self.locked[currency] -= amount
+        self.balances[currency] += amount
+
+    def _order_view(self, order):
+        return {**{k: (_num(v) if isinstance(v, float) else v) for k, v in order.items()},
+                'remain_qty': _num(order['original_qty'] - order['executed_qty'])}
+
+    def _active_orders(self, payload):
+        quote = payload.get('quote_currency', '').upper()
+        target = payload.get('target_currency', '').upper()
+        active = [self._order_view(o) for o in self.orders.values()
+                  if o['status'] == 'LIVE' and (not quote or o['quote_currency'] == quote)
+                  and (not target or o['target_currency'] == target)]
+        return {'result': 'success', 'error_code': '0', 'active_orders': active}
+
+    def _find(self, payload):
+        order = self.orders.get(payload.get('order_id'))
+        if order is None and payload.get('user_order_id'):
+            order = next((o for o in self.orders.values() if o['user_order_id'] == payload['user_order_id']), None)
+        return order
+
+    def _cancel_order(self, payload):
+        order = self._find(payload)
+        if order is None or order['status'] != 'LIVE':
+            return self._error(ERROR_ORDER_NOT_FOUND, 'Order not found')
+        self._release(order)
+        order.update(status='CANCELED', updated_at=int(time.time() * 1000))
+        return {'result': 'success', 'error_code': '0', 'order_id': order['order_id'],
+                'canceled_qty': _num(order['original_qty'] - order['executed_qty'])}
+
+    def _order_detail(self, payload):
+        order = self._find(payload)
+        if order is None:
+            return self._error(ERROR_ORDER_NOT_FOUND, 'Order not found')
+        return {'result': 'success', 'error_code': '0', 'order': self._order_view(order)}
+
+    # HTTP ---------------------------------------------------------------
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive 허용
+            disable_nagle_algorithm = True
+
+            def _send(self, obj, status=200):
+                body = json.dumps(obj).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # 클라이언트가 타임아웃으로 먼저 끊었다
+
+            def do_GET(self):
+                path, _, query = self.path.partition('?')
+                params = dict(p.split('=', 1) for p in query.split('&') if '=' in p)
+                mock._delay(path)
+                parts = path.strip('/').split('/')
+                if parts[:3] == ['public', 'v2', 'orderbook'] and len(parts) == 5:
+                    self._send(mock._orderbook(parts[3].upper(), parts[4].upper(), int(params.get('size', 15))))
+                elif parts[:3] == ['public', 'v2', 'ticker_new'] and len(parts) == 4:
+                    self._send(mock._tickers(parts[3].upper()))
+                elif parts[:3] == ['public', 'v2', 'trades'] and len(parts) == 5:
+                    self._send(mock._trades(parts[3].upper(), parts[4].upper(), int(params.get('size', 200))))
+                elif parts[:3] == ['public', 'v2', 'chart'] and len(parts) == 5:
+                    self._send(mock._chart(parts[3].upper(), parts[4].upper(), params.get('interval', '1m'),
+                                           int(params['timestamp']) if 'timestamp' in params else None,
+                                           min(int(params.get('size', 500)), 500)))
+                else:
+                    self._send(mock._error(ERROR_INVALID_PARAMETER, f'Unknown endpoint {path}'), 404)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8')
+                if mock.on_request is not None:
+                    mock.on_request(self.path)
+                mock._delay(self.path)
+                with mock._lock:
+                    mock.stats['requests'] += 1
+                    limited = mock.bucket is not None and mock.bucket.wait_time(time.monotonic()) > 0
+                    if limited:
+                        mock.stats['rate_limited'] += 1
+                    elif mock.bucket is not None:
+                        mock.bucket.take()
+                if limited:
+                    return self._send(mock._error(ERROR_RATE_LIMITED, 'Too many requests'), 429)
+                payload, error = mock._authenticate(self.headers, body)
+                if error is not None:
+                    return self._send(error, 401)
+                if mock.error_rate and random.random() < mock.error_rate:
+                    mock.stats['injected_errors'] += 1
+                    return self._send(mock._error(ERROR_INJECTED, 'Injected error'))
+                self._send(mock.handle_private(self.path, payload))
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='로컬 Coinone 모의 서버')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--access-token', default='token')
+    parser.add_argument('--secret-key', default='secret')
+    parser.add_argument('--latency', type=float, default=0.0, help='응답 지연 (초)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='추가 무작위 지연 상한 (초)')
+    parser.add_argument('--stall-rate', type=float, default=0.0, help='요청이 --stall 초 더 멈출 확률 (0~1)')
+    parser.add_argument('--stall', type=float, default=0.0, help='멈추는 시간 (초)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='비공개 API 오류 주입 확률 (0~1)')
+    parser.add_argument('--rate-limit', type=float, default=None, help='비공개 API 초당 요청 수')
+    args = parser.parse_args()
+
+    mock = MockCoinone(args.access_token, args.secret_key.encode('utf-8'), args.host, args.port,
+                       latency=args.latency, jitter=args.jitter, stall_rate=args.stall_rate, stall=args.stall,
+                       error_rate=args.error_rate,
+                       rate_limit=args.rate_limit).start()
+    print(f"mock Coinone server: {mock.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        mock.stop()
+
+
+if __name__ == '__main__':
+    main()
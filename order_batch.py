@@ -0,0 +1,60 @@
+# 일괄 주문 / 일괄 취소 도우미
+# 호가 사다리(가격 구간에 N개의 지정가 주문)를 만들고, 독립적인 요청들을 동시에 실행한다.
+# 실제 요청량 제한은 요청 스케줄러가 맡는다.
+
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+DISTRIBUTIONS = {
+    'flat': '균등',
+    'increasing': '끝 가격으로 갈수록 증가',
+    'decreasing': '끝 가격으로 갈수록 감소',
+}
+
+
+def _weights(count, distribution):
+    if distribution == 'increasing':
+        return [i + 1 for i in range(count)]
+    if distribution == 'decreasing':
+        return [count - i for i in range(count)]
+    return [1] * count
+
+
+def build_ladder(side, start_price, end_price, count, total_quantity, distribution='flat',
+                 tick=1, qty_decimals=4):
+    # [{'side', 'price', 'quantity'}] 목록. 가격은 호가 단위(tick)로, 수량은 소수점 qty_decimals 자리로 내림.
+    # tick 에 함수(가격 -> 호가 단위)를 주면 가격마다 그 가격대의 호가 단위로 맞춘다.
+    if count < 1:
+        raise ValueError("주문 수는 1 이상이어야 합니다.")
+    if start_price <= 0 or end_price <= 0 or total_quantity <= 0:
+        raise ValueError("가격 및 수량은 0보다 커야 합니다.")
+
+    step = 0 if count == 1 else (end_price - start_price) / (count - 1)
+    weights = _weights(count, distribution)
+    weight_sum = sum(weights)
+    scale = 10 ** qty_decimals
+    tick_for = tick if callable(tick) else (lambda price: tick)
+
+    ladder = []
+    for i, weight in enumerate(weights):
+        price = start_price + step * i
+        price_unit = tick_for(price)
+        price = round(price / price_unit) * price_unit
+        quantity = math.floor(total_quantity * weight / weight_sum * scale) / scale
+        ladder.append({'side': side, 'price': price, 'quantity': quantity})
+    return ladder
+
+
+def run_concurrently(fn, items, max_workers=8):
+    # items 의 각 원소로 fn 을 동시에 호출하고, 입력 순서대로 (item, 결과 또는 예외) 를 돌려준다
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items)), thread_name_prefix='batch') as executor:
+        futures = [executor.submit(fn, item) for item in items]
+        results = []
+        for item, future in zip(items, futures):
+            try:
+                results.append((item, future.result()))
+            except Exception as e:
+                results.append((item, e))
+        return results
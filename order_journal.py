@@ -0,0 +1,139 @@
+# 주문 저널 모듈
+# 주문 로그는 JSONL 파일에 한 줄씩 추가하고 바로 fsync 한다 (주문 경로에서는 이것만 수행).
+# Git 스냅샷은 백그라운드 스레드가 일정 시간/건수마다 모아서 한 번에 커밋한다.
+
+import atexit
+import json
+import os
+import threading
+from datetime import datetime
+
+
+class OrderJournal:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def append(self, entry):
+        data = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock:
+            os.write(self._fd, data)
+            os.fsync(self._fd)
+        for callback in self._listeners:
+            callback(entry)
+
+    def read_from(self, offset=0):
+        # offset 이후의 (entry, 다음 offset) 목록. 기록 도중 끊긴 마지막 줄은 건너뛴다.
+        entries = []
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    offset += len(line)
+                    try:
+                        entries.append((json.loads(line), offset))
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def read_all(self):
+        return [entry for entry, _ in self.read_from(0)]
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+def migrate_json_log(json_path, journal):
+    # 예전 order_logs.json (JSON 배열) 내용을 저널로 옮긴다. 저널이 비어 있을 때만 수행.
+    if not os.path.exists(json_path) or os.path.getsize(journal.path) > 0:
+        return 0
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            logs = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return 0
+    for entry in logs:
+        journal.append(entry)
+    return len(logs)
+
+
+class GitSnapshotter:
+    # 저널 파일을 git 에 주기적으로 커밋하는 백그라운드 작업자
+    def __init__(self, repo_path, file_path, interval=60.0, batch_size=50):
+        self.repo_path = repo_path
+        self.file_path = file_path
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pending = 0
+        self.commits = 0
+        self.last_error = None
+        self._repo = None
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name='git-snapshot', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def notify(self, entry=None):
+        with self._cond:
+            self.pending += 1
+            if self.pending >= self.batch_size:
+                self._cond.notify()
+
+    def flush(self):
+        with self._cond:
+            count, self.pending = self.pending, 0
+        if count:
+            self._commit(count)
+
+    def close(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        self._thread.join(timeout=10)
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # 직전 커밋이 실패했다면 건수와 관계없이 한 주기 쉬고 다시 시도
+                if not self._stop and (self.pending < self.batch_size or self.last_error is not None):
+                    self._cond.wait(self.interval)
+                if self._stop:
+                    return
+            self.flush()
+
+    def _get_repo(self):
+        if self._repo is None:
+            from git import Repo
+
+            if os.path.exists(os.path.join(self.repo_path, '.git')):
+                self._repo = Repo(self.repo_path)
+            else:
+                self._repo = Repo.init(self.repo_path)
+        return self._repo
+
+    def _commit(self, count):
+        try:
+            repo = self._get_repo()
+            repo.index.add([self.file_path])
+            repo.index.commit(f"Update log: {datetime.now().isoformat()} ({count} entries)")
+            self.commits += 1
+            self.last_error = None
+        except Exception as e:
+            # 커밋 실패해도 저널에는 이미 기록되어 있으므로 다음 주기에 다시 시도
+            self.last_error = e
+            with self._cond:
+                self.pending += count
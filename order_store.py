@@ -0,0 +1,119 @@
+# 주문 내역 색인 저장소 (SQLite)
+# 주문 저널(JSONL)을 마지막으로 읽은 위치부터 이어서 적재하고,
+# 시간 / 주문 ID / 상태 / 매수·매도 색인으로 조회한다.
+
+import json
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    uuid TEXT,
+    order_id TEXT,
+    timestamp TEXT NOT NULL,
+    order_type TEXT,
+    side TEXT,
+    price TEXT,
+    quantity TEXT,
+    status TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_timestamp ON orders (timestamp);
+CREATE INDEX IF NOT EXISTS idx_orders_order_id ON orders (order_id);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status, timestamp);
+CREATE INDEX IF NOT EXISTS idx_orders_side ON orders (side, timestamp);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+COLUMNS = ('uuid', 'order_id', 'timestamp', 'order_type', 'side', 'price', 'quantity', 'status')
+
+
+def extract_order_id(entry):
+    order_id = entry.get('order_id')
+    if order_id is None or order_id == "null":
+        # 시장가 주문 응답은 market_order 안에 order_id 가 있다
+        response = entry.get('response') or {}
+        order_id = (response.get('market_order') or {}).get('order_id')
+    return order_id
+
+
+class OrderStore:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    def _get_meta(self, key, default=None):
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def sync(self, journal):
+        # 저널에서 아직 적재하지 않은 부분만 읽어서 한 트랜잭션으로 추가
+        with self._lock:
+            offset = int(self._get_meta('journal_offset', 0))
+            entries = journal.read_from(offset)
+            if not entries:
+                return 0
+            with self._conn:
+                self._conn.executemany(
+                    f"INSERT INTO orders ({', '.join(COLUMNS)}, data) VALUES ({', '.join('?' * (len(COLUMNS) + 1))})",
+                    [self._row(entry) for entry, _ in entries])
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('journal_offset', ?)",
+                                   (str(entries[-1][1]),))
+            return len(entries)
+
+    @staticmethod
+    def _row(entry):
+        values = [entry.get('uuid'), extract_order_id(entry), entry.get('timestamp', ''),
+                  entry.get('order_type'), entry.get('side')]
+        values += [None if entry.get(k) is None else str(entry.get(k)) for k in ('price', 'quantity')]
+        values += [entry.get('status'), json.dumps(entry, ensure_ascii=False)]
+        return values
+
+    @staticmethod
+    def _where(side=None, status=None, since=None, until=None):
+        # 조건절과 인자. 조건은 모두 색인을 탄다.
+        where, params = [], []
+        for column, value in (('side', side), ('status', status)):
+            if value:
+                where.append(f'{column} = ?')
+                params.append(value)
+        if since:
+            where.append('timestamp >= ?')
+            params.append(since)
+        if until:
+            where.append('timestamp < ?')
+            params.append(until)
+        return (' WHERE ' + ' AND '.join(where) if where else ''), params
+
+    def query(self, limit=20, offset=0, side=None, status=None, since=None, until=None):
+        # 최신순 페이지 조회
+        where, params = self._where(side, status, since, until)
+        sql = 'SELECT * FROM orders' + where + ' ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?'
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit, offset]).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self, side=None, status=None, since=None, until=None):
+        # query 와 같은 조건의 전체 건수 (페이지 수 계산용)
+        where, params = self._where(side, status, since, until)
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM orders' + where, params).fetchone()[0]
+
+    def get_by_order_id(self, order_id):
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM orders WHERE order_id = ? ORDER BY timestamp',
+                                      (order_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
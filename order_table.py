@@ -0,0 +1,113 @@
+# 미체결 주문 표
+# 주문이 수백 건이어도 화면 비용이 늘지 않도록 위젯 하나(표)로 보여준다.
+# - 갱신 때마다 이전 목록과 비교해서 새로 생긴/바뀐/사라진 행만 표에 반영한다 (바뀐 게 없으면 표를 다시 만들지 않음)
+# - 방향/가격 필터, 정렬, 페이지 나누기는 여기서 해서 화면에는 한 페이지 분량만 보낸다
+# pandas 는 표를 만들 때만 불러온다.
+
+from collections import namedtuple
+
+COLUMNS = ['order_id', 'target_currency', 'type', 'side', 'price', 'remain_qty', 'executed_qty', 'ordered_at']
+SORTS = {
+    'price_desc': ('price', False),
+    'price_asc': ('price', True),
+    'newest': ('ordered_at', False),
+    'oldest': ('ordered_at', True),
+}
+PAGE_SIZE = 100
+
+OrderDiff = namedtuple('OrderDiff', ['added', 'changed', 'removed'])
+
+
+def _row(order):
+    return (
+        order['order_id'],
+        order.get('target_currency', ''),
+        order.get('type', ''),
+        order.get('side', ''),
+        float(order.get('price', 0)),
+        float(order.get('remain_qty', 0)),
+        float(order.get('executed_qty', 0)),
+        int(order.get('ordered_at', 0)),
+    )
+
+
+class OrderTable:
+    def __init__(self):
+        self.rows = {}  # order_id -> 행 tuple (COLUMNS 순서)
+        self.version = 0  # 행이 바뀔 때마다 1 증가
+        self.last_diff = OrderDiff((), (), ())
+        self._frame = None  # order_id 색인 DataFrame (처음 볼 때 만든다)
+        self._views = {}  # (필터, 정렬) -> 정렬된 DataFrame (현재 version 것만)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def update(self, orders):
+        # 새 미체결 목록을 반영하고 이전 목록과의 차이를 돌려준다
+        new_rows = {}
+        for order in orders:
+            row = _row(order)
+            new_rows[row[0]] = row
+        added = [order_id for order_id in new_rows if order_id not in self.rows]
+        removed = [order_id for order_id in self.rows if order_id not in new_rows]
+        changed = [order_id for order_id, row in new_rows.items()
+                   if order_id in self.rows and self.rows[order_id] != row]
+        self.last_diff = OrderDiff(added, changed, removed)
+        if added or changed or removed:
+            if self._frame is not None:
+                self._apply(new_rows, added, changed, removed)
+            self.rows = new_rows
+            self.version += 1
+            self._views.clear()
+        return self.last_diff
+
+    def _apply(self, new_rows, added, changed, removed):
+        import pandas as pd
+
+        frame = self._frame
+        if removed:
+            frame = frame.drop(index=removed)
+        if changed:
+            frame.loc[changed, COLUMNS[1:]] = [new_rows[order_id][1:] for order_id in changed]
+        if added:
+            frame = pd.concat([frame, self._build([new_rows[order_id] for order_id in added])])
+        self._frame = frame
+
+    def _build(self, rows):
+        import pandas as pd
+
+        frame = pd.DataFrame(rows, columns=COLUMNS)
+        frame.index = frame['order_id']
+        frame.index.name = None
+        return frame
+
+    def frame(self):
+        if self._frame is None:
+            self._frame = self._build(list(self.rows.values()))
+        return self._frame
+
+    def view(self, side=None, price_min=None, price_max=None, sort='price_desc'):
+        # 필터/정렬한 전체 결과 (같은 조건이면 이 version 안에서는 다시 계산하지 않는다)
+        key = (side, price_min, price_max, sort)
+        view = self._views.get(key)
+        if view is None:
+            view = self.frame()
+            if side:
+                view = view[view['side'] == side]
+            if price_min is not None:
+                view = view[view['price'] >= price_min]
+            if price_max is not None:
+                view = view[view['price'] <= price_max]
+            column, ascending = SORTS[sort]
+            view = self._views[key] = view.sort_values(column, ascending=ascending, kind='stable')
+        return view
+
+
+def page_count(view, page_size=PAGE_SIZE):
+    return max(1, -(-len(view) // page_size))
+
+
+def page_of(view, page, page_size=PAGE_SIZE):
+    # 1부터 시작하는 page 번째 구간
+    start = (page - 1) * page_size
+    return view.iloc[start:start + page_size]
@@ -0,0 +1,107 @@
+# 배열 기반 호가 스냅샷
+# 가격/수량을 NumPy 배열로 들고 최우선 호가, 스프레드, 누적 잔량, VWAP 를 벡터 연산으로 계산한다.
+# pandas 는 표로 보여줄 때(to_frames)만 불러온다.
+
+import numpy as np
+
+_EMPTY = np.empty(0, dtype=np.float64)
+
+
+def _parse_levels(rows):
+    # Coinone 응답의 [{"price": "...", "qty": "..."}] 를 (가격 배열, 수량 배열) 로 변환
+    if not rows:
+        return _EMPTY, _EMPTY
+    if isinstance(rows[0], dict):
+        flat = np.array([(row['price'], row['qty']) for row in rows], dtype=np.float64)
+    else:
+        flat = np.asarray(rows, dtype=np.float64)
+    return flat[:, 0], flat[:, 1]
+
+
+class BookSnapshot:
+    # 매수는 높은 가격순, 매도는 낮은 가격순 (둘 다 최우선 호가가 0번)
+    __slots__ = ('bid_prices', 'bid_qtys', 'ask_prices', 'ask_qtys', 'seq', 'timestamp')
+
+    def __init__(self, bid_prices, bid_qtys, ask_prices, ask_qtys, seq=None, timestamp=None):
+        self.bid_prices = bid_prices
+        self.bid_qtys = bid_qtys
+        self.ask_prices = ask_prices
+        self.ask_qtys = ask_qtys
+        self.seq = seq
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_levels(cls, bids, asks, seq=None, timestamp=None, sort=False):
+        bid_prices, bid_qtys = _parse_levels(bids)
+        ask_prices, ask_qtys = _parse_levels(asks)
+        if sort:
+            order = np.argsort(-bid_prices, kind='stable')
+            bid_prices, bid_qtys = bid_prices[order], bid_qtys[order]
+            order = np.argsort(ask_prices, kind='stable')
+            ask_prices, ask_qtys = ask_prices[order], ask_qtys[order]
+        return cls(bid_prices, bid_qtys, ask_prices, ask_qtys, seq, timestamp)
+
+    def __bool__(self):
+        return bool(len(self.bid_prices) or len(self.ask_prices))
+
+    def head(self, depth):
+        return BookSnapshot(self.bid_prices[:depth], self.bid_qtys[:depth],
+                            self.ask_prices[:depth], self.ask_qtys[:depth], self.seq, self.timestamp)
+
+    @property
+    def best_bid(self):
+        return float(self.bid_prices[0]) if len(self.bid_prices) else None
+
+    @property
+    def best_ask(self):
+        return float(self.ask_prices[0]) if len(self.ask_prices) else None
+
+    @property
+    def spread(self):
+        if not len(self.bid_prices) or not len(self.ask_prices):
+            return None
+        return float(self.ask_prices[0] - self.bid_prices[0])
+
+    @property
+    def mid(self):
+        if not len(self.bid_prices) or not len(self.ask_prices):
+            return None
+        return float(self.ask_prices[0] + self.bid_prices[0]) / 2
+
+    def _side(self, side):
+        # side 는 상대편 주문 기준이 아니라 호가창 쪽 ('bid' / 'ask')
+        if side == 'bid':
+            return self.bid_prices, self.bid_qtys
+        return self.ask_prices, self.ask_qtys
+
+    def cumulative_depth(self, side):
+        return np.cumsum(self._side(side)[1])
+
+    def depth_within(self, side, limit_price):
+        # 한계 가격 안쪽 잔량 합 (bid 는 limit 이상, ask 는 limit 이하)
+        prices, qtys = self._side(side)
+        mask = prices >= limit_price if side == 'bid' else prices <= limit_price
+        return float(qtys[mask].sum())
+
+    def vwap(self, side, quantity):
+        # 해당 호가창 쪽을 quantity 만큼 훑었을 때의 평균 체결가. 잔량이 모자라면 None
+        prices, qtys = self._side(side)
+        cum_qty = np.cumsum(qtys)
+        if not len(cum_qty) or cum_qty[-1] < quantity:
+            return None
+        idx = int(np.searchsorted(cum_qty, quantity))
+        filled_before = cum_qty[idx - 1] if idx else 0.0
+        notional = float(np.dot(prices[:idx], qtys[:idx])) + (quantity - filled_before) * prices[idx]
+        return notional / quantity
+
+    def levels(self, side):
+        # [(price, qty), ...] 파이썬 리스트 (분할 집행 엔진 등 배열이 필요 없는 곳용)
+        prices, qtys = self._side(side)
+        return list(zip(prices.tolist(), qtys.tolist()))
+
+    def to_frames(self):
+        import pandas as pd
+
+        bids_df = pd.DataFrame({'price': self.bid_prices, 'qty': self.bid_qtys})
+        asks_df = pd.DataFrame({'price': self.ask_prices, 'qty': self.ask_qtys})
+        return bids_df, asks_df
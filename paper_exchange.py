@@ -0,0 +1,466 @@
+# 모의 거래 (paper trading) 거래소
+# 실제 돈/네트워크 없이 주문, 취소, 미체결 조회, 잔고 조회를 같은 엔드포인트 함수로 돌리기 위한 프로세스 내 체결 엔진.
+# - 가격-시간 우선 체결: 가격 레벨마다 도착 순서대로 쌓인 큐, 레벨 가격은 정렬 리스트(bisect)
+# - 부분 체결, 지정가(LIMIT, post_only) / 시장가(MARKET: 매수는 amount, 매도는 qty, limit_price 선택) 는 Coinone v2.1 과 같은 의미
+# - 잔고는 주문 가능(available) / 주문 중(limit) 으로 나눠 묶고 체결/취소 시 풀어 준다
+# - 외부 유동성: 실시간/녹화 호가 스냅샷을 각 레벨의 '외부 잔량'으로 얹는다. 같은 가격에서는 외부 잔량이 먼저 체결되고,
+#   새 스냅샷이 내 미체결 주문과 겹치면 그 주문 가격에 체결된다 (상대가 내 주문을 친 것으로 본다).
+#   스냅샷은 내 체결로 줄지 않으므로 다음 스냅샷에서 잔량이 원래대로 돌아온다.
+#
+# PaperClient 는 CoinoneClient 와 같은 메서드를 가져서 get_client() 자리에 그대로 넣을 수 있다.
+# 비공개 요청은 이 엔진이 처리하고, 공개 요청(호가, 시세, 캔들)은 실제 API(upstream)로 보낸다.
+
+import base64
+import json
+import threading
+import time
+import uuid
+from bisect import bisect_left, insort
+from collections import deque
+
+from coinone_api import (ERROR_DUPLICATE_ORDER, ERROR_INSUFFICIENT_BALANCE, ERROR_INVALID_PARAMETER,
+                         ERROR_ORDER_NOT_FOUND)
+
+EPS = 1e-9  # 남은 수량이 이보다 작으면 다 체결된 것으로 본다
+SEED_INTERVAL = 0.05  # 초. 외부 호가를 이보다 자주 다시 읽지 않는다
+ACTIVE_STATUSES = ('LIVE', 'PARTIALLY_FILLED')
+
+
+def _num(value):
+    return f'{value:.8f}'.rstrip('0').rstrip('.') or '0'
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+class PaperOrder:
+    __slots__ = ('order_id', 'user_order_id', 'type', 'side', 'quote', 'target', 'price', 'limit_price',
+                 'qty', 'amount', 'executed_qty', 'executed_amount', 'fee', 'status', 'post_only',
+                 'ordered_at', 'updated_at')
+
+    def __init__(self, order_id, user_order_id, order_type, side, quote, target, price, qty, amount=None,
+                 limit_price=None, post_only=False):
+        # 시장가 매수는 qty 대신 amount(호가 통화 금액)로 주문한다
+        self.order_id = order_id
+        self.user_order_id = user_order_id
+        self.type = order_type
+        self.side = side
+        self.quote = quote
+        self.target = target
+        self.price = price
+        self.limit_price = limit_price
+        self.qty = qty
+        self.amount = amount
+        self.executed_qty = 0.0
+        self.executed_amount = 0.0
+        self.fee = 0.0
+        self.status = 'LIVE'
+        self.post_only = post_only
+        self.ordered_at = self.updated_at = _now_ms()
+
+    @property
+    def remaining(self):
+        return self.qty - self.executed_qty if self.qty is not None else 0.0
+
+    def view(self):
+        # Coinone order/detail, active_orders 항목 형식
+        average = self.executed_amount / self.executed_qty if self.executed_qty > EPS else 0.0
+        canceled = self.remaining if self.status in ('CANCELED', 'PARTIALLY_CANCELED') else 0.0
+        return {
+            'order_id': self.order_id, 'user_order_id': self.user_order_id, 'type': self.type, 'side': self.side,
+            'quote_currency': self.quote, 'target_currency': self.target, 'status': self.status,
+            'price': _num(self.price or 0.0), 'limit_price': _num(self.limit_price or 0.0),
+            'original_qty': _num(self.qty or 0.0), 'original_amount': _num(self.amount or 0.0),
+            'executed_qty': _num(self.executed_qty), 'canceled_qty': _num(canceled),
+            'remain_qty': _num(self.remaining if self.status in ACTIVE_STATUSES else 0.0),
+            'average_executed_price': _num(average), 'fee': _num(self.fee), 'post_only': self.post_only,
+            'ordered_at': self.ordered_at, 'updated_at': self.updated_at,
+        }
+
+
+class PriceLevel:
+    __slots__ = ('external', 'orders', 'qty')
+
+    def __init__(self):
+        self.external = 0.0  # 외부 호가 잔량 (같은 가격의 내 주문보다 먼저 체결)
+        self.orders = deque()  # 도착 순서. 취소된 주문은 앞에 닿았을 때 치운다
+        self.qty = 0.0  # 큐에 남은 내 주문 잔량 합
+
+
+class BookSide:
+    # 한쪽 호가. 가격 -> PriceLevel dict 와 오름차순 가격 리스트 (최우선 매수는 리스트의 마지막)
+    def __init__(self, is_bid):
+        self.is_bid = is_bid
+        self.levels = {}
+        self.prices = []
+
+    def best(self):
+        if not self.prices:
+            return None
+        return self.prices[-1] if self.is_bid else self.prices[0]
+
+    def level(self, price):
+        level = self.levels.get(price)
+        if level is None:
+            level = self.levels[price] = PriceLevel()
+            insort(self.prices, price)
+        return level
+
+    def drop_if_empty(self, price):
+        level = self.levels[price]
+        if level.external <= EPS and level.qty <= EPS:
+            del self.levels[price]
+            del self.prices[bisect_left(self.prices, price)]
+
+    def crosses(self, price, limit):
+        # 이 쪽 호가 price 가 상대 주문 한계 가격 limit 안쪽인지 (limit=None 이면 제한 없음)
+        return limit is None or (price >= limit if self.is_bid else price <= limit)
+
+    def depth(self, n):
+        # 최우선부터 n 개 레벨 [(가격, 외부 + 내 주문 잔량)]
+        prices = self.prices[-n:][::-1] if self.is_bid else self.prices[:n]
+        return [(price, self.levels[price].external + self.levels[price].qty) for price in prices]
+
+
+class PaperExchange:
+    def __init__(self, balances=None, fee_rate=0.0, clock=time.monotonic):
+        # balances: {통화: 주문 가능 수량}. fee_rate: 받는 쪽 통화에서 떼는 수수료율
+        self.available = {c.upper(): float(v) for c, v in (balances or {'KRW': 10_000_000.0}).items()}
+        self.locked = dict.fromkeys(self.available, 0.0)
+        self.fee_rate = fee_rate
+        self.clock = clock
+        self.books = {}  # (quote, target) -> (매수 BookSide, 매도 BookSide)
+        self.orders = {}  # order_id -> PaperOrder
+        self.by_user_id = {}  # user_order_id -> PaperOrder
+        self.sources = {}  # (quote, target) -> snapshot() 이 BookSnapshot 을 돌려주는 객체
+        self._seeded = {}  # (quote, target) -> (마지막으로 읽은 시각, 스냅샷 seq)
+        self.stats = {'orders': 0, 'trades': 0, 'cancels': 0, 'seeds': 0}
+        self._lock = threading.Lock()
+
+    # 외부 호가 --------------------------------------------------------------
+
+    def attach_book(self, market, source):
+        # 주문/조회 전에 source.snapshot() 을 읽어 외부 잔량을 맞춘다 (MarketDataService 등)
+        self.sources[(market.quote.upper(), market.target.upper())] = source
+
+    def seed(self, market, snapshot):
+        # BookSnapshot 으로 외부 잔량을 통째로 바꾼다 (녹화 호가: BookSnapshot.from_levels(...))
+        with self._lock:
+            self._seed((market.quote.upper(), market.target.upper()), snapshot)
+
+    def _seed(self, key, snapshot):
+        bids, asks = self._book(key)
+        for side in (bids, asks):
+            for price in list(side.prices):
+                side.levels[price].external = 0.0
+                side.drop_if_empty(price)
+        # 새 외부 잔량은 들어오는 주문처럼 내 미체결 주문과 먼저 맞춰 보고 남는 만큼만 얹는다
+        for side, levels in ((bids, snapshot.levels('bid')), (asks, snapshot.levels('ask'))):
+            opposite = asks if side is bids else bids
+            for price, qty in levels:
+                if opposite.prices and opposite.crosses(opposite.best(), price):
+                    qty = self._match(opposite, price, qty, None, None)
+                if qty > EPS:
+                    side.level(price).external += qty
+        self.stats['seeds'] += 1
+
+    def _refresh(self, key):
+        source = self.sources.get(key)
+        if source is None:
+            return
+        now = self.clock()
+        last = self._seeded.get(key)
+        if last is not None and now - last[0] < SEED_INTERVAL:
+            return
+        snapshot = source.snapshot()
+        seq = getattr(snapshot, 'seq', None)
+        if snapshot and (last is None or seq is None or seq != last[1]):
+            self._seed(key, snapshot)
+        self._seeded[key] = (now, seq if snapshot else None)
+
+    def _book(self, key):
+        book = self.books.get(key)
+        if book is None:
+            book = self.books[key] = (BookSide(True), BookSide(False))
+        return book
+
+    # 체결 -----------------------------------------------------------------
+
+    def _match(self, makers, limit, qty, budget, taker):
+        # makers 쪽 호가를 최우선부터 limit 까지 훑는다. qty(수량) 또는 budget(금액) 만큼. 남은 qty/budget 반환
+        # taker=None 은 외부 잔량이 들어오는 경우 (같은 외부 잔량끼리는 맞추지 않는다)
+        remaining = budget if budget is not None else qty
+        while remaining > EPS and makers.prices:
+            price = makers.best()
+            if not makers.crosses(price, limit):
+                break
+            level = makers.levels[price]
+            if taker is not None and level.external > EPS:
+                fill = min(level.external, remaining / price if budget is not None else remaining)
+                level.external -= fill
+                self._fill_taker(taker, price, fill)
+                remaining -= fill * price if budget is not None else fill
+            while remaining > EPS and level.orders:
+                maker = level.orders[0]
+                if maker.status not in ACTIVE_STATUSES:
+                    level.orders.popleft()
+                    continue
+                fill = min(maker.remaining, remaining / price if budget is not None else remaining)
+                self._fill_maker(maker, price, fill)
+                level.qty -= fill
+                if taker is not None:
+                    self._fill_taker(taker, price, fill)
+                remaining -= fill * price if budget is not None else fill
+                if maker.remaining <= EPS:
+                    level.orders.popleft()
+            if level.external <= EPS and level.qty <= EPS:
+                makers.drop_if_empty(price)
+            elif remaining > EPS:
+                break  # 외부 잔량끼리는 맞추지 않으므로 이 레벨에서 더 진행할 수 없다
+        return remaining
+
+    def _settle(self, order, price, qty):
+        # 한 번의 체결을 잔고에 반영 (묶어 둔 금액/수량에서 빼고 받는 쪽에 수수료를 뗀 만큼 더한다)
+        self.stats['trades'] += 1
+        order.executed_qty += qty
+        order.executed_amount += price * qty
+        order.updated_at = _now_ms()
+        if order.side == 'BUY':
+            # 지정가 매수는 주문 가격으로 묶었으므로 더 싸게 체결된 차액을 돌려준다
+            reserved = price * qty if order.type == 'MARKET' else order.price * qty
+            self.locked[order.quote] -= reserved
+            self.available[order.quote] += reserved - price * qty
+            fee = qty * self.fee_rate
+            self.available[order.target] = self.available.get(order.target, 0.0) + qty - fee
+        else:
+            self.locked[order.target] -= qty
+            fee = price * qty * self.fee_rate
+            self.available[order.quote] = self.available.get(order.quote, 0.0) + price * qty - fee
+        order.fee += fee
+
+    def _fill_maker(self, order, price, qty):
+        self._settle(order, order.price, qty)
+        order.status = 'FILLED' if order.remaining <= EPS else 'PARTIALLY_FILLED'
+
+    def _fill_taker(self, order, price, qty):
+        self._settle(order, price, qty)
+        if order.qty is not None:
+            order.status = 'FILLED' if order.remaining <= EPS else 'PARTIALLY_FILLED'
+
+    def _reserve(self, currency, amount):
+        if self.available.get(currency, 0.0) + EPS < amount:
+            return False
+        self.available[currency] = self.available.get(currency, 0.0) - amount
+        self.locked[currency] = self.locked.get(currency, 0.0) + amount
+        return True
+
+    def _release(self, currency, amount):
+        self.locked[currency] -= amount
+        self.available[currency] += amount
+
+    def place(self, side, quote, target, order_type='LIMIT', price=None, qty=None, amount=None,
+              limit_price=None, post_only=False, user_order_id=None):
+        # 주문 하나를 받아 체결까지 처리하고 PaperOrder 를 돌려준다. 받을 수 없는 주문은 (오류 코드, 메시지) 를 올린다
+        key = (quote.upper(), target.upper())
+        with self._lock:
+            if user_order_id and user_order_id in self.by_user_id:
+                raise PaperOrderError(ERROR_DUPLICATE_ORDER, 'Duplicate user_order_id')
+            if side not in ('BUY', 'SELL') or order_type not in ('LIMIT', 'MARKET'):
+                raise PaperOrderError(ERROR_INVALID_PARAMETER, 'Invalid order parameters')
+            if order_type == 'LIMIT' and not (price and price > 0 and qty and qty > 0):
+                raise PaperOrderError(ERROR_INVALID_PARAMETER, 'Invalid order parameters')
+            market_buy = order_type == 'MARKET' and side == 'BUY'
+            if order_type == 'MARKET' and not ((amount or 0) > 0 if market_buy else (qty or 0) > 0):
+                raise PaperOrderError(ERROR_INVALID_PARAMETER, 'Invalid order parameters')
+            self._refresh(key)
+
+            # 매수는 호가 통화(지정가: 가격 x 수량, 시장가: 금액), 매도는 대상 통화 수량을 묶는다
+            if side == 'BUY':
+                currency, reserve = key[0], amount if market_buy else price * qty
+            else:
+                currency, reserve = key[1], qty
+            if not self._reserve(currency, reserve):
+                raise PaperOrderError(ERROR_INSUFFICIENT_BALANCE, 'Insufficient balance')
+
+            order = PaperOrder(uuid.uuid4().hex, user_order_id, order_type, side, key[0], key[1],
+                               price if order_type == 'LIMIT' else None, None if market_buy else qty,
+                               amount if market_buy else None, limit_price, post_only)
+            self.orders[order.order_id] = order
+            if user_order_id:
+                self.by_user_id[user_order_id] = order
+            self.stats['orders'] += 1
+
+            bids, asks = self._book(key)
+            makers, own = (asks, bids) if side == 'BUY' else (bids, asks)
+            limit = price if order_type == 'LIMIT' else limit_price
+            if order_type == 'LIMIT' and post_only and makers.prices and makers.crosses(makers.best(), limit):
+                # post_only 주문이 바로 체결될 가격이면 체결 없이 취소된다
+                self._release(currency, reserve)
+                order.status = 'CANCELED'
+                return order
+            if market_buy:
+                left = self._match(makers, limit, None, amount, order)
+                self._release(currency, left)  # 다 쓰지 못한 금액
+                order.status = 'FILLED' if left <= EPS else 'PARTIALLY_CANCELED' if order.executed_qty else 'CANCELED'
+                order.qty = order.executed_qty
+                return order
+            left = self._match(makers, limit, qty, None, order)
+            if left > EPS:
+                if order_type == 'MARKET':
+                    self._release(currency, left)
+                    order.status = 'PARTIALLY_CANCELED' if order.executed_qty else 'CANCELED'
+                else:
+                    level = own.level(price)
+                    level.orders.append(order)
+                    level.qty += left
+            return order
+
+    def cancel(self, order_id=None, user_order_id=None):
+        # 취소한 PaperOrder. 없거나 이미 끝난 주문이면 None
+        with self._lock:
+            order = self.orders.get(order_id) if order_id else self.by_user_id.get(user_order_id)
+            if order is None or order.status not in ACTIVE_STATUSES:
+                return None
+            bids, asks = self._book((order.quote, order.target))
+            side = bids if order.side == 'BUY' else asks
+            left = order.remaining
+            level = side.levels.get(order.price)
+            if level is not None:
+                level.qty -= left  # 큐에서는 앞에 닿았을 때 치운다
+                side.drop_if_empty(order.price)
+            if order.side == 'BUY':
+                self._release(order.quote, order.price * left)
+            else:
+                self._release(order.target, left)
+            order.status = 'PARTIALLY_CANCELED' if order.executed_qty > EPS else 'CANCELED'
+            order.updated_at = _now_ms()
+            self.stats['cancels'] += 1
+            return order
+
+    def active_orders(self, quote=None, target=None):
+        with self._lock:
+            for key in self.sources:
+                if (not quote or key[0] == quote.upper()) and (not target or key[1] == target.upper()):
+                    self._refresh(key)
+            return [order for order in self.orders.values() if order.status in ACTIVE_STATUSES
+                    and (not quote or order.quote == quote.upper()) and (not target or order.target == target.upper())]
+
+    def find(self, order_id=None, user_order_id=None):
+        with self._lock:
+            if order_id and order_id in self.orders:
+                self._refresh((self.orders[order_id].quote, self.orders[order_id].target))
+                return self.orders[order_id]
+            return self.by_user_id.get(user_order_id) if user_order_id else None
+
+    def balances(self):
+        with self._lock:
+            for key in self.sources:
+                self._refresh(key)
+            return {currency: (self.available[currency], self.locked.get(currency, 0.0))
+                    for currency in self.available}
+
+    def depth(self, market, n=15):
+        # 외부 잔량과 내 주문을 합친 호가 ([(가격, 수량)] 매수, 매도)
+        with self._lock:
+            bids, asks = self._book((market.quote.upper(), market.target.upper()))
+            return bids.depth(n), asks.depth(n)
+
+    # Coinone v2.1 비공개 API 형식 ----------------------------------------------
+
+    def handle_private(self, path, payload):
+        handlers = {
+            '/v2.1/account/balance/all': self._balance_all,
+            '/v2.1/order': self._place_order,
+            '/v2.1/order/active_orders': self._active_orders,
+            '/v2.1/order/cancel': self._cancel_order,
+            '/v2.1/order/detail': self._order_detail,
+        }
+        handler = handlers.get(path)
+        if handler is None:
+            return _error(ERROR_INVALID_PARAMETER, f'Unknown endpoint {path}')
+        try:
+            return handler(payload)
+        except PaperOrderError as e:
+            return _error(e.code, e.message)
+
+    def _balance_all(self, payload):
+        return {'result': 'success', 'error_code': '0',
+                'balances': [{'currency': currency, 'available': _num(available), 'limit': _num(locked)}
+                             for currency, (available, locked) in self.balances().items()]}
+
+    def _place_order(self, payload):
+        def number(name):
+            value = payload.get(name)
+            return float(value) if value not in (None, '') else None
+
+        try:
+            order = self.place(payload['side'], payload['quote_currency'], payload['target_currency'],
+                               payload.get('type', 'LIMIT'), price=number('price'), qty=number('qty'),
+                               amount=number('amount'), limit_price=number('limit_price'),
+                               post_only=bool(payload.get('post_only')), user_order_id=payload.get('user_order_id'))
+        except (KeyError, ValueError):
+            return _error(ERROR_INVALID_PARAMETER, 'Invalid order parameters')
+        return {'result': 'success', 'error_code': '0', 'order_id': order.order_id}
+
+    def _active_orders(self, payload):
+        orders = self.active_orders(payload.get('quote_currency'), payload.get('target_currency'))
+        return {'result': 'success', 'error_code': '0', 'active_orders': [order.view() for order in orders]}
+
+    def _cancel_order(self, payload):
+        order = self.cancel(payload.get('order_id'), payload.get('user_order_id'))
+        if order is None:
+            return _error(ERROR_ORDER_NOT_FOUND, 'Order not found')
+        return {'result': 'success', 'error_code': '0', 'order_id': order.order_id,
+                'canceled_qty': _num(order.remaining)}
+
+    def _order_detail(self, payload):
+        order = self.find(payload.get('order_id'), payload.get('user_order_id'))
+        if order is None:
+            return _error(ERROR_ORDER_NOT_FOUND, 'Order not found')
+        return {'result': 'success', 'error_code': '0', 'order': order.view()}
+
+
+class PaperOrderError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _error(code, message=''):
+    return {'result': 'error', 'error_code': code, 'error_msg': message}
+
+
+class PaperClient:
+    # CoinoneClient 대역. 비공개 요청은 PaperExchange 로, 공개 요청은 upstream(CoinoneClient) 으로
+    def __init__(self, exchange, upstream, metrics=None):
+        self.exchange = exchange
+        self.upstream = upstream
+        self.metrics = metrics
+        self.signer = upstream.signer
+        self.access_token = upstream.access_token
+        self.last_request = 0.0
+
+    def post_private(self, action, payload, timeout=None):
+        return self._handle(action, payload)
+
+    def post_signed(self, action, encoded_payload, signature, timeout=None):
+        # 원클릭 주문 경로가 미리 인코딩한 본문 (서명은 확인하지 않는다)
+        return self._handle(action, json.loads(base64.b64decode(encoded_payload)))
+
+    def _handle(self, action, payload):
+        start = time.perf_counter()
+        response = self.exchange.handle_private(action, payload)
+        if self.metrics is not None:
+            self.metrics.observe(action, time.perf_counter() - start, None)
+        return 200, json.dumps(response).encode('utf-8')
+
+    def get_public(self, path, params=None):
+        return self.upstream.get_public(path, params=params)
+
+    def warm(self, path='/public/v2/ticker_new/KRW', idle=20.0):
+        return self.upstream.warm(path, idle)
+
+    def close(self):
+        self.upstream.close()
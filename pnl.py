@@ -0,0 +1,203 @@
+# 포지션 / 손익 계산
+# 주문 저널의 체결 이벤트를 마지막으로 읽은 위치부터 이어서 반영해 마켓별 보유 수량과 손익을 유지한다.
+# - 같은 체결을 선입선출(FIFO) 로트와 평균 단가 두 방식으로 동시에 계산한다
+# - 체결 한 건은 상각 O(1) (FIFO 로트는 한 번 만들어지고 한 번 소진된다), 평가 손익은 보유 수량 x 현재가 - 원가 로 O(1)
+# - 체결 이벤트의 평균 체결가는 주문 전체 누적값이라, 주문별 누적 (수량, 금액) 차이로 이번 체결분의 가격을 구한다
+# - 일정 건수/시간마다 상태와 저널 위치를 체크포인트 파일에 써 두고, 재시작하면 그 뒤의 저널만 읽는다
+# 수량은 부호가 있다 (매수 +, 매도 -). 들고 있지 않은 수량을 팔면 그만큼 매도 포지션으로 잡는다. 수수료는 포함하지 않는다.
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+EPS = 1e-12
+FILL_EVENTS = ('filled', 'partially_filled')
+
+
+class Position:
+    # method: 'fifo' (먼저 산 로트부터 청산) / 'average' (평균 단가)
+    def __init__(self, method='fifo'):
+        self.method = method
+        self.qty = 0.0
+        self.cost = 0.0  # 남은 포지션의 원가 합 (부호 포함)
+        self.realized = 0.0
+        self.lots = deque()  # FIFO: [수량, 가격] (모두 포지션과 같은 부호)
+
+    @property
+    def avg_price(self):
+        return self.cost / self.qty if abs(self.qty) > EPS else None
+
+    def apply(self, qty, price):
+        # 체결 한 건 (qty: 매수 +, 매도 -). 이번 체결로 실현된 손익을 돌려준다
+        realized = 0.0
+        if self.qty * qty < 0:
+            # 반대 방향: 기존 포지션부터 청산
+            closing = min(abs(qty), abs(self.qty))
+            sign = 1.0 if self.qty > 0 else -1.0
+            if self.method == 'fifo':
+                left = closing
+                while left > EPS:
+                    lot = self.lots[0]
+                    take = min(left, abs(lot[0]))
+                    realized += take * (price - lot[1]) * sign
+                    self.cost -= take * lot[1] * sign
+                    lot[0] -= take * sign
+                    left -= take
+                    if abs(lot[0]) <= EPS:
+                        self.lots.popleft()
+            else:
+                avg = self.cost / self.qty
+                realized = closing * (price - avg) * sign
+                self.cost -= closing * avg * sign
+            self.qty -= closing * sign
+            qty += closing * sign  # 남은 수량은 반대 방향 새 포지션
+            if abs(self.qty) <= EPS:
+                self.qty, self.cost = 0.0, 0.0
+                self.lots.clear()
+        if abs(qty) > EPS:
+            self.qty += qty
+            self.cost += qty * price
+            if self.method == 'fifo':
+                self.lots.append([qty, price])
+        self.realized += realized
+        return realized
+
+    def unrealized(self, mark):
+        return self.qty * mark - self.cost if mark is not None and abs(self.qty) > EPS else 0.0
+
+    def to_dict(self):
+        return {'method': self.method, 'qty': self.qty, 'cost': self.cost, 'realized': self.realized,
+                'lots': list(self.lots)}
+
+    @classmethod
+    def from_dict(cls, data):
+        position = cls(data['method'])
+        position.qty, position.cost, position.realized = data['qty'], data['cost'], data['realized']
+        position.lots = deque([list(lot) for lot in data['lots']])
+        return position
+
+
+class PnlLedger:
+    def __init__(self, checkpoint_path, checkpoint_every=100, checkpoint_seconds=60.0):
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_seconds = checkpoint_seconds
+        self.positions = {}  # (quote, target) -> {'fifo': Position, 'average': Position}
+        self.marks = {}  # (quote, target) -> 현재가
+        self.orders = {}  # 체결 중인 주문 order_id -> [누적 체결 수량, 누적 체결 금액]
+        self.offset = 0  # 저널에서 다음에 읽을 위치
+        self.fills = 0
+        self.replayed = 0  # 이번 프로세스에서 저널에서 읽어 반영한 체결 수
+        self.checkpointed_at = None
+        self._since_checkpoint = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    # 체크포인트 -------------------------------------------------------------
+
+    def _load(self):
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        self.offset = state['offset']
+        self.fills = state['fills']
+        self.orders = state['orders']
+        self.positions = {tuple(key.split('/')): {m: Position.from_dict(p) for m, p in methods.items()}
+                          for key, methods in state['positions'].items()}
+        self.checkpointed_at = state.get('saved_at')
+
+    def checkpoint(self):
+        with self._lock:
+            self._checkpoint()
+
+    def _checkpoint(self):
+        # 임시 파일에 쓰고 바꿔치기 (상태와 저널 위치가 항상 함께 바뀐다)
+        state = {'offset': self.offset, 'fills': self.fills, 'orders': self.orders, 'saved_at': time.time(),
+                 'positions': {'/'.join(key): {m: p.to_dict() for m, p in methods.items()}
+                               for key, methods in self.positions.items()}}
+        tmp = self.checkpoint_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+        self.checkpointed_at = state['saved_at']
+        self._since_checkpoint = 0
+
+    # 반영 -----------------------------------------------------------------
+
+    def sync(self, journal):
+        # 저널에서 아직 읽지 않은 부분의 체결 이벤트만 반영. 반영한 체결 수
+        with self._lock:
+            applied = 0
+            for entry, offset in journal.read_from(self.offset):
+                self.offset = offset
+                event = entry.get('event')
+                if isinstance(event, dict) and event.get('type') in FILL_EVENTS:
+                    applied += self._apply_event(entry, event)
+                elif isinstance(event, dict) and event.get('type') == 'cancelled':
+                    self.orders.pop(event.get('order_id'), None)
+            self.replayed += applied
+            due = self.checkpointed_at is None or time.time() - self.checkpointed_at >= self.checkpoint_seconds
+            if self._since_checkpoint >= self.checkpoint_every or (self._since_checkpoint and due):
+                self._checkpoint()
+            return applied
+
+    def _apply_event(self, entry, event):
+        # 체결 이벤트의 누적 평균가와 직전 누적값의 차이로 이번 체결분 가격을 구한다 (평균가가 없으면 주문 가격)
+        delta = float(event.get('delta_qty') or 0)
+        if delta <= 0:
+            return 0
+        executed = float(event.get('executed_qty') or delta)
+        avg = event.get('avg_price')
+        order = self.orders.setdefault(event['order_id'], [executed - delta, None])
+        if avg not in (None, '', '0') and float(avg) > 0:
+            amount = executed * float(avg)
+            previous = order[1] if order[1] is not None else (executed - delta) * float(avg)
+            price = (amount - previous) / delta
+        else:
+            price = float(event.get('price') or entry.get('price') or 0)
+            amount = (order[1] or 0.0) + price * delta
+        if event.get('type') == 'filled':
+            self.orders.pop(event['order_id'], None)
+        else:
+            order[0], order[1] = executed, amount
+        market = (entry.get('quote_currency', 'KRW'), entry.get('target_currency', 'USDT'))
+        self.apply_fill(market, event.get('side') or entry.get('side'), delta, price, locked=True)
+        return 1
+
+    def apply_fill(self, market, side, qty, price, locked=False):
+        # 체결 한 건을 두 방식 모두에 반영. market: (quote, target)
+        if not locked:
+            with self._lock:
+                return self.apply_fill(market, side, qty, price, locked=True)
+        signed = qty if side == 'BUY' else -qty
+        positions = self.positions.get(market)
+        if positions is None:
+            positions = self.positions[market] = {'fifo': Position('fifo'), 'average': Position('average')}
+        for position in positions.values():
+            position.apply(signed, price)
+        self.fills += 1
+        self._since_checkpoint += 1
+
+    def mark(self, market, best_bid, best_ask):
+        # 호가 갱신마다 현재가(중간 가격)만 바꾼다 (평가 손익은 읽을 때 계산)
+        if best_bid is not None and best_ask is not None:
+            self.marks[market] = (best_bid + best_ask) / 2
+        elif best_bid is not None or best_ask is not None:
+            self.marks[market] = best_bid if best_bid is not None else best_ask
+
+    def summary(self, market):
+        # 방식별 {'qty', 'avg_price', 'realized', 'unrealized', 'lots'}
+        with self._lock:
+            positions = self.positions.get(market)
+            if positions is None:
+                return {}
+            mark = self.marks.get(market)
+            return {method: {'qty': p.qty, 'avg_price': p.avg_price, 'realized': p.realized,
+                             'unrealized': p.unrealized(mark), 'lots': len(p.lots)}
+                    for method, p in positions.items()}
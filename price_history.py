@@ -0,0 +1,167 @@
+# 체결 / 캔들 이력 수집
+# Coinone 공개 API 의 최근 체결(/public/v2/trades)과 캔들(/public/v2/chart)을
+# 마지막으로 저장한 위치(커서)부터 이어 받아 ColumnStore 에 쌓는다.
+# 재시작해도 이미 저장한 구간은 다시 받지 않고, 진행 중인 캔들은 저장하지 않고 메모리에만 둔다.
+# 차트는 memmap 구간을 그대로 잘라 버킷별로 묶어서(OHLC 다운샘플) 그린다.
+
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from column_store import ColumnStore
+
+TRADE_SCHEMA = [('timestamp', '<i8'), ('id', '<i8'), ('price', '<f8'), ('qty', '<f8'), ('is_seller_maker', 'i1')]
+CANDLE_SCHEMA = [('timestamp', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+                 ('target_volume', '<f8'), ('quote_volume', '<f8')]
+
+# Coinone 캔들 간격 -> ms
+INTERVALS = {
+    '1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000,
+    '1h': 3_600_000, '2h': 7_200_000, '4h': 14_400_000, '6h': 21_600_000,
+    '1d': 86_400_000, '1w': 604_800_000,
+}
+CHART_PAGE = 500  # 캔들 한 번 요청 최대 개수
+TRADES_SIZE = 200  # 최근 체결 한 번 요청 최대 개수
+DEFAULT_BACKFILL = 1500  # 저장된 캔들이 없을 때 간격별로 받아 둘 개수
+
+
+def _check(data, what):
+    if data.get('result') != 'success':
+        raise RuntimeError(f"{what} error: {data.get('error_code')}")
+    return data
+
+
+class PriceHistory:
+    def __init__(self, fetch_public, root, market, intervals=('1m',), backfill=DEFAULT_BACKFILL, clock=time.time):
+        # fetch_public(path, params) -> 응답 dict
+        self.fetch_public = fetch_public
+        self.market = market
+        self.backfill = backfill
+        self.clock = clock
+        base = os.path.join(root, f'{market.quote}_{market.target}')
+        self.trades = ColumnStore(os.path.join(base, 'trades'), TRADE_SCHEMA)
+        self.candles = {interval: ColumnStore(os.path.join(base, f'candles_{interval}'), CANDLE_SCHEMA)
+                        for interval in intervals}
+        self.live_candles = {}  # 간격 -> 진행 중인 캔들 dict (저장하지 않음)
+        self.trade_gaps = 0  # 두 번의 체결 조회 사이에 놓친 구간이 있었던 횟수
+        self.last_error = None
+        self.last_sync = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # 수집 ---------------------------------------------------------------
+
+    def sync_trades(self):
+        # 최근 체결 중 마지막으로 저장한 (timestamp, id) 이후 것만 추가한다
+        data = _check(self.fetch_public(f'/public/v2/trades/{self.market.quote}/{self.market.target}',
+                                        {'size': TRADES_SIZE}), 'trades')
+        rows = sorted((int(t['timestamp']), int(t['id']), float(t['price']), float(t['qty']),
+                       1 if t.get('is_seller_maker') else 0) for t in data.get('transactions', []))
+        cursor = (self.trades.meta.get('last_timestamp', -1), self.trades.meta.get('last_id', -1))
+        new = [row for row in rows if row[:2] > cursor]
+        if len(new) == len(rows) and rows and cursor[0] >= 0:
+            self.trade_gaps += 1  # 응답 전체가 새 체결이면 그 사이 체결을 놓쳤을 수 있다
+        if new:
+            columns = dict(zip((name for name, _ in TRADE_SCHEMA), zip(*new)))
+            self.trades.append(columns, last_timestamp=new[-1][0], last_id=new[-1][1])
+        return len(new)
+
+    def sync_candles(self, interval):
+        # 마지막으로 저장한 캔들 다음부터 진행 중인 캔들 직전까지 받는다 (처음이면 backfill 개수만큼)
+        store = self.candles[interval]
+        step = INTERVALS[interval]
+        now = int(self.clock() * 1000)
+        current = now - now % step  # 진행 중인 캔들의 시작 시각
+        last = store.last('timestamp')
+        start = last + step if last is not None else current - self.backfill * step
+
+        candles = {}
+        end = None
+        while True:
+            params = {'interval': interval, 'size': CHART_PAGE}
+            if end is not None:
+                params['timestamp'] = end
+            data = _check(self.fetch_public(f'/public/v2/chart/{self.market.quote}/{self.market.target}', params),
+                          'chart')
+            page = data.get('chart', [])
+            for candle in page:
+                candles[int(candle['timestamp'])] = candle
+            oldest = min((int(c['timestamp']) for c in page), default=None)
+            if oldest is None or oldest <= start or data.get('is_last') or (end is not None and oldest > end):
+                break  # 필요한 구간까지 받았거나 더 이전 데이터가 없다
+            end = oldest - 1
+
+        if current in candles:
+            self.live_candles[interval] = candles[current]
+        keys = sorted(ts for ts in candles if start <= ts < current)
+        if keys:
+            rows = [candles[ts] for ts in keys]
+            columns = {'timestamp': keys}
+            for name, _ in CANDLE_SCHEMA[1:]:
+                columns[name] = [float(row[name]) for row in rows]
+            store.append(columns)
+        return len(keys)
+
+    def sync(self):
+        added = {'trades': self.sync_trades()}
+        for interval in self.candles:
+            added[interval] = self.sync_candles(interval)
+        self.last_sync = time.time()
+        return added
+
+    def start(self, period=5.0):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(period,), name='price-history', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, period):
+        while not self._stop.is_set():
+            try:
+                self.sync()
+                self.last_error = None
+            except Exception as e:
+                # 네트워크 오류 등은 다음 주기에 다시 시도 (커서는 저장된 데이터 기준이라 빠지는 구간 없음)
+                self.last_error = e
+            self._stop.wait(period)
+
+    # 조회 ---------------------------------------------------------------
+
+    def candle_window(self, interval, start=None, end=None):
+        # 저장된 캔들 [start, end) (ms) 의 열 구간 + 진행 중인 캔들
+        columns = self.candles[interval].window(start, end)
+        live = self.live_candles.get(interval)
+        if live is not None and (end is None or int(live['timestamp']) < end):
+            columns = {name: np.append(values, float(live[name]) if name != 'timestamp' else int(live[name]))
+                       for name, values in columns.items()}
+        return columns
+
+    def trade_window(self, start=None, end=None):
+        return self.trades.window(start, end)
+
+
+def downsample_ohlc(columns, max_points=1500):
+    # 연속한 캔들을 max_points 개 이하의 버킷으로 묶는다 (시가=첫 값, 고가=최대, 저가=최소, 종가=마지막, 거래량=합)
+    n = len(columns['timestamp'])
+    if n <= max_points:
+        return {name: np.asarray(values) for name, values in columns.items()}
+    size = math.ceil(n / max_points)
+    starts = np.arange(0, n, size)
+    ends = np.minimum(starts + size, n) - 1
+    result = {
+        'timestamp': np.asarray(columns['timestamp'][starts]),
+        'open': np.asarray(columns['open'][starts]),
+        'high': np.maximum.reduceat(columns['high'], starts),
+        'low': np.minimum.reduceat(columns['low'], starts),
+        'close': np.asarray(columns['close'][ends]),
+    }
+    for name in ('target_volume', 'quote_volume'):
+        if name in columns:
+            result[name] = np.add.reduceat(columns[name], starts)
+    return result
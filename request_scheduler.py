@@ -0,0 +1,160 @@
+# API 요청 스케줄러
+# 엔드포인트 분류별 토큰 버킷(초당 요청 수)과 계정 전체 버킷으로 요청량을 제한하고,
+# 주문/취소 요청은 조회 요청보다 항상 먼저 보낸다.
+# 이미 진행 중인 같은 조회 요청은 새로 보내지 않고 결과를 함께 받는다.
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+PRIORITY_ORDER = 0
+PRIORITY_READ = 1
+
+# 분류 -> (초당 요청 수, 최대 버스트)
+DEFAULT_BUDGETS = {
+    'order': (10.0, 10),
+    'read': (8.0, 8),
+}
+DEFAULT_GLOBAL_BUDGET = (15.0, 15)
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        # 토큰 하나를 쓸 수 있을 때까지 남은 시간 (0 이면 바로 가능)
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class _Job:
+    __slots__ = ('endpoint_class', 'fn', 'future', 'coalesce_key', 'throttled')
+
+    def __init__(self, endpoint_class, fn, coalesce_key):
+        self.endpoint_class = endpoint_class
+        self.fn = fn
+        self.future = Future()
+        self.coalesce_key = coalesce_key
+        self.throttled = False
+
+
+class RequestScheduler:
+    def __init__(self, budgets=None, global_budget=DEFAULT_GLOBAL_BUDGET, max_workers=8):
+        budgets = budgets or DEFAULT_BUDGETS
+        self.buckets = {name: TokenBucket(*budget) for name, budget in budgets.items()}
+        self.global_bucket = TokenBucket(*global_budget) if global_budget else None
+        self.counters = {'submitted': 0, 'queued': 0, 'throttled': 0, 'coalesced': 0,
+                         'inline': 0, 'completed': 0, 'failed': 0}
+        self._queue = []  # (priority, 순번, job)
+        self._seq = itertools.count()
+        self._inflight = {}  # coalesce_key -> job
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='api')
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name='api-scheduler', daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, endpoint_class, fn, priority=PRIORITY_READ, coalesce_key=None):
+        with self._cond:
+            self.counters['submitted'] += 1
+            if coalesce_key is not None:
+                job = self._inflight.get(coalesce_key)
+                if job is not None:
+                    self.counters['coalesced'] += 1
+                    return job.future
+            job = _Job(endpoint_class, fn, coalesce_key)
+            if coalesce_key is not None:
+                self._inflight[coalesce_key] = job
+            heapq.heappush(self._queue, (priority, next(self._seq), job))
+            self.counters['queued'] += 1
+            self._cond.notify()
+        return job.future
+
+    def run_inline(self, endpoint_class, fn, priority=PRIORITY_ORDER, timeout=None):
+        # 앞선 대기 작업이 없고 토큰도 남아 있으면 호출한 스레드에서 바로 실행한다 (스레드 전환 없음).
+        # 아니면 평소처럼 큐에 넣고 결과를 최대 timeout 초 기다린다 (넘으면 concurrent.futures.TimeoutError).
+        job = _Job(endpoint_class, fn, None)
+        with self._cond:
+            now = time.monotonic()
+            buckets = self._buckets_for(job)
+            ready = (not self._queue or self._queue[0][0] > priority) and \
+                all(bucket.wait_time(now) == 0 for bucket in buckets)
+            if ready:
+                for bucket in buckets:
+                    bucket.take()
+                self.counters['submitted'] += 1
+                self.counters['inline'] += 1
+        if not ready:
+            return self.submit(endpoint_class, fn, priority).result(timeout)
+        self._run(job)
+        return job.future.result()
+
+    def _buckets_for(self, job):
+        buckets = [self.buckets[job.endpoint_class]] if job.endpoint_class in self.buckets else []
+        if self.global_bucket is not None:
+            buckets.append(self.global_bucket)
+        return buckets
+
+    def _next_job(self):
+        # 큐 맨 앞(가장 높은 우선순위) 작업만 본다. 주문이 토큰을 기다리는 동안 조회가 끼어들지 않는다.
+        priority, _, job = self._queue[0]
+        now = time.monotonic()
+        wait = max([bucket.wait_time(now) for bucket in self._buckets_for(job)] or [0.0])
+        if wait > 0:
+            if not job.throttled:
+                job.throttled = True
+                self.counters['throttled'] += 1
+            return None, wait
+        for bucket in self._buckets_for(job):
+            bucket.take()
+        heapq.heappop(self._queue)
+        self.counters['queued'] -= 1
+        return job, 0
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                job, wait = self._next_job()
+                if job is None:
+                    self._cond.wait(wait)
+                    continue
+            try:
+                self._executor.submit(self._run, job)
+            except RuntimeError as e:
+                # 인터프리터 종료 중이라 실행기가 이미 닫혔다
+                job.future.set_exception(e)
+                return
+
+    def _run(self, job):
+        try:
+            result = job.fn()
+        except BaseException as e:
+            self._finish(job, 'failed')
+            job.future.set_exception(e)
+        else:
+            self._finish(job, 'completed')
+            job.future.set_result(result)
+
+    def _finish(self, job, counter):
+        with self._cond:
+            self.counters[counter] += 1
+            if job.coalesce_key is not None and self._inflight.get(job.coalesce_key) is job:
+                del self._inflight[job.coalesce_key]
+
+    def stats(self):
+        with self._cond:
+            return dict(self.counters)
@@ -0,0 +1,82 @@
+# 프로세스 전체 공유 캐시
+# TTL 이 지난 항목만 다시 불러오고, 같은 키를 동시에 요청하면 한 번만 불러온 뒤 결과를 나눠 쓴다.
+# 항목 수가 maxsize 를 넘으면 가장 오래 쓰지 않은 항목부터 버린다.
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class TTLCache:
+    def __init__(self, ttl, maxsize=256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._data = OrderedDict()  # key -> (만료 시각, 값)
+        self._inflight = {}  # key -> Future
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader, ttl=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            self._store(key, value, ttl)
+        future.set_result(value)
+        return value
+
+    def put(self, key, value, ttl=None):
+        # 다른 경로로 받은 최신 값을 바로 넣어 둔다
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _store(self, key, value, ttl):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def peek(self, key):
+        # 만료 여부와 관계없이 마지막으로 불러온 값 (없으면 None)
+        with self._lock:
+            entry = self._data.get(key)
+            return None if entry is None else entry[1]
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            size = len(self._data)
+        return {'size': size, 'hits': self.hits, 'misses': self.misses, 'coalesced': self.coalesced}
@@ -0,0 +1,283 @@
+# 조건부 주문 (손절 / 익절 / OCO) 감시 엔진
+# 감시 가격에 닿으면 미리 정해 둔 지정가 주문(자식 주문)을 보낸다. 거래소에는 조건부 주문이 없어서 로컬에서 지켜본다.
+# - 마켓/자식 주문 방향/방향(아래로 닿음, 위로 닿음)별로 감시 가격을 정렬 리스트로 들고 있어서
+#   호가/체결 갱신마다 이진 탐색으로 이번에 넘어선 것만 꺼낸다 (걸어 둔 수와 무관하게 O(log n + 발동 수))
+# - 매도 자식 주문은 최우선 매수호가, 매수 자식 주문은 최우선 매도호가를 기준 가격으로 본다 (체결가는 양쪽 공통)
+# - OCO: 같은 그룹의 다른 조건은 하나가 발동하면 함께 취소된다
+# - 상태는 추가 전용 JSONL(arm / cancel / fire)에 남기고, 시작할 때 다시 읽어서 남은 조건만으로 새로 쓴다
+# - 발동 판단은 호가를 받은 스레드에서 하고, 전송은 executor 로 넘긴다 (호가 스레드는 네트워크를 기다리지 않는다)
+
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+
+KINDS = {'stop_loss': '손절', 'take_profit': '익절', 'stop': '스탑'}
+LATENCY_SAMPLES = 1000
+
+
+class Trigger:
+    __slots__ = ('trigger_id', 'quote', 'target', 'kind', 'side', 'direction', 'trigger_price', 'price', 'qty',
+                 'group', 'created_at', 'seq')
+
+    def __init__(self, trigger_id, quote, target, kind, side, direction, trigger_price, price, qty, group=None,
+                 created_at=None):
+        # direction: 'below' (기준 가격이 trigger_price 이하가 되면 발동) / 'above' (이상이 되면 발동)
+        # price, qty: 발동 시 보낼 지정가 주문
+        self.trigger_id = trigger_id
+        self.quote = quote
+        self.target = target
+        self.kind = kind
+        self.side = side
+        self.direction = direction
+        self.trigger_price = float(trigger_price)
+        self.price = float(price)
+        self.qty = float(qty)
+        self.group = group
+        self.created_at = created_at or time.time()
+        self.seq = 0  # 같은 감시 가격끼리의 등록 순서
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__ if name != 'seq'}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+def direction_for(kind, side, reference=None, trigger_price=None):
+    # 손절 매도 / 익절 매수는 가격이 내려와서, 익절 매도 / 손절 매수는 올라가서 발동한다.
+    # 'stop' 은 지금 기준 가격보다 위에 걸었는지 아래에 걸었는지로 정한다 (기준 가격이 없으면 걸 수 없다).
+    if kind == 'stop':
+        if reference is None:
+            raise ValueError("기준 가격(호가)을 아직 받지 못해 스탑 주문을 걸 수 없습니다.")
+        return 'above' if trigger_price > reference else 'below'
+    return 'below' if (kind == 'stop_loss') == (side == 'SELL') else 'above'
+
+
+class TriggerEngine:
+    def __init__(self, path, submit, executor=None, on_fired=None):
+        # submit(trigger) -> 결과 (주문 로그 등). executor 가 없으면 발동을 판단한 스레드에서 바로 보낸다.
+        # on_fired(trigger, result, error): 전송이 끝난 뒤 호출
+        self.path = path
+        self.submit = submit
+        self.executor = executor
+        self.on_fired = on_fired
+        self.triggers = {}  # trigger_id -> Trigger
+        self.groups = {}  # OCO 그룹 -> {trigger_id}
+        self.fired = deque(maxlen=200)  # 최근 발동 기록 (화면 표시용)
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)  # 가격 갱신 ~ 전송 시작 (초)
+        self.stats = {'armed': 0, 'fired': 0, 'canceled': 0, 'checks': 0, 'errors': 0}
+        self._index = {}  # (quote, target, side, direction) -> [(감시 가격, seq, trigger_id)] 오름차순
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._load()
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    # 저장 -----------------------------------------------------------------
+
+    def _load(self):
+        # 기록을 처음부터 재생해서 아직 걸려 있는 조건만 남기고, 그것만으로 파일을 새로 쓴다
+        armed = {}
+        try:
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # 쓰다 끊긴 마지막 줄
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if record['event'] == 'arm':
+                        armed[record['trigger']['trigger_id']] = record['trigger']
+                    else:
+                        armed.pop(record['trigger_id'], None)
+        except FileNotFoundError:
+            return
+        for data in armed.values():
+            self._add(Trigger.from_dict(data))
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for data in armed.values():
+                f.write(json.dumps({'event': 'arm', 'trigger': data}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def _write(self, records):
+        data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records).encode('utf-8')
+        os.write(self._fd, data)
+        os.fsync(self._fd)
+
+    # 등록 / 취소 ------------------------------------------------------------
+
+    def _add(self, trigger):
+        self._seq += 1
+        trigger.seq = self._seq
+        self.triggers[trigger.trigger_id] = trigger
+        if trigger.group:
+            self.groups.setdefault(trigger.group, set()).add(trigger.trigger_id)
+        key = (trigger.quote, trigger.target, trigger.side, trigger.direction)
+        insort(self._index.setdefault(key, []), (trigger.trigger_price, trigger.seq, trigger.trigger_id))
+
+    def _remove(self, trigger):
+        # 색인에서 정확히 그 항목만 뺀다 (이진 탐색)
+        del self.triggers[trigger.trigger_id]
+        entries = self._index[(trigger.quote, trigger.target, trigger.side, trigger.direction)]
+        entry = (trigger.trigger_price, trigger.seq, trigger.trigger_id)
+        i = bisect_left(entries, entry)
+        if i < len(entries) and entries[i] == entry:
+            del entries[i]
+        if trigger.group:
+            members = self.groups.get(trigger.group)
+            if members is not None:
+                members.discard(trigger.trigger_id)
+                if not members:
+                    del self.groups[trigger.group]
+
+    def arm(self, market, kind, side, trigger_price, price, qty, direction=None, group=None):
+        # 조건 하나를 건다. direction 을 주지 않으면 kind/side 로 정한다
+        trigger = Trigger(uuid.uuid4().hex, market.quote, market.target, kind, side,
+                          direction or direction_for(kind, side), trigger_price, price, qty, group)
+        with self._lock:
+            self._write([{'event': 'arm', 'trigger': trigger.to_dict()}])
+            self._add(trigger)
+            self.stats['armed'] += 1
+        return trigger
+
+    def arm_oco(self, market, side, take_profit, stop_loss, qty, reference):
+        # take_profit, stop_loss: (감시 가격, 지정가). 하나가 발동하면 다른 하나는 취소된다
+        # reference: 지금 기준 가격 (매도는 최우선 매수호가, 매수는 최우선 매도호가).
+        # 이미 넘어선 감시 가격은 다음 갱신에 바로 발동하므로 걸지 않는다 (ValueError)
+        if reference is None:
+            raise ValueError("기준 가격(호가)을 아직 받지 못해 OCO 주문을 걸 수 없습니다.")
+        for kind, (trigger_price, _) in (('take_profit', take_profit), ('stop_loss', stop_loss)):
+            if direction_for(kind, side) == 'above' and trigger_price <= reference:
+                raise ValueError(f"{KINDS[kind]} 감시 가격은 기준 가격 {reference:,.2f} 보다 높아야 합니다.")
+            if direction_for(kind, side) == 'below' and trigger_price >= reference:
+                raise ValueError(f"{KINDS[kind]} 감시 가격은 기준 가격 {reference:,.2f} 보다 낮아야 합니다.")
+        group = uuid.uuid4().hex
+        legs = [Trigger(uuid.uuid4().hex, market.quote, market.target, kind, side, direction_for(kind, side),
+                        trigger_price, price, qty, group)
+                for kind, (trigger_price, price) in (('take_profit', take_profit), ('stop_loss', stop_loss))]
+        with self._lock:
+            self._write([{'event': 'arm', 'trigger': leg.to_dict()} for leg in legs])
+            for leg in legs:
+                self._add(leg)
+            self.stats['armed'] += len(legs)
+        return legs
+
+    def cancel(self, trigger_id):
+        # 조건을 취소한다 (OCO 는 그룹 전체). 취소한 개수
+        with self._lock:
+            trigger = self.triggers.get(trigger_id)
+            if trigger is None:
+                return 0
+            targets = [self.triggers[i] for i in self.groups.get(trigger.group, ())] if trigger.group else [trigger]
+            self._write([{'event': 'cancel', 'trigger_id': t.trigger_id} for t in targets])
+            for t in targets:
+                self._remove(t)
+            self.stats['canceled'] += len(targets)
+            return len(targets)
+
+    def armed(self, market=None):
+        with self._lock:
+            return [t for t in self.triggers.values()
+                    if market is None or (t.quote, t.target) == (market.quote, market.target)]
+
+    def markets(self):
+        with self._lock:
+            return {(t.quote, t.target) for t in self.triggers.values()}
+
+    # 감시 -----------------------------------------------------------------
+
+    def on_book(self, market, best_bid, best_ask):
+        # 호가 갱신: 매도 조건은 최우선 매수호가, 매수 조건은 최우선 매도호가로 판단
+        return self._check(market, (('SELL', best_bid), ('BUY', best_ask)))
+
+    def on_trade(self, market, price):
+        return self._check(market, (('SELL', price), ('BUY', price)))
+
+    def _check(self, market, references):
+        started = time.perf_counter()
+        fired = []
+        with self._lock:
+            self.stats['checks'] += 1
+            for side, reference in references:
+                if reference is None:
+                    continue
+                below = self._index.get((market.quote, market.target, side, 'below'))
+                if below and below[-1][0] >= reference:
+                    # 감시 가격이 기준 가격 이상인 뒤쪽 구간
+                    fired += self._take(below, bisect_left(below, (reference,)), len(below))
+                above = self._index.get((market.quote, market.target, side, 'above'))
+                if above and above[0][0] <= reference:
+                    fired += self._take(above, 0, bisect_right(above, (reference, float('inf'))))
+            if not fired:
+                return []
+            # 같은 그룹의 나머지 조건은 취소한다 (같은 갱신에서 둘 다 넘었으면 먼저 꺼낸 쪽만 보낸다)
+            siblings = []
+            sent_groups = set()
+            for trigger in list(fired):
+                if trigger.group in sent_groups:
+                    fired.remove(trigger)
+                    siblings.append(trigger)
+                    continue
+                if trigger.group:
+                    sent_groups.add(trigger.group)
+                    for other_id in list(self.groups.get(trigger.group, ())):
+                        siblings.append(self.triggers[other_id])
+                        self._remove(self.triggers[other_id])
+                    self.groups.pop(trigger.group, None)
+            self.stats['fired'] += len(fired)
+            self.stats['canceled'] += len(siblings)
+        for trigger in fired:
+            if self.executor is not None:
+                self.executor.submit(self._send, trigger, started)
+            else:
+                self._send(trigger, started)
+        # 전송을 넘긴 뒤에 기록한다 (재시작 후 다시 발동돼도 같은 user_order_id 라 거래소가 중복으로 거절한다)
+        with self._lock:
+            self._write([{'event': 'fire', 'trigger_id': t.trigger_id} for t in fired]
+                        + [{'event': 'cancel', 'trigger_id': t.trigger_id} for t in siblings])
+        return fired
+
+    def _take(self, entries, lo, hi):
+        # 색인 구간 [lo, hi) 의 조건을 꺼낸다
+        taken = [self.triggers[trigger_id] for _, _, trigger_id in entries[lo:hi]]
+        del entries[lo:hi]
+        for trigger in taken:
+            del self.triggers[trigger.trigger_id]
+            if trigger.group:
+                self.groups.get(trigger.group, set()).discard(trigger.trigger_id)
+        return taken
+
+    def _send(self, trigger, started):
+        self.latencies.append(time.perf_counter() - started)
+        result = error = None
+        try:
+            result = self.submit(trigger)
+        except Exception as e:
+            error = e
+            self.stats['errors'] += 1
+        self.fired.append({'trigger': trigger.to_dict(), 'fired_at': time.time(), 'result': result,
+                           'error': None if error is None else str(error)})
+        if self.on_fired is not None:
+            self.on_fired(trigger, result, error)
+
+    def latency_stats(self):
+        # 가격 갱신 ~ 전송 시작 지연 (ms) p50 / p99
+        samples = sorted(self.latencies)
+        if not samples:
+            return None
+        return {'p50_ms': samples[len(samples) // 2] * 1000, 'p99_ms': samples[int(len(samples) * 0.99)] * 1000,
+                'samples': len(samples)}
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None